@@ -6,16 +6,30 @@ Esta es la aplicación principal que coordina todos los servicios del sistema
 de reciclaje inteligente, incluyendo MQTT, Firebase, NFC, cámara y UI.
 """
 import time
-import threading
-import tkinter as tk
 
-# Importar servicios
-from services.firebase_service import FirebaseService
-from services.mqtt_service import MQTTService
-from services.nfc_service import NFCService
-from services.camera_service import CameraService
-from ui.ui_components import UIComponents
-from config.config import SESSION_DURATION, POINTS_CLAIM_TIMEOUT
+# Instante de arranque del proceso para medir el tiempo hasta "listo" (antes de
+# cualquier otra importación, para incluir su coste)
+BOOT_START = time.perf_counter()
+
+import threading  # noqa: E402
+import tkinter as tk  # noqa: E402
+from collections import deque  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+
+# Importar servicios (cámara y Firebase se importan en segundo plano: cv2, TFLite y
+# firebase_admin son pesados y retrasarían la aparición de la ventana)
+from services.mqtt_service import MQTTService  # noqa: E402
+from services.nfc_service import NFCService  # noqa: E402
+from services.claim_session import ClaimSession  # noqa: E402
+from ui.ui_components import UIComponents  # noqa: E402
+from config.config import (  # noqa: E402
+    SESSION_DURATION, POINTS_CLAIM_TIMEOUT, POINTS_PLASTIC, POINTS_ALUMINUM,
+    DETECTION_WINDOW, DETECTION_MIN_VOTES
+)
+
+# Espera máxima a las etapas de arranque en curso al cerrar (sin bloquear Tk)
+BOOT_CLOSE_WAIT_MS = 10000
+BOOT_CLOSE_POLL_MS = 100
 
 
 class ReciclajeApp:
@@ -33,14 +47,10 @@ class ReciclajeApp:
         self.current_user = None
         self.session_active = False
         
-        # Nuevas variables para el flujo de detección continua
-        self.detection_active = True
-        self.pending_material = None  # Material detectado esperando NFC
-        self.pending_points = 0  # Puntos pendientes de otorgar
-        self.pending_material_time = 0  # Timestamp del material pendiente
-        self.pending_image_path = None  # Ruta de la imagen del material pendiente
-        self.pending_timeout = POINTS_CLAIM_TIMEOUT  # Timeout para reclamar puntos antes del reinicio
+        # Reclamo de puntos: detectado -> esperando NFC -> otorgado / vencido
+        self.claim = ClaimSession(POINTS_CLAIM_TIMEOUT, on_expired=self._on_claim_expired)
         self.detection_thread = None
+        self.tap_latencies_ms = deque(maxlen=50)  # Tiempo pase de tarjeta -> confirmación
 
         # Inicializar componentes de UI
         self.ui = UIComponents(root)
@@ -48,53 +58,134 @@ class ReciclajeApp:
         # Configurar cierre de aplicación
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
 
-        # Inicializar servicios
-        self.firebase_service = FirebaseService(self.ui.update_status)
+        # Servicios (se inicializan en segundo plano, None hasta estar listos)
+        self.firebase_service = None
+        self.nfc_service = None
+        self.camera_service = None
         self.mqtt_service = MQTTService(self._on_mqtt_message, self.ui.update_status)
-        self.nfc_service = NFCService(self._on_nfc_card, self.ui.update_status)
-        self.camera_service = CameraService(self.ui.update_status)
-        
-        # Configurar callback para cierre de sesión por vacío prolongado
-        self.camera_service.set_session_end_callback(self._end_session_by_empty)
+        self.boot_times = {}  # Duración de cada etapa de arranque (ms)
+        self.boot_thread = None
 
-        # Iniciar servicios
+        # Iniciar servicios sin bloquear la ventana
+        self.ui.update_status("🔄 Iniciando servicios...", "info")
         self._start_services()
 
+    def _start_services(self):
+        """Inicia todos los servicios del sistema en paralelo en segundo plano"""
+        self.boot_thread = threading.Thread(target=self._boot_services, daemon=True)
+        self.boot_thread.start()
+
+    def _boot_services(self):
+        """Arranque por etapas: cada servicio se inicializa en paralelo e informa al estar listo"""
+        with ThreadPoolExecutor(max_workers=6, thread_name_prefix="boot") as pool:
+            futures = [
+                pool.submit(self._run_boot_stage, "firebase", self._init_firebase),
+                pool.submit(self._run_boot_stage, "nfc", self._init_nfc),
+                pool.submit(self._run_boot_stage, "mqtt", self.mqtt_service.start),
+            ]
+
+            # Cámara, modelo y audio son independientes entre sí
+            camera_service = self._run_boot_stage("camera_import", self._create_camera_service)
+            if camera_service is not None:
+                futures += [
+                    pool.submit(self._run_boot_stage, "camera", camera_service.start_camera),
+                    pool.submit(self._run_boot_stage, "model", camera_service.load_model),
+                    pool.submit(self._run_boot_stage, "audio", camera_service.init_audio),
+                ]
+
+            for future in futures:
+                future.result()
+
+        ready_ms = (time.perf_counter() - BOOT_START) * 1000
+        self.boot_times["ready"] = ready_ms
+        print(f"🚀 Sistema listo en {ready_ms:.0f} ms desde el arranque - Etapas: "
+              + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.boot_times.items() if name != "ready"))
+
         # Sistema listo
-        self._start_system()
+        if self.is_running:
+            self.ui.call_soon(self._start_system)
 
-    def _start_services(self):
-        """Inicia todos los servicios del sistema"""
-        # Actualizar estado de componentes
-        if self.firebase_service.is_initialized():
-            self.ui.update_component_status("firebase", "✅ Conectado", "#27ae60")
-        else:
-            self.ui.update_component_status("firebase", "❌ Error", "#e74c3c")
+    def _run_boot_stage(self, name, stage):
+        """
+        Ejecuta una etapa de arranque midiendo su duración
 
-        if self.nfc_service.is_reader_available():
-            self.ui.update_component_status("nfc", "✅ Disponible", "#27ae60")
-        else:
-            self.ui.update_component_status("nfc", "❌ No disponible", "#e74c3c")
+        Args:
+            name: Nombre de la etapa
+            stage: Función que inicializa el componente
 
-        if self.camera_service.is_camera_available():
-            camera_status = "✅ Disponible"
-            if self.camera_service.is_ai_model_loaded():
-                camera_status += " + IA"
-            self.ui.update_component_status("camera", camera_status, "#27ae60")
-        else:
-            self.ui.update_component_status("camera", "❌ No disponible", "#e74c3c")
+        Returns:
+            Resultado de la etapa o None si falló
+        """
+        if not self.is_running:
+            # La aplicación se está cerrando: no abrir más recursos
+            return None
 
-        # Iniciar servicios
-        self.mqtt_service.start()
+        start = time.perf_counter()
+        result = None
+        try:
+            result = stage()
+        except Exception as e:
+            print(f"❌ Error en etapa de arranque {name}: {e}")
+
+        self.boot_times[name] = (time.perf_counter() - start) * 1000
+        print(f"✅ Etapa {name} completada en {self.boot_times[name]:.0f} ms")
+        if self.is_running:
+            self.ui.call_soon(self._refresh_component_status)
+        return result
+
+    def _init_firebase(self):
+        """Etapa de arranque: conexión con Firebase"""
+        from services.firebase_service import FirebaseService
+        self.firebase_service = FirebaseService(self.ui.update_status)
+
+    def _init_nfc(self):
+        """Etapa de arranque: lector NFC y monitoreo de tarjetas"""
+        self.nfc_service = NFCService(self._on_nfc_card, self.ui.update_status)
         self.nfc_service.start_monitoring()
 
+    def _create_camera_service(self):
+        """Etapa de arranque: importa y crea el servicio de cámara (sin abrir la cámara)"""
+        from services.camera_service import CameraService
+        camera_service = CameraService(self.ui.update_status, autostart=False)
+
+        # Configurar callback para cierre de sesión por vacío prolongado
+        camera_service.set_session_end_callback(self._end_session_by_empty)
+        self.camera_service = camera_service
+        return camera_service
+
+    def _refresh_component_status(self):
+        """Actualiza el estado de los componentes según las etapas completadas"""
+        if self.firebase_service is not None:
+            if self.firebase_service.is_initialized():
+                self.ui.update_component_status("firebase", "✅ Conectado", "#27ae60")
+            else:
+                self.ui.update_component_status("firebase", "❌ Error", "#e74c3c")
+        elif "firebase" in self.boot_times:
+            self.ui.update_component_status("firebase", "❌ Error", "#e74c3c")
+
+        if self.nfc_service is not None:
+            if self.nfc_service.is_reader_available():
+                self.ui.update_component_status("nfc", "✅ Disponible", "#27ae60")
+            else:
+                self.ui.update_component_status("nfc", "❌ No disponible", "#e74c3c")
+
+        if self.camera_service is not None and "camera" in self.boot_times:
+            if self.camera_service.is_camera_available():
+                camera_status = "✅ Disponible"
+                if self.camera_service.is_ai_model_loaded():
+                    camera_status += " + IA"
+                self.ui.update_component_status("camera", camera_status, "#27ae60")
+            else:
+                self.ui.update_component_status("camera", "❌ No disponible", "#e74c3c")
+
     def _start_system(self):
         """Inicia el sistema principal"""
         self.is_running = True
-        self.ui.update_status(f"🟢 Sistema iniciado - Cámara siempre activa, detección con confianza ≥ 95% - Timeout: {POINTS_CLAIM_TIMEOUT}s", "success")
+        self.ui.update_status(f"🟢 Sistema iniciado - Cámara siempre activa, detección por votación de {DETECTION_MIN_VOTES}/{DETECTION_WINDOW} frames - Timeout: {POINTS_CLAIM_TIMEOUT}s", "success")
         
         # Iniciar detección continua de materiales
-        self._start_continuous_detection()
+        if self.camera_service is not None:
+            self._start_continuous_detection()
 
     def _start_continuous_detection(self):
         """Inicia la detección continua de materiales en un hilo separado"""
@@ -106,29 +197,19 @@ class ReciclajeApp:
         """Loop continuo de detección de materiales - Cámara siempre activa en tiempo real"""
         while self.is_running:
             try:
-                # Solo detectar si no hay material pendiente
-                if self.pending_material is None and self.detection_active:
-                    material, image_path = self.camera_service.process_material_detection()
-                    
-                    if material and self.camera_service.is_valid_material_for_points(material):
-                        # Material válido detectado con confianza ≥ 95% - solicitar NFC
-                        self._handle_material_detected(material, image_path)
-                    elif material and "vacio" in material.lower():
-                        # Vacío detectado - solo mostrar, no procesar
-                        self.ui.update_status(f"🔍 Detectado: {material}", "info")
-                    # Si material es None, significa que no hubo cambio significativo
-                    # (No mostrar mensaje para evitar spam en la UI)
-                elif self.pending_material is not None:
-                    # Hay material pendiente, verificar timeout
-                    current_time = time.time()
-                    if (current_time - self.pending_material_time) > self.pending_timeout:
-                        # Timeout alcanzado, reiniciar sistema
-                        print(f"⏰ Timeout de puntos no reclamados: {self.pending_material} - Reiniciando sistema")
-                        self.ui.update_status(f"⏰ Tiempo agotado para reclamar {self.pending_material} - Reiniciando sistema...", "warning")
-                        
-                        # Reiniciar sistema completo
-                        self._restart_system()
-                
+                # La detección sigue activa durante el reclamo: cada material se
+                # agrega a la canasta que se otorga con un solo pase de tarjeta
+                material, image_path = self.camera_service.process_material_detection()
+
+                if material and self.camera_service.is_valid_material_for_points(material):
+                    # Material válido confirmado por varios frames - solicitar NFC
+                    self._handle_material_detected(material, image_path)
+                elif material and "vacio" in material.lower():
+                    # Vacío detectado - solo mostrar, no procesar
+                    self.ui.update_status(f"🔍 Detectado: {material}", "info")
+                # Si material es None, significa que no hubo cambio significativo
+                # (No mostrar mensaje para evitar spam en la UI)
+
                 # Pausa muy corta para detección en tiempo real
                 time.sleep(0.1)  # 100ms para detección en tiempo real
                 
@@ -146,38 +227,37 @@ class ReciclajeApp:
         """
         # Calcular puntos según el material
         if "plastico" in material.lower():
-            points = 20  # POINTS_PLASTIC
+            points = POINTS_PLASTIC
         elif "aluminio" in material.lower():
-            points = 30  # POINTS_ALUMINUM
+            points = POINTS_ALUMINUM
         else:
             return
         
-        # Guardar material, puntos e imagen pendientes
-        self.pending_material = material
-        self.pending_points = points
-        self.pending_material_time = time.time()
-        self.pending_image_path = image_path
+        # Agregar a la canasta (reinicia el plazo de POINTS_CLAIM_TIMEOUT)
+        claim = self.claim.detect(material, points, image_path)
+        if claim is None:
+            # El reclamo vencía en ese instante: el material no entra en ninguna
+            # canasta, así que su imagen no la borrará nadie más
+            print(f"⚠️ Material descartado ({material}): el reclamo estaba venciendo")
+            if image_path:
+                self.camera_service.delete_image(image_path)
+            return
         
-        # Enviar material detectado a ESP32 para mover compartimientos
-        if self.mqtt_service.is_connected():
-            success = self.mqtt_service.send_material_detected(material, points, image_path)
-            if success:
-                print(f"📡 Material enviado a ESP32: {material}")
-                self.ui.log_esp32_command(material, True)
-            else:
-                print(f"❌ Error enviando material a ESP32: {material}")
-                self.ui.log_esp32_command(material, False)
-        else:
-            print(f"⚠️ MQTT desconectado - No se puede enviar material a ESP32")
-            self.ui.log_esp32_command(material, False)
+        # Enviar material detectado a ESP32 (no bloquea; se confirma por callback)
+        if not self.mqtt_service.is_connected():
+            print(f"⚠️ MQTT desconectado - El material se enviará a la ESP32 al reconectar")
+        self.mqtt_service.send_material_detected(
+            material, points, image_path,
+            callback=lambda handle: self.ui.log_esp32_command(material, handle.succeeded)
+        )
         
         # Actualizar UI
-        self.ui.update_status(f"♻️ {material.upper()} detectado! Pase su tarjeta NFC para recibir {points} puntos (Tiempo límite: {POINTS_CLAIM_TIMEOUT}s)", "success")
-        self.ui.update_pending_material(material, points)
+        self.ui.update_status(f"♻️ {claim.describe().upper()} detectado! Pase su tarjeta NFC para recibir {claim.points} puntos (Tiempo límite: {POINTS_CLAIM_TIMEOUT}s)", "success")
+        self.ui.update_pending_material(claim.describe(), claim.points)
         self.ui.log_material(material, points)
         
         # Marcar material pendiente (la cámara sigue activa)
-        print(f"🎁 Material pendiente: {material} - Esperando NFC")
+        print(f"🎁 Canasta pendiente: {claim.describe()} ({claim.points} pts) - Esperando NFC")
         if image_path:
             print(f"📷 Imagen guardada: {image_path}")
 
@@ -195,14 +275,14 @@ class ReciclajeApp:
         device_id = data['device_id']
         timestamp = data['timestamp']
 
-        # Verificar si hay cambios significativos
-        if not self.ui.has_significant_change(target, percent, state):
+        # Verificar si hay cambios significativos (o Firebase aún no está listo)
+        if self.firebase_service is None or not self.ui.has_significant_change(target, percent, state):
             print(f"⏭️ {target}: Sin cambios significativos ({percent}% {state}) - Omitiendo actualización Firebase")
             self.ui.update_container_status(target, percent, state, distance_cm)
             return
 
-        # Actualizar Firebase
-        success = self.firebase_service.update_container_status(
+        # Encolar escritura en Firebase (no bloquea el hilo de red de MQTT)
+        success = self.firebase_service.queue_container_status(
             target, percent, state, distance_cm, device_id, timestamp
         )
 
@@ -220,26 +300,35 @@ class ReciclajeApp:
         # Actualizar UI
         self.ui.update_container_status(target, percent, state, distance_cm)
 
-    def _on_nfc_card(self, nfc_id):
+    def _on_nfc_card(self, nfc_id, tapped_at=None):
         """
-        Callback para procesar tarjetas NFC detectadas
+        Callback para procesar tarjetas NFC detectadas (hilo de trabajo del NFC)
 
         Args:
             nfc_id: ID de la tarjeta NFC
+            tapped_at: Instante del pase (time.monotonic), para medir la latencia
         """
-        # Verificar si hay material pendiente
-        if self.pending_material is not None:
-            self._process_pending_material(nfc_id)
+        # Verificar que Firebase esté listo
+        if self.firebase_service is None:
+            self.ui.update_status("⏳ Sistema iniciando, intente de nuevo en unos segundos", "warning")
+            return
+
+        # Reservar el reclamo pendiente (detiene su temporizador)
+        claim = self.claim.begin_award()
+        if claim is not None:
+            self._process_pending_material(nfc_id, claim, tapped_at)
         else:
             # No hay material pendiente - mostrar mensaje
             self.ui.update_status("⚠️ No hay material detectado. Coloque un material primero.", "warning")
 
-    def _process_pending_material(self, nfc_id):
+    def _process_pending_material(self, nfc_id, claim, tapped_at=None):
         """
         Procesa el material pendiente con la tarjeta NFC
         
         Args:
             nfc_id: ID de la tarjeta NFC
+            claim: Reclamo reservado con begin_award
+            tapped_at: Instante del pase (time.monotonic)
         """
         # Buscar usuario en Firebase
         uid, email = self.firebase_service.buscar_usuario_por_nfc(nfc_id)
@@ -248,36 +337,65 @@ class ReciclajeApp:
             # Usuario válido - otorgar puntos
             self.ui.update_status(f"🔓 Usuario autenticado: {email}", "success")
             
-            # Actualizar puntos en Firebase
-            points_awarded = self.firebase_service.actualizar_puntos(uid, self.pending_material)
+            # Otorgar toda la canasta en una sola escritura
+            points_awarded = self.firebase_service.actualizar_puntos_lote(uid, claim.materials)
             
             if points_awarded > 0:
-                # Obtener información del usuario
-                user_data = self.firebase_service.get_user_data(uid)
-                if user_data:
-                    user_points = user_data.get("usuario_puntos", 0)
-                    user_name = user_data.get("usuario_nombre", "Usuario")
-                    self.ui.update_status(f"✅ {user_name} recibió {points_awarded} puntos! Total: {user_points}", "success")
+                # Obtener información del usuario (normalmente desde la caché)
+                user = self.firebase_service.get_user_summary(uid)
+                if user:
+                    self.ui.update_status(f"✅ {user['name']} recibió {points_awarded} puntos! Total: {user['points']}", "success")
+
+                if tapped_at is not None:
+                    latency_ms = (time.monotonic() - tapped_at) * 1000
+                    self.tap_latencies_ms.append(latency_ms)
+                    print(f"⏱️ Pase de tarjeta -> confirmación: {latency_ms:.0f} ms")
                 
-                # Eliminar imagen del material procesado
-                if self.pending_image_path:
-                    self.camera_service.delete_image(self.pending_image_path)
-                
-                # Limpiar material pendiente
-                self.pending_material = None
-                self.pending_points = 0
-                self.pending_image_path = None
-                self.ui.clear_pending_material()
-                
-                # La cámara ya está activa, solo actualizar UI
-                self.ui.update_status("🔄 Cámara activa - Detectando cambios...", "info")
-                self.ui.update_detection_status("🔄 Cámara activa - Detectando cambios...", "#3498db")
+                # Cerrar el reclamo y eliminar las imágenes de los materiales procesados
+                self.claim.finish_award(True)
+                for image_path in claim.image_paths:
+                    self.camera_service.delete_image(image_path)
+
+                # Materiales llegados durante el otorgamiento abren la canasta siguiente
+                next_claim = self.claim.get_pending()
+                if next_claim is not None:
+                    self.ui.update_pending_material(next_claim.describe(), next_claim.points)
+                else:
+                    self.ui.clear_pending_material()
+                    # La cámara ya está activa, solo actualizar UI
+                    self.ui.update_status("🔄 Cámara activa - Detectando cambios...", "info")
+                    self.ui.update_detection_status("🔄 Cámara activa - Detectando cambios...", "#3498db")
             else:
+                self.claim.finish_award(False)
                 self.ui.update_status("❌ Error otorgando puntos", "error")
         else:
+            # Volver a esperar tarjeta con el tiempo restante del reclamo
+            self.claim.finish_award(False)
             self.ui.update_status("❌ Usuario no válido", "error")
-            time.sleep(1.5)
-            self.ui.update_status(f"♻️ {self.pending_material.upper()} detectado! Pase su tarjeta NFC para recibir {self.pending_points} puntos (Tiempo límite: {POINTS_CLAIM_TIMEOUT}s)", "success")
+            # Restaurar el aviso tras 1.5 s sin bloquear el hilo del NFC
+            self.ui.call_later(1500, self._show_pending_claim_prompt)
+
+    def _show_pending_claim_prompt(self):
+        """Vuelve a mostrar el aviso de canasta pendiente, si sigue abierta"""
+        claim = self.claim.get_pending()
+        if claim is not None:
+            self.ui.update_status(f"♻️ {claim.describe().upper()} detectado! Pase su tarjeta NFC para recibir {claim.points} puntos (Tiempo límite: {POINTS_CLAIM_TIMEOUT}s)", "success")
+
+    def _on_claim_expired(self, claim):
+        """
+        Callback del temporizador cuando vence un reclamo sin tarjeta NFC
+
+        Args:
+            claim: Reclamo vencido
+        """
+        print(f"⏰ Timeout de puntos no reclamados: {claim.describe()} - Reiniciando sistema")
+        self.ui.update_status(f"⏰ Tiempo agotado para reclamar {claim.describe()} - Reiniciando sistema...", "warning")
+        if self.camera_service is not None:
+            for image_path in claim.image_paths:
+                self.camera_service.delete_image(image_path)
+
+        # Reiniciar sistema completo
+        self._restart_system()
 
     def _restart_system(self):
         """
@@ -285,59 +403,86 @@ class ReciclajeApp:
         """
         print("🔄 Reiniciando sistema...")
         
-        # Limpiar material pendiente si existe
-        if self.pending_material is not None:
-            # Eliminar imagen pendiente
-            if self.pending_image_path:
-                self.camera_service.delete_image(self.pending_image_path)
-            
-            self.pending_material = None
-            self.pending_points = 0
-            self.pending_material_time = 0
-            self.pending_image_path = None
-            self.ui.clear_pending_material()
+        # Descartar el reclamo pendiente si existe
+        self._discard_claim()
+        if self.camera_service is not None:
+            self.camera_service.reset_detection_state()
         
         # Limpiar sesión activa
         self.session_active = False
         self.current_user = None
         
-        # Reiniciar detección
-        self.detection_active = True
-        
         # Actualizar UI
         self.ui.update_status("🔄 Sistema reiniciado - Cámara activa, detectando cambios...", "info")
         self.ui.update_detection_status("🔄 Cámara activa - Detectando cambios...", "#3498db")
         
         print("✅ Sistema reiniciado exitosamente")
 
+    def _discard_claim(self):
+        """Descarta el reclamo activo y su imagen, y limpia la UI"""
+        claim = self.claim.reset()
+        if claim is not None:
+            for image_path in claim.image_paths:
+                self.camera_service.delete_image(image_path)
+        self.ui.clear_pending_material()
+
     def _end_session_by_empty(self):
         """
         Callback para cerrar la sesión cuando se detecta vacío prolongado
         """
-        # Limpiar material pendiente si existe
-        if self.pending_material is not None:
-            # Eliminar imagen pendiente
-            if self.pending_image_path:
-                self.camera_service.delete_image(self.pending_image_path)
-            
-            self.pending_material = None
-            self.pending_points = 0
-            self.pending_image_path = None
-            self.ui.clear_pending_material()
-        
+        # Con la detección continua la tolva queda vacía tras cada material: una
+        # canasta abierta solo la cierra su propio plazo o el pase de tarjeta
+        if self.claim.is_active():
+            return
+        if self.camera_service is not None:
+            self.camera_service.reset_detection_state()
+
         # La cámara ya está activa, solo actualizar UI
         self.ui.update_status("🔄 Cámara activa - Detectando cambios...", "info")
         self.ui.update_detection_status("🔄 Cámara activa - Detectando cambios...", "#3498db")
 
     def _on_closing(self):
         """Maneja el cierre de la aplicación"""
+        if not self.is_running:
+            # Cierre ya en curso (esperando al arranque)
+            return
         try:
             print("🔄 Cerrando aplicación...")
+            # Las etapas de arranque pendientes se cancelan al ver is_running en False
             self.is_running = False
+            self.claim.reset()
+            self._finish_closing()
+        except Exception as e:
+            print(f"❌ Error cerrando aplicación: {e}")
+            self.root.destroy()
+
+    def _finish_closing(self, waited_ms=0):
+        """
+        Libera los servicios y cierra la ventana cuando termina el arranque
+
+        Las etapas de arranque en curso pueden abrir la cámara o el lector, así
+        que se espera a que terminen consultando con after(), sin bloquear Tk.
+
+        Args:
+            waited_ms: Tiempo ya esperado en milisegundos
+        """
+        if (self.boot_thread is not None and self.boot_thread.is_alive()
+                and waited_ms < BOOT_CLOSE_WAIT_MS):
+            self.root.after(BOOT_CLOSE_POLL_MS, self._finish_closing, waited_ms + BOOT_CLOSE_POLL_MS)
+            return
+
+        try:
+            # Detener los monitores de tarjetas
+            if self.nfc_service is not None:
+                self.nfc_service.stop_monitoring()
             
             # Limpiar recursos de cámara
-            if hasattr(self, 'camera_service'):
+            if self.camera_service is not None:
                 self.camera_service.cleanup()
+
+            # Enviar escrituras pendientes a Firebase
+            if self.firebase_service is not None:
+                self.firebase_service.shutdown()
             
             # Cerrar ventana
             self.root.destroy()
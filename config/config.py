@@ -9,6 +9,23 @@ utilizadas en el sistema de reciclaje.
 import os
 import warnings
 
+
+# =========================
+# Utilidades de lectura de variables de entorno
+# =========================
+def _parse_roi(value):
+    """Interpreta CAMERA_ROI; un valor inválido usa el frame completo"""
+    try:
+        roi = tuple(float(v) for v in value.split(","))
+        x, y, w, h = roi
+        if not (0.0 <= x < 1.0 and 0.0 <= y < 1.0 and w > 0.0 and h > 0.0):
+            raise ValueError("fuera de rango")
+        return roi
+    except ValueError as e:
+        print(f"⚠️ CAMERA_ROI inválido ({value!r}: {e}), se usa el frame completo")
+        return (0.0, 0.0, 1.0, 1.0)
+
+
 # =========================
 # Configuración MQTT
 # =========================
@@ -23,12 +40,22 @@ MQTT_TOPIC = os.getenv("MQTT_TOPIC", "reciclaje/+/nivel")  # + = cualquier devic
 # =========================
 MQTT_MATERIAL_TOPIC = os.getenv("MQTT_MATERIAL_TOPIC", "material/detectado")  # Tópico para materiales detectados
 MQTT_ESP32_TOPIC = os.getenv("MQTT_ESP32_TOPIC", "reciclaje/esp32/command")  # Tópico para comandos a ESP32
+MQTT_MAX_INFLIGHT = 10  # publicaciones QoS 1 sin PUBACK como máximo
+MQTT_PUBLISH_QUEUE_MAX = 50  # publicaciones en espera de conexión (se descarta la más antigua)
+MQTT_PUBLISH_TIMEOUT = 5.0  # segundos tras los que un comando a la ESP32 se considera obsoleto
 
 # =========================
 # Configuración Firebase
 # =========================
 FIREBASE_DB_URL = os.getenv("FIREBASE_DB_URL", "https://resiclaje-39011-default-rtdb.firebaseio.com/")
 FIREBASE_CRED_PATH = os.getenv("FIREBASE_CRED_PATH", "config/resiclaje-39011-firebase-adminsdk-fbsvc-433ec62b6c.json")
+FIREBASE_FLUSH_INTERVAL = 1.0  # segundos que se acumulan cambios de contenedores antes de escribir
+FIREBASE_WRITE_QUEUE_MAX_PATHS = 32  # rutas distintas pendientes como máximo
+USER_CACHE_MAX_ENTRIES = 256  # tarjetas NFC recordadas en memoria
+USER_CACHE_TTL = 600  # segundos que se confía en un usuario cacheado
+USER_CACHE_NEGATIVE_TTL = 30  # segundos que se recuerda una tarjeta desconocida
+OUTBOX_DB_PATH = os.getenv("OUTBOX_DB_PATH", "data/outbox.sqlite3")  # Operaciones pendientes de enviar
+OUTBOX_RETRY_MAX_SECONDS = 30  # espera máxima entre reintentos sin conexión
 
 # =========================
 # Constantes del Sistema
@@ -52,6 +79,79 @@ SESSION_DURATION = 20  # segundos
 # =========================
 POINTS_CLAIM_TIMEOUT = 10  # segundos para reclamar puntos antes del reinicio
 
+# =========================
+# Configuración NFC
+# =========================
+NFC_DEBOUNCE_SECONDS = 2.0  # Pases repetidos de la misma tarjeta dentro de esta ventana se ignoran
+NFC_EVENT_QUEUE_MAX = 8  # Pases pendientes de procesar como máximo (se descarta el más antiguo)
+
+# =========================
+# Configuración de Cámara
+# =========================
+CAMERA_CAPTURE_WIDTH = int(os.getenv("CAMERA_CAPTURE_WIDTH", "640"))  # Resolución de captura para detección
+CAMERA_CAPTURE_HEIGHT = int(os.getenv("CAMERA_CAPTURE_HEIGHT", "480"))
+CAMERA_CAPTURE_FPS = int(os.getenv("CAMERA_CAPTURE_FPS", "30"))
+CAMERA_FOURCC = os.getenv("CAMERA_FOURCC", "MJPG")  # "" = formato por defecto de la cámara
+# Región de interés sobre la tolva como fracciones (x, y, ancho, alto) del frame
+CAMERA_ROI = _parse_roi(os.getenv("CAMERA_ROI", "0.0,0.0,1.0,1.0"))
+# Imagen de evidencia a resolución completa (reconfigura la cámara solo al guardar)
+CAMERA_EVIDENCE_FULL_RES = os.getenv("CAMERA_EVIDENCE_FULL_RES", "0") == "1"
+CAMERA_EVIDENCE_WIDTH = 1920
+CAMERA_EVIDENCE_HEIGHT = 1080
+CAMERA_FRAME_BUFFER_SIZE = 4  # Frames preasignados en el buffer circular de captura
+CAMERA_FRAME_WAIT_TIMEOUT = 0.5  # segundos máximos esperando un frame nuevo
+
+# =========================
+# Configuración de Imágenes de Evidencia
+# =========================
+EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "capturas")  # Carpeta propia de las evidencias
+EVIDENCE_JPEG_QUALITY = int(os.getenv("EVIDENCE_JPEG_QUALITY", "85"))
+# Ancho máximo guardado (0 = sin reducir); no se aplica con CAMERA_EVIDENCE_FULL_RES,
+# que captura a propósito a resolución completa
+EVIDENCE_MAX_WIDTH = int(os.getenv("EVIDENCE_MAX_WIDTH", "640"))
+EVIDENCE_MAX_FILES = 500  # Imágenes conservadas como máximo
+EVIDENCE_MAX_MB = 200  # Espacio máximo en disco
+EVIDENCE_MAX_AGE_HOURS = 24  # Edad máxima de una imagen
+EVIDENCE_QUEUE_SIZE = 8  # Escrituras pendientes como máximo (con la cola llena se descarta la imagen nueva)
+
+# =========================
+# Configuración de Votación Temporal de Detecciones
+# =========================
+DETECTION_WINDOW = 5  # Frames recientes considerados
+DETECTION_MIN_VOTES = 3  # Frames de la ventana que deben coincidir (k de n)
+DETECTION_EMA_ALPHA = 0.6  # Peso del frame más reciente en la media móvil
+DETECTION_CONFIDENCE_THRESHOLD = 0.85  # Confianza suavizada mínima para decidir
+DETECTION_MAX_GAP_SECONDS = 2.5  # Sin frames clasificados durante más tiempo, la evidencia se descarta
+
+# =========================
+# Configuración del Filtro de Movimiento
+# =========================
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") == "1"  # Solo clasificar si la escena cambia
+MOTION_GATE_SIZE = (64, 48)  # Tamaño del frame reducido en escala de grises
+MOTION_PIXEL_THRESHOLD = 25  # Diferencia de gris (0-255) para considerar un píxel cambiado
+MOTION_CHANGED_FRACTION = 0.02  # Fracción de píxeles cambiados que activa la clasificación
+MOTION_HOLD_SECONDS = 1.0  # Segundos que se sigue clasificando tras un cambio
+MOTION_HEARTBEAT_SECONDS = 2.0  # Inferencia periódica aunque no haya cambios
+MOTION_REFERENCE_LEARNING_RATE = 0.1  # Adaptación de la referencia de tolva vacía
+
+# =========================
+# Configuración de Inferencia (TensorFlow Lite)
+# =========================
+TFLITE_NUM_THREADS = int(os.getenv("TFLITE_NUM_THREADS", "4"))  # Núcleos usados por el intérprete
+TFLITE_USE_XNNPACK = os.getenv("TFLITE_USE_XNNPACK", "1") == "1"  # Delegado XNNPACK si el runtime lo incluye
+TFLITE_XNNPACK_DELEGATE_PATH = os.getenv("TFLITE_XNNPACK_DELEGATE_PATH", "")  # Librería externa opcional
+TFLITE_SELF_CHECK_RUNS = 10  # Inferencias del autochequeo de latencia al arrancar
+INFERENCE_WORKER_ENABLED = os.getenv("INFERENCE_WORKER_ENABLED", "0") == "1"  # Modelo en un proceso aparte
+INFERENCE_WORKER_TIMEOUT = 2.0  # Espera máxima de una inferencia en el proceso aparte (segundos)
+INFERENCE_WORKER_START_TIMEOUT = 30.0  # Espera máxima para cargar el modelo en el proceso aparte
+
+# =========================
+# Configuración de Audio
+# =========================
+AUDIO_SOUNDS_DIR = "sounds"  # Sonidos que se precargan en memoria al arrancar
+AUDIO_CHANNELS = 2  # Canales del mezclador reservados para los avisos
+AUDIO_CUES = {"plastico": "plastico1.mp3", "aluminio": "aluminio1.mp3"}  # Sonido por material
+
 # =========================
 # Configuración de UI
 # =========================
@@ -60,6 +160,9 @@ WINDOW_SIZE = "320x480"  # Resolución para LCD TFT
 WINDOW_BG_COLOR = '#2c3e50'
 FRAME_BG_COLOR = '#34495e'
 TEXT_COLOR = '#ecf0f1'
+UI_REFRESH_MS = 50  # Intervalo de drenado de la cola de actualizaciones de UI (~20 fps)
+ACTIVITY_LOG_MAX_LINES = 200  # Líneas conservadas en el log de actividad
+ACTIVITY_LOG_REFRESH_MS = 250  # Intervalo de volcado por lotes del log al widget
 
 # =========================
 # Configuración para Pantalla Pequeña
@@ -1,15 +1,202 @@
-# Crear archivo: convert_model.py
+"""
+Conversión del Modelo de IA a TensorFlow Lite
+=============================================
+
+Convierte modelo/keras_model.h5 a TensorFlow Lite en modo float32, float16 o
+INT8 completo (cuantización post-entrenamiento con un dataset representativo
+de imágenes capturadas en la tolva) y genera un reporte comparativo de
+precisión y latencia frente al modelo float.
+
+Uso:
+    python convert_model.py                                   # float32 -> modelo/model.tflite
+    python convert_model.py --mode float16
+    python convert_model.py --mode int8 --dataset capturas/ --report
+
+El dataset puede ser una carpeta plana de imágenes (solo calibración) o tener
+subcarpetas por etiqueta (vacio/, aluminio/, plastico/) para el reporte.
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
 import tensorflow as tf
 
-# Cargar el modelo Keras
-model = tf.keras.models.load_model('modelo/keras_model.h5')
+from services.inference_engine import TFLiteInferenceEngine, KerasInferenceEngine, create_tflite_interpreter
+
+KERAS_MODEL_PATH = "modelo/keras_model.h5"
+LABELS_PATH = "modelo/labels.txt"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+DEFAULT_OUTPUTS = {
+    "float32": "modelo/model.tflite",
+    "float16": "modelo/model_float16.tflite",
+    "int8": "modelo/model_int8.tflite",
+}
+
+
+def load_labels(path=LABELS_PATH):
+    """Carga las etiquetas del modelo ("0 vacio" -> "vacio")"""
+    with open(path, "r") as f:
+        return [line[2:].strip().lower() for line in f if line.strip()]
+
+
+def find_images(dataset_dir):
+    """Lista recursivamente las imágenes de una carpeta"""
+    images = []
+    for root, _, files in os.walk(dataset_dir):
+        for filename in sorted(files):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.join(root, filename))
+    return images
+
+
+def find_labeled_images(dataset_dir, labels):
+    """Lista (ruta, índice de etiqueta) usando subcarpetas con el nombre de cada etiqueta"""
+    labeled = []
+    for index, label in enumerate(labels):
+        label_dir = os.path.join(dataset_dir, label)
+        if os.path.isdir(label_dir):
+            labeled.extend((path, index) for path in find_images(label_dir))
+    return labeled
+
+
+def representative_dataset(image_paths, max_samples):
+    """Generador de calibración con el mismo preprocesado que en producción"""
+    for path in image_paths[:max_samples]:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        image = cv2.resize(image, (224, 224), interpolation=cv2.INTER_AREA)
+        yield [(image.astype(np.float32)[np.newaxis] / 127.5) - 1]
+
+
+def convert(model, mode, image_paths, max_samples):
+    """
+    Convierte el modelo Keras a TensorFlow Lite
+
+    Args:
+        model: Modelo Keras cargado
+        mode: "float32" | "float16" | "int8"
+        image_paths: Imágenes para calibrar la cuantización INT8
+        max_samples: Máximo de imágenes de calibración
+
+    Returns:
+        bytes: Modelo TensorFlow Lite serializado
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if mode == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        if not image_paths:
+            raise SystemExit("❌ El modo int8 requiere --dataset con imágenes de la tolva")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: representative_dataset(image_paths, max_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+
+    return converter.convert()
+
+
+def measure_latency(engine, runs=20):
+    """Mide la latencia media por inferencia sobre un frame vacío"""
+    frame = np.zeros((224, 224, 3), dtype=np.uint8)
+    engine.predict(frame)
+    start = time.perf_counter()
+    for _ in range(runs):
+        engine.predict(frame)
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def evaluate(engine, labeled_images):
+    """
+    Mide precisión y latencia media de un motor de inferencia
+
+    Returns:
+        tuple: (precisión 0-1 o None, latencia media en ms)
+    """
+    correct = 0
+    total = 0
+    elapsed = 0.0
+    for path, expected in labeled_images:
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        start = time.perf_counter()
+        prediction = engine.predict(image)
+        elapsed += time.perf_counter() - start
+        correct += int(np.argmax(prediction)) == expected
+        total += 1
+
+    if total == 0:
+        return None, measure_latency(engine)
+    return correct / total, elapsed * 1000 / total
+
+
+def print_report(rows):
+    """Imprime la comparación lado a lado de los modelos evaluados"""
+    print("\n📊 Reporte de conversión")
+    print(f"{'Modelo':<32}{'Tamaño':>10}{'Precisión':>12}{'Latencia':>12}")
+    for name, size_kb, accuracy, latency_ms in rows:
+        accuracy_text = f"{accuracy * 100:.1f}%" if accuracy is not None else "n/d"
+        size_text = f"{size_kb:.0f} KB" if size_kb is not None else "-"
+        print(f"{name:<32}{size_text:>10}{accuracy_text:>12}{latency_ms:>9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte el modelo Keras a TensorFlow Lite")
+    parser.add_argument("--mode", choices=sorted(DEFAULT_OUTPUTS), default="float32",
+                        help="Tipo de conversión (por defecto float32)")
+    parser.add_argument("--dataset", help="Carpeta de imágenes capturadas en la tolva")
+    parser.add_argument("--output", help="Ruta del modelo .tflite generado")
+    parser.add_argument("--samples", type=int, default=200, help="Máximo de imágenes de calibración INT8")
+    parser.add_argument("--threads", type=int, default=4, help="Hilos de inferencia para el reporte")
+    parser.add_argument("--report", action="store_true", help="Comparar precisión y latencia con el modelo float")
+    args = parser.parse_args()
+
+    output_path = args.output or DEFAULT_OUTPUTS[args.mode]
+    image_paths = find_images(args.dataset) if args.dataset else []
+
+    # Cargar el modelo Keras
+    model = tf.keras.models.load_model(KERAS_MODEL_PATH, compile=False)
+
+    # Convertir a TensorFlow Lite
+    tflite_model = convert(model, args.mode, image_paths, args.samples)
+
+    # Guardar el modelo convertido
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+
+    print(f"✅ Modelo convertido a TensorFlow Lite ({args.mode}): {output_path}")
+
+    if not args.report:
+        return
+
+    labels = load_labels()
+    labeled_images = find_labeled_images(args.dataset, labels) if args.dataset else []
+    if not labeled_images:
+        print(f"⚠️ Sin subcarpetas {'/'.join(labels)} en el dataset - el reporte solo incluye latencia")
+
+    rows = []
+    accuracy, latency = evaluate(KerasInferenceEngine(model), labeled_images)
+    rows.append(("keras (referencia)", os.path.getsize(KERAS_MODEL_PATH) / 1024, accuracy, latency))
+
+    candidates = [("tflite float32", DEFAULT_OUTPUTS["float32"])]
+    if output_path != DEFAULT_OUTPUTS["float32"]:
+        candidates.append((f"tflite {args.mode}", output_path))
+
+    for name, path in candidates:
+        if not os.path.exists(path):
+            continue
+        interpreter, _ = create_tflite_interpreter(tf.lite, path, num_threads=args.threads)
+        accuracy, latency = evaluate(TFLiteInferenceEngine(interpreter), labeled_images)
+        rows.append((name, os.path.getsize(path) / 1024, accuracy, latency))
 
-# Convertir a TensorFlow Lite
-converter = tf.lite.TFLiteConverter.from_keras_model(model)
-tflite_model = converter.convert()
+    print_report(rows)
 
-# Guardar el modelo convertido
-with open('modelo/model.tflite', 'wb') as f:
-    f.write(tflite_model)
 
-print("✅ Modelo convertido a TensorFlow Lite")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Gestor de Avisos de Audio para el Sistema de Reciclaje Inteligente
+=================================================================
+
+Este módulo decodifica una sola vez, al arrancar, los sonidos de la carpeta
+sounds/ en objetos pygame.mixer.Sound (PCM en memoria) y los reproduce en
+canales reservados sin bloquear. Así la detección nunca lee ni decodifica
+MP3 en su camino crítico, y se pueden registrar sonidos nuevos por material.
+"""
+
+import os
+
+AUDIO_EXTENSIONS = (".mp3", ".ogg", ".wav")
+
+
+class AudioCueManager:
+    """Sonidos precargados por material, reproducidos en canales dedicados"""
+
+    def __init__(self, sounds_dir="sounds", channels=2, cues=None):
+        """
+        Inicializa el gestor de audio (sin abrir el dispositivo)
+
+        Args:
+            sounds_dir: Carpeta con los archivos de sonido
+            channels: Canales del mezclador reservados para los avisos
+            cues: Diccionario material -> archivo dentro de sounds_dir
+        """
+        self.sounds_dir = sounds_dir
+        self.num_channels = max(1, int(channels))
+        self.default_cues = dict(cues or {})
+        self.available = False
+
+        self.mixer = None
+        self.sounds = {}  # nombre de archivo -> Sound decodificado
+        self.cues = {}  # material -> Sound
+        self._channels = []
+        self._next_channel = 0
+
+    def init(self):
+        """
+        Abre el mezclador y precarga todos los sonidos de sounds_dir
+
+        Returns:
+            bool: True si el audio quedó disponible
+        """
+        try:
+            import pygame
+            pygame.mixer.init()
+            self.mixer = pygame.mixer
+
+            # Reservar canales para que nada más los ocupe
+            if self.mixer.get_num_channels() < self.num_channels:
+                self.mixer.set_num_channels(self.num_channels)
+            self.mixer.set_reserved(self.num_channels)
+            self._channels = [self.mixer.Channel(i) for i in range(self.num_channels)]
+
+            self._preload_sounds()
+            for material, filename in self.default_cues.items():
+                if filename in self.sounds:
+                    self.cues[material] = self.sounds[filename]
+                else:
+                    print(f"❌ No se encuentra el archivo: {os.path.join(self.sounds_dir, filename)}")
+
+            self.available = True
+            print(f"🔊 Audio listo: {len(self.sounds)} sonidos precargados, {self.num_channels} canales")
+
+        except Exception as e:
+            self.available = False
+            print(f"⚠️ Audio no disponible: {e}")
+
+        return self.available
+
+    def _preload_sounds(self):
+        """Decodifica a memoria todos los sonidos de la carpeta"""
+        if not os.path.isdir(self.sounds_dir):
+            return
+
+        for filename in sorted(os.listdir(self.sounds_dir)):
+            if not filename.lower().endswith(AUDIO_EXTENSIONS):
+                continue
+            path = os.path.join(self.sounds_dir, filename)
+            try:
+                self.sounds[filename] = self.mixer.Sound(path)
+            except Exception as e:
+                print(f"❌ Error cargando {path}: {e}")
+
+    def register_cue(self, material, sound):
+        """
+        Asocia un sonido a un material
+
+        Args:
+            material: Material (p. ej. "plastico")
+            sound: Nombre de archivo en sounds_dir, ruta a un archivo o un Sound ya cargado
+
+        Returns:
+            bool: True si el sonido quedó registrado
+        """
+        if not self.available:
+            return False
+
+        try:
+            if isinstance(sound, str):
+                if sound in self.sounds:
+                    sound = self.sounds[sound]
+                else:
+                    path = sound if os.path.exists(sound) else os.path.join(self.sounds_dir, sound)
+                    loaded = self.mixer.Sound(path)
+                    self.sounds[os.path.basename(path)] = loaded
+                    sound = loaded
+            self.cues[material] = sound
+            return True
+
+        except Exception as e:
+            print(f"❌ Error registrando sonido para {material}: {e}")
+            return False
+
+    def has_cue(self, material):
+        """Verifica si el material tiene un sonido asociado"""
+        return material in self.cues
+
+    def play(self, material):
+        """
+        Reproduce el sonido de un material sin bloquear
+
+        Usa un canal reservado libre; si todos están ocupados, interrumpe el
+        de uso más antiguo.
+
+        Args:
+            material: Material detectado
+
+        Returns:
+            bool: True si se inició la reproducción
+        """
+        if not self.available:
+            return False
+
+        sound = self.cues.get(material)
+        if sound is None:
+            return False
+
+        channel = next((c for c in self._channels if not c.get_busy()), None)
+        if channel is None:
+            channel = self._channels[self._next_channel]
+            self._next_channel = (self._next_channel + 1) % len(self._channels)
+
+        try:
+            channel.play(sound)
+            return True
+        except Exception as e:
+            print(f"❌ Error reproduciendo sonido de {material}: {e}")
+            return False
+
+    def get_info(self):
+        """
+        Obtiene información del gestor de audio
+
+        Returns:
+            dict: Disponibilidad, sonidos precargados y materiales con sonido
+        """
+        return {
+            "available": self.available,
+            "channels": self.num_channels,
+            "sounds": sorted(self.sounds),
+            "cues": sorted(self.cues)
+        }
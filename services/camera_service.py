@@ -9,26 +9,46 @@ import cv2
 import numpy as np
 import os
 import time
-import pygame
-from datetime import datetime
-
-# Imports compatibles con Python 3.11.2 y TensorFlow Lite
-try:
-    # Intentar importar TensorFlow Lite primero (para Raspberry Pi)
-    import tflite_runtime.interpreter as tflite
-    TFLITE_AVAILABLE = True
-    print("✅ TensorFlow Lite disponible")
-except ImportError:
-    TFLITE_AVAILABLE = False
-    print("⚠️ TensorFlow Lite no disponible, intentando TensorFlow completo...")
+from config.config import (
+    CAMERA_CAPTURE_WIDTH, CAMERA_CAPTURE_HEIGHT, CAMERA_CAPTURE_FPS, CAMERA_FOURCC, CAMERA_ROI,
+    CAMERA_EVIDENCE_FULL_RES, CAMERA_EVIDENCE_WIDTH, CAMERA_EVIDENCE_HEIGHT,
+    CAMERA_FRAME_BUFFER_SIZE, CAMERA_FRAME_WAIT_TIMEOUT,
+    EVIDENCE_DIR, EVIDENCE_JPEG_QUALITY, EVIDENCE_MAX_WIDTH, EVIDENCE_MAX_FILES,
+    EVIDENCE_MAX_MB, EVIDENCE_MAX_AGE_HOURS, EVIDENCE_QUEUE_SIZE,
+    TFLITE_NUM_THREADS, TFLITE_USE_XNNPACK, TFLITE_XNNPACK_DELEGATE_PATH, TFLITE_SELF_CHECK_RUNS,
+    INFERENCE_WORKER_ENABLED, INFERENCE_WORKER_TIMEOUT, INFERENCE_WORKER_START_TIMEOUT,
+    MOTION_GATE_ENABLED, MOTION_GATE_SIZE, MOTION_PIXEL_THRESHOLD, MOTION_CHANGED_FRACTION,
+    MOTION_HOLD_SECONDS, MOTION_HEARTBEAT_SECONDS, MOTION_REFERENCE_LEARNING_RATE,
+    DETECTION_WINDOW, DETECTION_MIN_VOTES, DETECTION_EMA_ALPHA, DETECTION_CONFIDENCE_THRESHOLD,
+    DETECTION_MAX_GAP_SECONDS,
+    AUDIO_SOUNDS_DIR, AUDIO_CHANNELS, AUDIO_CUES
+)
+from services.audio_service import AudioCueManager
+from services.evidence_store import EvidenceStore
+from services.frame_grabber import FrameGrabber
+from services.inference_worker import InferenceWorker, InferenceWorkerUnavailable
+from services.motion_gate import MotionGate
+from services.detection_aggregator import DetectionAggregator
+from services.inference_engine import (
+    ClassificationResult, TFLiteInferenceEngine, KerasInferenceEngine, create_tflite_interpreter, import_tflite
+)
+
+
+def _import_keras_loader():
+    """
+    Importa TensorFlow completo bajo demanda (solo si hace falta el modelo Keras)
+
+    Returns:
+        function: tensorflow.keras.models.load_model o None si no está disponible
+    """
     try:
         from tensorflow.keras.models import load_model
-        import tensorflow as tf
-        TF_AVAILABLE = True
         print("✅ TensorFlow completo disponible")
+        return load_model
     except ImportError:
-        TF_AVAILABLE = False
-        print("❌ Ni TensorFlow Lite ni TensorFlow completo están disponibles")
+        print("❌ TensorFlow completo no está disponible")
+        return None
+
 
 # Configurar numpy para evitar notación científica
 np.set_printoptions(suppress=True)
@@ -37,18 +57,26 @@ np.set_printoptions(suppress=True)
 class CameraService:
     """Servicio para manejar la cámara y clasificación de materiales con IA"""
 
-    def __init__(self, status_callback=None):
+    def __init__(self, status_callback=None, autostart=True):
         """
         Inicializa el servicio de cámara
 
         Args:
             status_callback: Función callback para actualizar el estado en la UI
+            autostart: Si es False, audio, cámara y modelo se inician después con
+                init_audio(), start_camera() y load_model() (p. ej. en paralelo)
         """
         self.status_callback = status_callback
         self.camera_available = False
         self.model_loaded = False
+        self.tflite_available = False
+        self.tf_available = False
         self.model = None
         self.interpreter = None  # Para TensorFlow Lite
+        self.inference_engine = None  # Motor de inferencia creado al cargar el modelo
+        self.inference_delegate = None  # Delegado usado por el intérprete
+        self.inference_latency_ms = None  # Latencia medida en el autochequeo
+        self.inference_worker = None  # Proceso de inferencia aparte (INFERENCE_WORKER_ENABLED)
         self.class_names = []
         self.model_type = None  # 'tflite' o 'keras'
 
@@ -66,25 +94,80 @@ class CameraService:
         self.last_detected_material = None
         self.last_detection_time = 0
         self.detection_cooldown = 3  # 3 segundos entre detecciones del mismo material
+        self.latched_material = None  # Material ya contado; se rearma al ver la tolva vacía
+        self.last_classification = None  # Último ClassificationResult obtenido
+        self._aggregator_reset_requested = False
+
+        # Votación temporal sobre los últimos frames (reemplaza el umbral de un solo frame)
+        self.detection_aggregator = DetectionAggregator(
+            window=DETECTION_WINDOW,
+            min_votes=DETECTION_MIN_VOTES,
+            ema_alpha=DETECTION_EMA_ALPHA,
+            threshold=DETECTION_CONFIDENCE_THRESHOLD,
+            max_gap_seconds=DETECTION_MAX_GAP_SECONDS
+        )
         
         # Variables para cámara continua
         self.camera_cap = None  # Objeto de cámara que se mantiene abierto
         self.camera_continuously_active = False
+        self.frame_grabber = None  # Hilo de captura con buffer circular
+        self.last_frame_seq = 0  # Secuencia del último frame procesado
+        self.roi = CAMERA_ROI  # Región de interés (fracciones x, y, ancho, alto)
+        self._roi_bounds = None  # Límites en píxeles de la ROI para el tamaño de frame actual
+        self._roi_shape = None
+
+        # Filtro de movimiento previo a la IA (None = clasificar todos los frames)
+        self.motion_gate = None
+        if MOTION_GATE_ENABLED:
+            self.motion_gate = MotionGate(
+                size=MOTION_GATE_SIZE,
+                pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                changed_fraction=MOTION_CHANGED_FRACTION,
+                hold_seconds=MOTION_HOLD_SECONDS,
+                heartbeat_seconds=MOTION_HEARTBEAT_SECONDS,
+                learning_rate=MOTION_REFERENCE_LEARNING_RATE
+            )
+
+        # Imágenes de evidencia: carpeta propia, escritura en segundo plano y cuotas
+        self.evidence_store = EvidenceStore(
+            EVIDENCE_DIR,
+            jpeg_quality=EVIDENCE_JPEG_QUALITY,
+            max_width=0 if CAMERA_EVIDENCE_FULL_RES else EVIDENCE_MAX_WIDTH,
+            max_files=EVIDENCE_MAX_FILES,
+            max_bytes=EVIDENCE_MAX_MB * 1024 * 1024,
+            max_age_seconds=EVIDENCE_MAX_AGE_HOURS * 3600,
+            queue_size=EVIDENCE_QUEUE_SIZE
+        )
+
+        # Audio (pygame se importa al inicializarlo)
+        self.audio_available = False
+        self.audio = AudioCueManager(AUDIO_SOUNDS_DIR, channels=AUDIO_CHANNELS, cues=AUDIO_CUES)
+
+        if autostart:
+            self.start()
+
+    def start(self):
+        """Inicializa audio, cámara y modelo de forma secuencial"""
+        self.init_audio()
+        self.start_camera()
+        self.load_model()
+
+    def init_audio(self):
+        """Inicializa el mezclador y precarga los sonidos en memoria"""
+        self.audio_available = self.audio.init()
+        return self.audio_available
 
-        # Inicializar pygame mixer para audio
-        try:
-            pygame.mixer.init()
-            self.audio_available = True
-        except Exception as e:
-            self.audio_available = False
-            print(f"⚠️ Audio no disponible: {e}")
-
-        # Verificar disponibilidad de cámara y modelo
+    def start_camera(self):
+        """Verifica la cámara e inicia la captura continua"""
+        self.evidence_store.start()
         self._check_camera_availability()
-        self._load_ai_model()
-        
-        # Iniciar cámara continua
         self._start_continuous_camera()
+        return self.camera_continuously_active
+
+    def load_model(self):
+        """Carga el modelo de IA y las etiquetas"""
+        self._load_ai_model()
+        return self.model_loaded
 
     def _check_camera_availability(self):
         """Verifica si la cámara está disponible"""
@@ -122,13 +205,27 @@ class CameraService:
             print(f"✅ Etiquetas cargadas: {len(self.class_names)} clases")
 
             # Intentar cargar modelo TensorFlow Lite primero (recomendado para Raspberry Pi)
-            if TFLITE_AVAILABLE and os.path.exists("modelo/model.tflite"):
+            tflite = import_tflite() if os.path.exists("modelo/model.tflite") else None
+            self.tflite_available = tflite is not None
+            if tflite is not None and INFERENCE_WORKER_ENABLED and self._start_inference_worker():
+                return
+            if tflite is not None:
                 try:
-                    self.interpreter = tflite.Interpreter(model_path="modelo/model.tflite")
-                    self.interpreter.allocate_tensors()
+                    self.interpreter, self.inference_delegate = create_tflite_interpreter(
+                        tflite, "modelo/model.tflite",
+                        num_threads=TFLITE_NUM_THREADS,
+                        use_xnnpack=TFLITE_USE_XNNPACK,
+                        delegate_path=TFLITE_XNNPACK_DELEGATE_PATH
+                    )
+                    self.inference_engine = TFLiteInferenceEngine(self.interpreter)
                     self.model_type = 'tflite'
                     self.model_loaded = True
                     print("✅ Modelo TensorFlow Lite cargado correctamente")
+
+                    # Autochequeo de latencia con la configuración elegida
+                    self.inference_latency_ms = self.inference_engine.benchmark(TFLITE_SELF_CHECK_RUNS)
+                    print(f"⏱️ Autochequeo IA: {self.inference_latency_ms:.1f} ms/inferencia "
+                          f"({TFLITE_NUM_THREADS} hilos, delegado: {self.inference_delegate})")
                     if self.status_callback:
                         self.status_callback("🤖 Modelo TensorFlow Lite cargado", "success")
                     return
@@ -136,10 +233,13 @@ class CameraService:
                     print(f"⚠️ Error cargando TensorFlow Lite: {e}")
 
             # Intentar cargar modelo Keras si TensorFlow Lite no está disponible
-            if TF_AVAILABLE and os.path.exists("modelo/keras_model.h5"):
+            keras_load_model = _import_keras_loader() if os.path.exists("modelo/keras_model.h5") else None
+            self.tf_available = keras_load_model is not None
+            if keras_load_model is not None:
                 try:
                     # Intentar cargar con configuración estándar
-                    self.model = load_model("modelo/keras_model.h5", compile=False)
+                    self.model = keras_load_model("modelo/keras_model.h5", compile=False)
+                    self.inference_engine = KerasInferenceEngine(self.model)
                     self.model_type = 'keras'
                     self.model_loaded = True
                     print("✅ Modelo Keras cargado correctamente")
@@ -174,7 +274,8 @@ class CameraService:
                             'Dense': custom_dense
                         }
 
-                        self.model = load_model("modelo/keras_model.h5", compile=False, custom_objects=custom_objects)
+                        self.model = keras_load_model("modelo/keras_model.h5", compile=False, custom_objects=custom_objects)
+                        self.inference_engine = KerasInferenceEngine(self.model)
                         self.model_type = 'keras'
                         self.model_loaded = True
                         print("✅ Modelo Keras cargado con custom_objects")
@@ -196,34 +297,71 @@ class CameraService:
             if self.status_callback:
                 self.status_callback(f"❌ Error cargando IA: {e}", "error")
 
-    def capture_image(self, save_path=None):
+    def get_latest_frame(self, after_seq=None, timeout=None):
         """
-        Captura una imagen de la cámara continua
+        Obtiene el frame más reciente del buffer circular sin copiarlo
+
+        El frame devuelto debe liberarse con release() (o usarse en un bloque
+        with) para que el hilo de captura pueda reutilizar su slot.
 
         Args:
-            save_path: Ruta donde guardar la imagen (opcional)
+            after_seq: Si se indica, espera un frame más nuevo que esta secuencia
+            timeout: Tiempo máximo de espera en segundos
 
         Returns:
-            str: Ruta de la imagen capturada o None si falla
+            FrameSnapshot: Frame con secuencia y timestamp, o None si no hay frame
+        """
+        if not self.camera_continuously_active or self.frame_grabber is None:
+            return None
+        return self.frame_grabber.get_latest(after_seq=after_seq, timeout=timeout)
+
+    def capture_frame(self):
+        """
+        Captura una copia del frame más reciente sin escribirlo a disco
+
+        Returns:
+            numpy.ndarray: Frame BGR capturado o None si falla
         """
         try:
-            if not self.camera_continuously_active or self.camera_cap is None:
+            if not self.camera_continuously_active or self.frame_grabber is None:
                 if self.status_callback:
                     self.status_callback("❌ Cámara continua no disponible", "error")
                 return None
 
-            # Capturar frame de la cámara continua
-            ret, frame = self.camera_cap.read()
-
-            if not ret or frame is None:
+            snapshot = self.frame_grabber.get_latest()
+            if snapshot is None:
                 if self.status_callback:
                     self.status_callback("❌ Error capturando frame", "error")
                 return None
 
-            # Generar nombre de archivo si no se proporciona
+            with snapshot:
+                return snapshot.frame.copy()
+
+        except Exception as e:
+            if self.status_callback:
+                self.status_callback(f"❌ Error capturando imagen: {e}", "error")
+            return None
+
+    def save_image(self, frame, save_path=None):
+        """
+        Guarda un frame en disco como JPEG
+
+        Sin save_path la imagen va al almacén de evidencias: se retorna la ruta
+        de inmediato y la codificación y escritura ocurren en segundo plano.
+
+        Args:
+            frame: Frame BGR a guardar
+            save_path: Ruta donde guardar la imagen (opcional, escritura síncrona)
+
+        Returns:
+            str: Ruta de la imagen guardada o None si falla
+        """
+        try:
+            if frame is None:
+                return None
+
             if save_path is None:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                save_path = f"captura_{timestamp}.jpg"
+                return self.evidence_store.save(frame)
 
             # Guardar imagen
             success = cv2.imwrite(save_path, frame)
@@ -237,98 +375,169 @@ class CameraService:
 
         except Exception as e:
             if self.status_callback:
-                self.status_callback(f"❌ Error capturando imagen: {e}", "error")
+                self.status_callback(f"❌ Error guardando imagen: {e}", "error")
+            return None
+
+    def capture_image(self, save_path=None):
+        """
+        Captura una imagen de la cámara continua y la guarda en disco
+
+        Args:
+            save_path: Ruta donde guardar la imagen (opcional)
+
+        Returns:
+            str: Ruta de la imagen capturada o None si falla
+        """
+        frame = self.capture_frame()
+        if frame is None:
             return None
+        return self.save_image(frame, save_path)
 
     def classify_material(self, image_path):
         """
-        Clasifica el material en la imagen usando IA - Compatible con Python 3.11.2
+        Clasifica el material de una imagen guardada en disco
 
         Args:
             image_path: Ruta de la imagen a clasificar
 
         Returns:
-            str: Tipo de material ("plastico" | "aluminio" | "vacio")
+            ClassificationResult: Resultado de la clasificación
         """
+        image = cv2.imread(image_path)
+        if image is None:
+            raise Exception("No se pudo cargar la imagen")
+
+        return self.classify_frame(image)
+
+    def classify_frame(self, frame):
+        """
+        Clasifica el material directamente desde un frame en memoria
+
+        No aplica ningún umbral de confianza: la decisión queda en manos del
+        llamador (p. ej. result.is_confident(0.95) o la votación temporal).
+
+        Args:
+            frame: Frame BGR (numpy.ndarray) tal como lo entrega la cámara
+
+        Returns:
+            ClassificationResult: Clase, material, confianza, probabilidades y tiempo
+        """
+        start = time.perf_counter()
+        prediction = self.predict_probabilities(frame)
+        inference_ms = (time.perf_counter() - start) * 1000
+
+        index = int(np.argmax(prediction))
+        label = self._class_name(index)
         try:
-            if not self.model_loaded:
-                if self.status_callback:
-                    self.status_callback("❌ Modelo de IA no disponible", "error")
-                raise Exception("Modelo de IA no está cargado")
+            material = self._map_class_to_material(label)
+        except Exception:
+            material = None
+
+        return ClassificationResult(
+            index=index,
+            label=label,
+            material=material,
+            confidence=float(prediction[index]),
+            probabilities=prediction.copy(),
+            inference_ms=inference_ms,
+            timestamp=time.time()
+        )
+
+    def _start_inference_worker(self):
+        """
+        Carga el modelo TensorFlow Lite en un proceso aparte
 
-            if self.status_callback:
-                self.status_callback("🤖 Clasificando material con IA...", "info")
+        Returns:
+            bool: True si el proceso quedó listo; si no, se usa la inferencia en este proceso
+        """
+        worker = InferenceWorker(
+            "modelo/model.tflite",
+            max_frame_size=(CAMERA_CAPTURE_WIDTH, CAMERA_CAPTURE_HEIGHT),
+            num_threads=TFLITE_NUM_THREADS,
+            use_xnnpack=TFLITE_USE_XNNPACK,
+            delegate_path=TFLITE_XNNPACK_DELEGATE_PATH,
+            timeout=INFERENCE_WORKER_TIMEOUT,
+            start_timeout=INFERENCE_WORKER_START_TIMEOUT
+        )
+        try:
+            worker.start(TFLITE_SELF_CHECK_RUNS)
+        except Exception as e:
+            print(f"⚠️ Error iniciando el proceso de inferencia, se usará este proceso: {e}")
+            return False
 
-            # Cargar y procesar la imagen
-            image = cv2.imread(image_path)
-            if image is None:
-                raise Exception("No se pudo cargar la imagen")
+        self.inference_worker = worker
+        self.inference_engine = worker
+        self.inference_delegate = worker.delegate
+        self.inference_latency_ms = worker.latency_ms
+        self.model_type = 'tflite'
+        self.model_loaded = True
+        print(f"⏱️ Autochequeo IA (proceso aparte): {self.inference_latency_ms:.1f} ms/inferencia "
+              f"({TFLITE_NUM_THREADS} hilos, delegado: {self.inference_delegate})")
+        if self.status_callback:
+            self.status_callback("🤖 Modelo TensorFlow Lite cargado (proceso aparte)", "success")
+        return True
 
-            # Redimensionar la imagen a 224x224 píxeles
-            image = cv2.resize(image, (224, 224), interpolation=cv2.INTER_AREA)
+    def predict_probabilities(self, frame):
+        """
+        Ejecuta el modelo sobre un frame y devuelve el vector de probabilidades
 
-            # Convertir a array numpy y reestructurar para el modelo
-            image = np.asarray(image, dtype=np.float32).reshape(1, 224, 224, 3)
+        Args:
+            frame: Frame BGR (numpy.ndarray) tal como lo entrega la cámara
 
-            # Normalizar la imagen
-            image = (image / 127.5) - 1
+        Returns:
+            numpy.ndarray: Probabilidad por clase (buffer reutilizado entre llamadas)
+        """
+        if not self.model_loaded or self.inference_engine is None:
+            raise Exception("Modelo de IA no está cargado")
 
-            # Realizar predicción según el tipo de modelo
-            if self.model_type == 'tflite':
-                # Usar TensorFlow Lite
-                input_details = self.interpreter.get_input_details()
-                output_details = self.interpreter.get_output_details()
-                
-                # Configurar entrada
-                self.interpreter.set_tensor(input_details[0]['index'], image)
-                
-                # Ejecutar inferencia
-                self.interpreter.invoke()
-                
-                # Obtener resultado
-                prediction = self.interpreter.get_tensor(output_details[0]['index'])
-                index = np.argmax(prediction[0])
-                confidence_score = prediction[0][index]
-                
-            elif self.model_type == 'keras':
-                # Usar Keras/TensorFlow
-                prediction = self.model.predict(image, verbose=0)
-                index = np.argmax(prediction)
-                confidence_score = prediction[0][index]
-            else:
-                raise Exception("Tipo de modelo no reconocido")
+        if frame is None:
+            raise Exception("Frame vacío")
 
-            # Obtener nombre de clase
-            if index < len(self.class_names):
-                class_name = self.class_names[index]
-                # Limpiar el nombre de la clase
-                clean_class_name = class_name[2:].strip().lower()
-            else:
-                raise Exception(f"Índice de clase fuera de rango: {index} (máximo: {len(self.class_names)-1})")
+        # Recortar la región de la tolva (vista, sin copia) y predecir
+        return self.inference_engine.predict(self._crop_roi(frame))
 
-            # Verificar nivel de confianza mínimo (95%)
-            confidence_percent = np.round(confidence_score * 100)
-            if confidence_percent < 95:
-                if self.status_callback:
-                    self.status_callback(f"⚠️ Confianza insuficiente: {confidence_percent}% (mínimo 95%)", "warning")
-                print(f"⚠️ Confianza insuficiente: {confidence_percent}% (mínimo 95%)")
-                raise Exception(f"Confianza insuficiente: {confidence_percent}% (mínimo 95%)")
+    def _class_name(self, index):
+        """
+        Obtiene el nombre limpio de una clase del modelo
 
-            # Mapear a los tipos de material del sistema
-            material = self._map_class_to_material(clean_class_name)
+        Args:
+            index: Índice de la clase
 
-            if self.status_callback:
-                self.status_callback(f"✅ Material: {material} (Confianza: {confidence_percent}%)", "success")
+        Returns:
+            str: Nombre de la clase en minúsculas (p. ej. "plastico")
+        """
+        if index < len(self.class_names):
+            # "2 plastico\n" -> "plastico"
+            return self.class_names[index][2:].strip().lower()
+        raise Exception(f"Índice de clase fuera de rango: {index} (máximo: {len(self.class_names)-1})")
 
-            print(f"🤖 Clasificación IA: {clean_class_name} -> {material} (Confianza: {confidence_percent}%)")
+    def _crop_roi(self, frame):
+        """
+        Recorta la región de interés configurada sobre la tolva
 
-            return material
+        Args:
+            frame: Frame BGR completo
 
-        except Exception as e:
-            if self.status_callback:
-                self.status_callback(f"❌ Error clasificando material: {e}", "error")
-            print(f"❌ Error en clasificación IA: {e}")
-            raise e
+        Returns:
+            numpy.ndarray: Vista del frame limitada a la ROI (sin copia)
+        """
+        if self.roi is None or tuple(self.roi) == (0.0, 0.0, 1.0, 1.0):
+            return frame
+
+        # Recalcular límites solo si cambió el tamaño del frame
+        shape = frame.shape[:2]
+        if shape != self._roi_shape:
+            height, width = shape
+            x, y, w, h = self.roi
+            x0 = min(max(int(x * width), 0), width - 1)
+            y0 = min(max(int(y * height), 0), height - 1)
+            x1 = min(max(int((x + w) * width), x0 + 1), width)
+            y1 = min(max(int((y + h) * height), y0 + 1), height)
+            self._roi_bounds = (x0, y0, x1, y1)
+            self._roi_shape = shape
+
+        x0, y0, x1, y1 = self._roi_bounds
+        return frame[y0:y1, x0:x1]
 
     def _map_class_to_material(self, class_name):
         """
@@ -355,32 +564,78 @@ class CameraService:
     def process_material_detection(self):
         """
         Proceso completo de detección de material:
-        1. Captura imagen
-        2. Clasifica material
-        3. Reproduce audio si es necesario
+        1. Captura frame en memoria
+        2. Clasifica material por votación sobre los últimos frames
+        3. Guarda la imagen solo si el material es válido para puntos
+        4. Reproduce audio si es necesario
 
         Returns:
             tuple: (material_type, image_path) o (None, None) si falla
         """
         try:
-            # Capturar imagen
-            image_path = self.capture_image()
-            if not image_path:
+            # Obtener el frame más reciente del hilo de captura (sin copia)
+            snapshot = self.get_latest_frame(after_seq=self.last_frame_seq, timeout=CAMERA_FRAME_WAIT_TIMEOUT)
+            if snapshot is None:
                 return None, None
 
-            # Clasificar material
-            material = self.classify_material(image_path)
+            with snapshot:
+                self.last_frame_seq = snapshot.seq
+                frame = snapshot.frame
 
-            # Verificar si es un cambio significativo
-            if not self.is_significant_change(material):
-                # No es un cambio significativo, no procesar
-                return None, None
-
-            # Actualizar estado de detección
-            self.update_detection_state(material)
+                # Omitir la IA si la tolva no cambió (salvo heartbeat periódico)
+                if self.motion_gate is not None and not self.motion_gate.should_classify(self._crop_roi(frame)):
+                    return None, None
 
-            # Verificar vacío prolongado para cerrar sesión
-            self._check_empty_timeout(material)
+                # Acumular evidencia de varios frames antes de decidir
+                try:
+                    result = self.classify_frame(frame)
+                except InferenceWorkerUnavailable:
+                    # El proceso de inferencia se está relanzando: sin resultado en este frame
+                    return None, None
+                self.last_classification = result
+                if self._aggregator_reset_requested:
+                    self._aggregator_reset_requested = False
+                    self.detection_aggregator.reset()
+                decision = self.detection_aggregator.update(result.probabilities)
+                if decision is None:
+                    return None, None
+
+                index, confidence = decision
+                material = self._map_class_to_material(self._class_name(index))
+
+                # Aprender la referencia de tolva vacía
+                if self.motion_gate is not None and material == "vacio":
+                    self.motion_gate.learn_empty()
+
+                # Rearme: el mismo objeto no se cuenta dos veces mientras siga en la tolva
+                if material == "vacio":
+                    self.latched_material = None
+                elif material == self.latched_material:
+                    return None, None
+
+                # Verificar si es un cambio significativo
+                if not self.is_significant_change(material):
+                    # No es un cambio significativo, no procesar
+                    return None, None
+
+                print(f"🤖 Detección estable: {material} (Confianza: {confidence * 100:.0f}%)")
+
+                # Actualizar estado de detección
+                self.update_detection_state(material)
+                if self.is_valid_material_for_points(material):
+                    self.latched_material = material
+
+                # Verificar vacío prolongado para cerrar sesión
+                self._check_empty_timeout(material)
+
+                # Guardar imagen solo cuando se convierte en material pendiente
+                image_path = None
+                if self.is_valid_material_for_points(material) and not CAMERA_EVIDENCE_FULL_RES:
+                    image_path = self.save_image(frame)
+
+            # Evidencia a resolución completa (fuera del frame reservado)
+            if self.is_valid_material_for_points(material) and CAMERA_EVIDENCE_FULL_RES:
+                image_path = self.save_image(self.capture_full_resolution_frame())
 
             # Reproducir audio si es necesario
             self._play_audio_for_material(material)
@@ -420,34 +675,18 @@ class CameraService:
             print(f"⏰ 6 segundos pasados para: {clean_material}")
 
         if should_play:
-            audio_file = None
-
-            if "plastico" in clean_material:
-                audio_file = "sounds/plastico1.mp3"
-            elif "aluminio" in clean_material:
-                audio_file = "sounds/aluminio1.mp3"
-            elif "vacio" in clean_material:
-                # Para vacío, actualizar pero no reproducir audio
+            if not self.audio.has_cue(clean_material):
+                # Sin sonido registrado (p. ej. vacío): actualizar pero no reproducir
                 self.last_prediction = clean_material
                 self.last_audio_time = current_time
-                print(f"🔇 Vacío detectado - sin audio")
+                print(f"🔇 {clean_material} detectado - sin audio")
                 return
 
-            # Reproducir el audio si hay archivo definido
-            if audio_file:
-                if os.path.exists(audio_file):
-                    try:
-                        pygame.mixer.music.load(audio_file)
-                        pygame.mixer.music.play()
-                        self.last_audio_time = current_time
-                        self.last_prediction = clean_material
-                        print(f"🔊 Reproduciendo: {audio_file}")
-                    except Exception as e:
-                        print(f"❌ Error reproduciendo {audio_file}: {e}")
-                else:
-                    print(f"❌ No se encuentra el archivo: {audio_file}")
-                    self.last_prediction = clean_material
-                    self.last_audio_time = current_time
+            # Sonido ya decodificado en memoria: la reproducción no bloquea
+            if self.audio.play(clean_material):
+                print(f"🔊 Reproduciendo aviso: {clean_material}")
+            self.last_audio_time = current_time
+            self.last_prediction = clean_material
         else:
             # No reproducir, solo actualizar la predicción actual
             if clean_material == self.last_prediction:
@@ -458,30 +697,6 @@ class CameraService:
             # Actualizar last_prediction incluso si no reproduce audio
             self.last_prediction = clean_material
 
-    def cleanup_old_images(self, max_age_hours=24):
-        """
-        Limpia imágenes antiguas para liberar espacio
-
-        Args:
-            max_age_hours: Edad máxima de las imágenes en horas
-        """
-        try:
-            current_time = datetime.now().timestamp()
-            max_age_seconds = max_age_hours * 3600
-
-            # Buscar archivos de imagen
-            for filename in os.listdir("."):
-                if filename.startswith("captura_") and filename.endswith(".jpg"):
-                    file_path = os.path.join(".", filename)
-                    file_age = current_time - os.path.getmtime(file_path)
-
-                    if file_age > max_age_seconds:
-                        os.remove(file_path)
-                        print(f"🗑️ Imagen antigua eliminada: {filename}")
-
-        except Exception as e:
-            print(f"❌ Error limpiando imágenes: {e}")
-
     def is_camera_available(self):
         """Verifica si la cámara está disponible"""
         return self.camera_available
@@ -533,8 +748,12 @@ class CameraService:
             "model_type": self.model_type,
             "classes": len(self.class_names) if self.class_names else 0,
             "class_names": [name.strip() for name in self.class_names] if self.class_names else [],
-            "tflite_available": TFLITE_AVAILABLE,
-            "tf_available": TF_AVAILABLE
+            "tflite_available": self.tflite_available,
+            "tf_available": self.tf_available,
+            "num_threads": TFLITE_NUM_THREADS if self.model_type == 'tflite' else None,
+            "delegate": self.inference_delegate,
+            "latency_ms": self.inference_latency_ms,
+            "worker": self.inference_worker.get_stats() if self.inference_worker else None
         }
 
     def get_audio_info(self):
@@ -547,7 +766,8 @@ class CameraService:
         return {
             "available": self.audio_available,
             "cooldown": self.audio_cooldown,
-            "last_prediction": self.last_prediction
+            "last_prediction": self.last_prediction,
+            **self.audio.get_info()
         }
 
     def set_session_end_callback(self, callback):
@@ -642,6 +862,15 @@ class CameraService:
         self.last_detected_material = material
         self.last_detection_time = time.time()
 
+    def reset_detection_state(self):
+        """
+        Descarta la evidencia acumulada del agregador (p. ej. al reiniciar la sesión)
+
+        Puede llamarse desde cualquier hilo: el reinicio se aplica en el hilo de
+        detección antes del siguiente frame.
+        """
+        self._aggregator_reset_requested = True
+
     def get_detection_stats(self):
         """
         Obtiene estadísticas de detección
@@ -658,7 +887,12 @@ class CameraService:
             "detection_cooldown": self.detection_cooldown,
             "camera_active": self.camera_available,
             "camera_continuously_active": self.camera_continuously_active,
-            "model_loaded": self.model_loaded
+            "model_loaded": self.model_loaded,
+            "last_frame_seq": self.last_frame_seq,
+            "frame_grabber": self.frame_grabber.get_stats() if self.frame_grabber else None,
+            "motion_gate": self.motion_gate.get_stats() if self.motion_gate else None,
+            "evidence_store": self.evidence_store.get_stats(),
+            "last_classification": repr(self.last_classification) if self.last_classification else None
         }
 
     def is_camera_continuously_active(self):
@@ -675,14 +909,15 @@ class CameraService:
                 for camera_index in camera_indices:
                     self.camera_cap = cv2.VideoCapture(camera_index)
                     if self.camera_cap.isOpened():
-                        # Configurar resolución para Logitech Brio
-                        self.camera_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-                        self.camera_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-                        self.camera_cap.set(cv2.CAP_PROP_FPS, 30)
+                        # Configurar perfil de captura (cercano a la resolución del modelo)
+                        self._apply_capture_profile(CAMERA_CAPTURE_WIDTH, CAMERA_CAPTURE_HEIGHT)
                         
                         # Verificar que realmente funciona
                         ret, frame = self.camera_cap.read()
                         if ret and frame is not None:
+                            # Hilo dedicado que vacía la cámara al buffer circular
+                            self.frame_grabber = FrameGrabber(self.camera_cap, CAMERA_FRAME_BUFFER_SIZE)
+                            self.frame_grabber.start(frame)
                             self.camera_continuously_active = True
                             print(f"✅ Cámara continua iniciada en índice {camera_index}")
                             if self.status_callback:
@@ -704,11 +939,61 @@ class CameraService:
             if self.status_callback:
                 self.status_callback(f"❌ Error cámara continua: {e}", "error")
 
+    def _apply_capture_profile(self, width, height):
+        """
+        Aplica formato, resolución y FPS a la cámara continua
+
+        Args:
+            width: Ancho de captura en píxeles
+            height: Alto de captura en píxeles
+        """
+        # El FOURCC debe configurarse antes de la resolución en V4L2
+        if CAMERA_FOURCC:
+            self.camera_cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAMERA_FOURCC))
+        self.camera_cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.camera_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.camera_cap.set(cv2.CAP_PROP_FPS, CAMERA_CAPTURE_FPS)
+
+    def capture_full_resolution_frame(self):
+        """
+        Captura un frame a resolución completa para la imagen de evidencia
+
+        Reconfigura la cámara temporalmente y vuelve al perfil de detección.
+
+        Returns:
+            numpy.ndarray: Frame BGR a resolución completa o None si falla
+        """
+        if self.frame_grabber is None or self.camera_cap is None:
+            return None
+
+        if not self.frame_grabber.stop():
+            # El hilo de captura sigue dentro de read(): no leer la cámara en paralelo
+            print("⚠️ Captura ocupada, se omite la evidencia a resolución completa")
+            self.frame_grabber.start()
+            return None
+
+        try:
+            self._apply_capture_profile(CAMERA_EVIDENCE_WIDTH, CAMERA_EVIDENCE_HEIGHT)
+            ret, frame = self.camera_cap.read()
+            return frame if ret else None
+        except Exception as e:
+            print(f"❌ Error capturando evidencia a resolución completa: {e}")
+            return None
+        finally:
+            self._apply_capture_profile(CAMERA_CAPTURE_WIDTH, CAMERA_CAPTURE_HEIGHT)
+            self.frame_grabber.start()
+
     def _stop_continuous_camera(self):
         """Detiene la cámara continua"""
         try:
-            if self.camera_cap is not None:
+            if self.frame_grabber is not None:
+                # El capturador libera la cámara (o la deja al hilo si sigue en read())
+                if not self.frame_grabber.close():
+                    print("⚠️ Hilo de captura ocupado: liberará la cámara al terminar su lectura")
+                self.frame_grabber = None
+            elif self.camera_cap is not None:
                 self.camera_cap.release()
+            if self.camera_cap is not None:
                 self.camera_cap = None
                 self.camera_continuously_active = False
                 print("📷 Cámara continua detenida")
@@ -743,6 +1028,10 @@ class CameraService:
             image_path: Ruta de la imagen a eliminar
         """
         try:
+            if image_path and self.evidence_store.contains(image_path):
+                self.evidence_store.delete(image_path)
+                print(f"🗑️ Imagen eliminada: {image_path}")
+                return True
             if image_path and os.path.exists(image_path):
                 os.remove(image_path)
                 print(f"🗑️ Imagen eliminada: {image_path}")
@@ -754,36 +1043,26 @@ class CameraService:
             print(f"❌ Error eliminando imagen {image_path}: {e}")
             return False
 
-    def cleanup_old_images(self, max_age_hours=1):
+    def cleanup_old_images(self, max_age_hours=EVIDENCE_MAX_AGE_HOURS):
         """
-        Limpia imágenes antiguas para liberar espacio
+        Limpia imágenes de evidencia antiguas para liberar espacio
 
         Args:
-            max_age_hours: Edad máxima de las imágenes en horas
+            max_age_hours: Edad mínima de las imágenes eliminadas en horas (0 = todas)
         """
-        try:
-            current_time = datetime.now().timestamp()
-            max_age_seconds = max_age_hours * 3600
-
-            # Buscar archivos de imagen
-            for filename in os.listdir("."):
-                if filename.startswith("captura_") and filename.endswith(".jpg"):
-                    file_path = os.path.join(".", filename)
-                    file_age = current_time - os.path.getmtime(file_path)
-
-                    if file_age > max_age_seconds:
-                        os.remove(file_path)
-                        print(f"🗑️ Imagen antigua eliminada: {filename}")
-
-        except Exception as e:
-            print(f"❌ Error limpiando imágenes: {e}")
+        removed = self.evidence_store.purge(max_age_hours * 3600)
+        if removed:
+            print(f"🗑️ {removed} imágenes antiguas eliminadas")
 
     def cleanup(self):
         """Limpia recursos al cerrar la aplicación"""
         try:
             self._stop_continuous_camera()
             # Limpiar todas las imágenes al cerrar
+            self.evidence_store.stop(flush=False)
             self.cleanup_old_images(0)  # Eliminar todas las imágenes
+            if self.inference_worker:
+                self.inference_worker.stop()
             print("🧹 Recursos de cámara limpiados")
         except Exception as e:
             print(f"❌ Error limpiando recursos: {e}")
@@ -0,0 +1,270 @@
+"""
+Máquina de Estados del Reclamo de Puntos para el Sistema de Reciclaje Inteligente
+================================================================================
+
+Este módulo modela el ciclo de vida de una canasta de materiales detectados
+que espera ser reclamada con una tarjeta NFC:
+
+    IDLE -> AWAITING_NFC -> AWARDING -> AWARDED
+                 |              |
+                 |              +-> AWAITING_NFC (si falla el otorgamiento)
+                 +-> EXPIRED (temporizador) -> IDLE (tras el callback)
+
+Mientras se espera la tarjeta, cada material nuevo se agrega a la canasta y
+reinicia el plazo; los que llegan durante un otorgamiento pasan a la canasta
+siguiente. Todas las transiciones se hacen bajo un mismo lock, de modo que los hilos de
+cámara, NFC y temporizador no pueden pisarse. El vencimiento lo dispara un
+temporizador (sin sondeo periódico) y tanto el reloj como la fábrica de
+temporizadores son inyectables para probar la lógica sin esperas reales.
+"""
+
+import time
+import threading
+
+IDLE = "idle"
+AWAITING_NFC = "awaiting_nfc"
+AWARDING = "awarding"
+AWARDED = "awarded"
+EXPIRED = "expired"
+
+
+class ClaimItem:
+    """Material detectado dentro de una canasta"""
+
+    __slots__ = ("material", "points", "image_path", "detected_at")
+
+    def __init__(self, material, points, image_path, detected_at):
+        self.material = material
+        self.points = points
+        self.image_path = image_path
+        self.detected_at = detected_at
+
+    def __repr__(self):
+        return f"ClaimItem({self.material}, {self.points} pts)"
+
+
+class PendingClaim:
+    """Canasta de materiales pendiente de reclamar"""
+
+    __slots__ = ("items", "opened_at")
+
+    def __init__(self, items, opened_at):
+        self.items = list(items)
+        self.opened_at = opened_at
+
+    @property
+    def points(self):
+        """Puntos totales de la canasta"""
+        return sum(item.points for item in self.items)
+
+    @property
+    def materials(self):
+        """Materiales de la canasta en orden de detección"""
+        return [item.material for item in self.items]
+
+    @property
+    def image_paths(self):
+        """Imágenes de evidencia de la canasta"""
+        return [item.image_path for item in self.items if item.image_path]
+
+    def describe(self):
+        """Resumen legible de la canasta (p. ej. "2 plastico + 1 aluminio")"""
+        counts = {}
+        for material in self.materials:
+            counts[material] = counts.get(material, 0) + 1
+        if len(self.items) == 1:
+            return self.items[0].material
+        return " + ".join(f"{count} {material}" for material, count in counts.items())
+
+    def __len__(self):
+        return len(self.items)
+
+    def __repr__(self):
+        return f"PendingClaim({self.describe()}, {self.points} pts)"
+
+
+class ClaimSession:
+    """Estado del reclamo de puntos, seguro entre hilos y dirigido por temporizador"""
+
+    def __init__(self, timeout, on_expired=None, clock=time.monotonic, timer_factory=threading.Timer):
+        """
+        Inicializa la máquina de estados
+
+        Args:
+            timeout: Segundos para reclamar los puntos antes de que venza el reclamo
+            on_expired: Función(PendingClaim) llamada al vencer un reclamo
+            clock: Función que retorna el tiempo actual en segundos
+            timer_factory: Fábrica compatible con threading.Timer(intervalo, función, args)
+        """
+        self.timeout = timeout
+        self.on_expired = on_expired
+        self.clock = clock
+        self.timer_factory = timer_factory
+
+        self.state = IDLE
+        self.claim = None
+        self.deadline = None
+        self._carry = []  # Materiales detectados durante un otorgamiento
+        self._timer = None
+        self._generation = 0  # Invalida temporizadores de reclamos anteriores
+        self._condition = threading.Condition()
+
+    def _start_timer(self, delay):
+        """Programa el vencimiento del reclamo actual (llamar con el lock tomado)"""
+        self._generation += 1
+        self.deadline = self.clock() + delay
+        self._timer = self.timer_factory(delay, self._on_timer, args=(self._generation,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self):
+        """Cancela el temporizador pendiente (llamar con el lock tomado)"""
+        self._generation += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def detect(self, material, points, image_path=None):
+        """
+        Agrega un material detectado a la canasta y (re)inicia la espera de tarjeta
+
+        Args:
+            material: Material detectado
+            points: Puntos a otorgar
+            image_path: Ruta de la imagen de evidencia (opcional)
+
+        Returns:
+            PendingClaim: Canasta que recibirá el material, o None si se descartó
+            (reclamo venciendo en ese instante)
+        """
+        with self._condition:
+            item = ClaimItem(material, points, image_path, self.clock())
+
+            if self.state == AWARDING:
+                # La canasta actual ya se está otorgando: guardar para la siguiente
+                self._carry.append(item)
+                return PendingClaim(self._carry, item.detected_at)
+            if self.state == EXPIRED:
+                return None
+
+            if self.state == AWAITING_NFC:
+                self.claim.items.append(item)
+                self._cancel_timer()
+            else:
+                self.claim = PendingClaim([item], item.detected_at)
+                self.state = AWAITING_NFC
+            self._start_timer(self.timeout)
+            self._condition.notify_all()
+            return self.claim
+
+    def begin_award(self):
+        """
+        Reserva el reclamo para otorgarlo tras leer una tarjeta NFC
+
+        Detiene el temporizador mientras dura el otorgamiento, para que el
+        reclamo no venza a mitad de la consulta a Firebase.
+
+        Returns:
+            PendingClaim: Reclamo reservado, o None si no hay ninguno esperando
+        """
+        with self._condition:
+            if self.state != AWAITING_NFC:
+                return None
+            self._cancel_timer()
+            self.state = AWARDING
+            self._condition.notify_all()
+            return self.claim
+
+    def finish_award(self, success):
+        """
+        Cierra el otorgamiento iniciado con begin_award
+
+        Args:
+            success: True si los puntos se otorgaron
+
+        Returns:
+            PendingClaim: Canasta otorgada (si success) o None
+        """
+        with self._condition:
+            if self.state != AWARDING:
+                return None
+            carry, self._carry = self._carry, []
+
+            if not success:
+                # Volver a esperar tarjeta, con los materiales llegados mientras tanto
+                self.claim.items.extend(carry)
+                remaining = self.timeout if carry else max(0.0, self.deadline - self.clock())
+                self.state = AWAITING_NFC
+                self._start_timer(remaining)
+                self._condition.notify_all()
+                return None
+
+            claim = self.claim
+            self.deadline = None
+            if carry:
+                # Abrir de inmediato la canasta siguiente
+                self.claim = PendingClaim(carry, carry[0].detected_at)
+                self.state = AWAITING_NFC
+                self._start_timer(self.timeout)
+            else:
+                self.claim = None
+                self.state = AWARDED
+            self._condition.notify_all()
+            return claim
+
+    def _on_timer(self, generation):
+        """Vence el reclamo si el temporizador sigue siendo el vigente"""
+        with self._condition:
+            if generation != self._generation or self.state != AWAITING_NFC:
+                return
+            claim = self.claim
+            self.claim = None
+            self.deadline = None
+            self._timer = None
+            self.state = EXPIRED
+            self._condition.notify_all()
+
+        try:
+            if self.on_expired:
+                self.on_expired(claim)
+        finally:
+            # No se abren reclamos nuevos hasta terminar la limpieza del vencido
+            with self._condition:
+                if self.state == EXPIRED:
+                    self.state = IDLE
+                    self._condition.notify_all()
+
+    def reset(self):
+        """
+        Descarta el reclamo actual (si lo hay) y vuelve a IDLE
+
+        Returns:
+            PendingClaim: Canasta descartada (incluidos materiales en espera) o None
+        """
+        with self._condition:
+            self._cancel_timer()
+            claim = self.claim
+            if self._carry:
+                claim = PendingClaim((claim.items if claim else []) + self._carry, self.clock())
+                self._carry = []
+            self.claim = None
+            self.deadline = None
+            self.state = IDLE
+            self._condition.notify_all()
+            return claim
+
+    def is_active(self):
+        """True si hay un reclamo esperando tarjeta, en otorgamiento o venciendo"""
+        return self.state in (AWAITING_NFC, AWARDING, EXPIRED)
+
+    def get_pending(self):
+        """Reclamo actual o None"""
+        with self._condition:
+            return self.claim
+
+    def remaining(self):
+        """Segundos que quedan para reclamar, o None si no hay temporizador activo"""
+        with self._condition:
+            if self.state != AWAITING_NFC or self.deadline is None:
+                return None
+            return max(0.0, self.deadline - self.clock())
@@ -0,0 +1,99 @@
+"""
+Agregador Temporal de Detecciones para el Sistema de Reciclaje Inteligente
+=========================================================================
+
+Este módulo combina los vectores de probabilidad de los últimos N frames
+mediante una media móvil exponencial y una votación k-de-n. Una decisión solo
+se emite cuando la evidencia acumulada es suficiente, lo que evita que un
+único frame erróneo mueva los compartimientos de la ESP32 y permite decidir
+sin esperar a un frame aislado con confianza muy alta.
+"""
+
+import time
+import numpy as np
+
+
+class DetectionAggregator:
+    """Ventana deslizante de probabilidades con EMA y votación k-de-n"""
+
+    def __init__(self, window=5, min_votes=3, ema_alpha=0.6, threshold=0.85, max_gap_seconds=None):
+        """
+        Inicializa el agregador
+
+        Args:
+            window: Número de frames recientes considerados en la votación
+            min_votes: Frames de la ventana que deben coincidir con la clase ganadora
+            ema_alpha: Peso del frame más reciente en la media móvil exponencial
+            threshold: Confianza mínima de la media móvil para emitir una decisión
+            max_gap_seconds: Pausa entre frames tras la cual se descarta la evidencia (None = nunca)
+        """
+        self.window = max(1, int(window))
+        self.min_votes = min(max(1, int(min_votes)), self.window)
+        self.ema_alpha = np.float32(ema_alpha)
+        self.threshold = threshold
+        self.max_gap_seconds = max_gap_seconds
+
+        # Buffers asignados con el primer vector (número de clases)
+        self._ema = None
+        self._votes = np.full(self.window, -1, dtype=np.int32)
+        self._position = 0
+        self._count = 0
+        self._last_update = None
+
+    def update(self, probabilities, now=None):
+        """
+        Añade el vector de probabilidades de un frame
+
+        Args:
+            probabilities: Vector de probabilidades por clase del frame actual
+            now: Instante del frame (time.monotonic; opcional, para pruebas)
+
+        Returns:
+            tuple: (índice de clase, confianza suavizada) si hay decisión estable, o None
+        """
+        now = time.monotonic() if now is None else now
+        if (self.max_gap_seconds is not None and self._last_update is not None
+                and now - self._last_update > self.max_gap_seconds):
+            # Evidencia de antes de una pausa (compuerta de movimiento, sesión nueva)
+            self.reset()
+        self._last_update = now
+
+        if self._ema is None or self._ema.shape[0] != len(probabilities):
+            self._ema = np.array(probabilities, dtype=np.float32)
+        else:
+            # ema = alpha * p + (1 - alpha) * ema, en el mismo buffer
+            self._ema *= (1 - self.ema_alpha)
+            self._ema += self.ema_alpha * np.asarray(probabilities, dtype=np.float32)
+
+        self._votes[self._position] = int(np.argmax(probabilities))
+        self._position = (self._position + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+        index = int(np.argmax(self._ema))
+        confidence = float(self._ema[index])
+        votes = int(np.count_nonzero(self._votes == index))
+
+        if votes >= self.min_votes and confidence >= self.threshold:
+            return index, confidence
+        return None
+
+    def reset(self):
+        """Descarta la evidencia acumulada"""
+        self._ema = None
+        self._votes.fill(-1)
+        self._position = 0
+        self._count = 0
+        self._last_update = None
+
+    def get_state(self):
+        """
+        Obtiene el estado actual del agregador
+
+        Returns:
+            dict: Media móvil, votos recientes y frames acumulados
+        """
+        return {
+            "ema": self._ema.tolist() if self._ema is not None else None,
+            "votes": [int(v) for v in self._votes if v >= 0],
+            "frames": self._count
+        }
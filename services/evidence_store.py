@@ -0,0 +1,308 @@
+"""
+Almacén de Imágenes de Evidencia para el Sistema de Reciclaje Inteligente
+========================================================================
+
+Este módulo guarda las imágenes de evidencia de los materiales detectados en
+una carpeta propia. La codificación JPEG y la escritura en la tarjeta SD se
+hacen en un hilo dedicado, de modo que la detección nunca espera al disco, y
+un índice en memoria (ordenado por antigüedad) aplica las cuotas de cantidad,
+tamaño y edad descartando siempre la imagen más antigua en O(1).
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import cv2
+
+
+class EvidenceStore:
+    """Carpeta de evidencias con escritura en segundo plano y cuotas"""
+
+    def __init__(self, directory="capturas", jpeg_quality=85, max_width=0, max_files=500,
+                 max_bytes=200 * 1024 * 1024, max_age_seconds=24 * 3600, queue_size=8):
+        """
+        Inicializa el almacén (sin tocar el disco)
+
+        Args:
+            directory: Carpeta donde se guardan las imágenes
+            jpeg_quality: Calidad JPEG (0-100)
+            max_width: Ancho máximo de la imagen guardada (0 = sin reducir)
+            max_files: Máximo de imágenes conservadas
+            max_bytes: Tamaño total máximo en bytes
+            max_age_seconds: Edad máxima de una imagen en segundos
+            queue_size: Escrituras pendientes como máximo (si se llena, se descarta la imagen nueva)
+        """
+        self.directory = directory
+        self.jpeg_quality = int(jpeg_quality)
+        self.max_width = int(max_width)
+        self.max_files = max(1, int(max_files))
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.queue_size = max(1, int(queue_size))
+        self.is_running = False
+        self.thread = None
+
+        self._pending = OrderedDict()  # ruta -> imagen por escribir
+        self._index = OrderedDict()  # ruta -> (bytes, instante de escritura), de la más antigua a la más nueva
+        self._total_bytes = 0
+        self._writing = None  # Ruta que el hilo de escritura está guardando
+        self._cancelled = set()  # Rutas eliminadas mientras se escribían
+        self._condition = threading.Condition()
+        self._counter = 0
+
+        # Estadísticas
+        self.written = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    def start(self):
+        """Crea la carpeta, indexa las imágenes existentes e inicia el hilo de escritura"""
+        if self.is_running:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+        self._enforce_quota()
+
+        self.is_running = True
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, flush=True, timeout=2.0):
+        """
+        Detiene el hilo de escritura
+
+        Args:
+            flush: Si se escriben las imágenes pendientes antes de salir
+            timeout: Tiempo máximo de espera en segundos
+        """
+        with self._condition:
+            self.is_running = False
+            if not flush:
+                self._pending.clear()
+            self._condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def _load_index(self):
+        """Indexa las imágenes ya presentes en la carpeta (una sola vez al arrancar)"""
+        entries = []
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if filename.endswith(".jpg.tmp"):
+                # Escritura interrumpida por un cierre inesperado
+                self._remove_file(path)
+                continue
+            if not filename.endswith(".jpg"):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+
+        with self._condition:
+            for mtime, path, size in sorted(entries):
+                self._index[path] = (size, mtime)
+                self._total_bytes += size
+
+    def _next_path(self):
+        """Genera un nombre único (llamar con el lock tomado)"""
+        self._counter += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        return os.path.join(self.directory, f"captura_{timestamp}_{self._counter % 1000:03d}.jpg")
+
+    def save(self, frame):
+        """
+        Encola una imagen para guardarla y retorna su ruta de inmediato
+
+        El frame se copia (o se reduce, que también copia), así que el llamador
+        puede reutilizar su buffer en cuanto la función retorna. Si la cola de
+        escritura está llena se descarta esta imagen y no una ya encolada, cuya
+        ruta el llamador ya tiene (p. ej. en una canasta pendiente).
+
+        Args:
+            frame: Frame BGR
+
+        Returns:
+            str: Ruta donde quedará la imagen, o None si el almacén no está activo o la cola está llena
+        """
+        if frame is None or not self.is_running:
+            return None
+
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            size = (self.max_width, int(height * self.max_width / width))
+            image = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            image = frame.copy()
+
+        with self._condition:
+            if len(self._pending) >= self.queue_size:
+                self.dropped += 1
+                path = None
+            else:
+                path = self._next_path()
+                self._pending[path] = image
+                self._condition.notify()
+
+        if path is None:
+            print("⚠️ Cola de evidencias llena, imagen descartada")
+        return path
+
+    def _writer_loop(self):
+        """Codifica y escribe las imágenes pendientes, en orden de llegada"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or not self.is_running)
+                if not self._pending:
+                    return
+                path, image = self._pending.popitem(last=False)
+                self._writing = path
+
+            self._write(path, image)
+
+    def _write(self, path, image):
+        """Escribe una imagen de forma atómica y la agrega al índice"""
+        try:
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                raise Exception("codificación JPEG fallida")
+
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(encoded.tobytes())
+            os.replace(temp_path, path)
+
+            with self._condition:
+                self._writing = None
+                cancelled = path in self._cancelled
+                self._cancelled.discard(path)
+                if not cancelled:
+                    self._index[path] = (len(encoded), time.time())
+                    self._total_bytes += len(encoded)
+
+            if cancelled:
+                self._remove_file(path)
+                return
+            self.written += 1
+            self._enforce_quota()
+
+        except Exception as e:
+            with self._condition:
+                self._writing = None
+                self._cancelled.discard(path)
+            print(f"❌ Error guardando imagen {path}: {e}")
+
+    def _enforce_quota(self):
+        """Elimina las imágenes más antiguas hasta cumplir cantidad, tamaño y edad"""
+        now = time.time()
+        while True:
+            with self._condition:
+                if not self._index:
+                    return
+                path, (size, written_at) = next(iter(self._index.items()))
+                over_quota = (
+                    len(self._index) > self.max_files
+                    or self._total_bytes > self.max_bytes
+                    or now - written_at > self.max_age_seconds
+                )
+                if not over_quota:
+                    return
+                del self._index[path]
+                self._total_bytes -= size
+
+            self._remove_file(path)
+            self.evicted += 1
+
+    def _remove_file(self, path):
+        """Elimina un archivo ignorando que ya no exista"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"❌ Error eliminando imagen {path}: {e}")
+
+    def contains(self, path):
+        """Verifica si una ruta pertenece al almacén (pendiente o escrita)"""
+        with self._condition:
+            return path in self._pending or path in self._index or path == self._writing
+
+    def delete(self, path):
+        """
+        Elimina una imagen, cancelando su escritura si aún está pendiente
+
+        Args:
+            path: Ruta retornada por save()
+
+        Returns:
+            bool: True si la imagen existía
+        """
+        with self._condition:
+            if self._pending.pop(path, None) is not None:
+                return True
+            if path == self._writing:
+                self._cancelled.add(path)
+                return True
+            entry = self._index.pop(path, None)
+            if entry is None:
+                return False
+            self._total_bytes -= entry[0]
+
+        self._remove_file(path)
+        return True
+
+    def purge(self, max_age_seconds=0):
+        """
+        Elimina las imágenes con al menos la edad indicada
+
+        Con 0 también se descartan las pendientes y la que se está escribiendo,
+        que el hilo de escritura borra en cuanto termina.
+
+        Args:
+            max_age_seconds: Edad mínima de las imágenes eliminadas (0 = todas)
+
+        Returns:
+            int: Imágenes eliminadas
+        """
+        cutoff = time.time() - max_age_seconds
+        cancelled = 0
+        with self._condition:
+            if max_age_seconds <= 0:
+                cancelled = len(self._pending)
+                self._pending.clear()
+                if self._writing is not None and self._writing not in self._cancelled:
+                    self._cancelled.add(self._writing)
+                    cancelled += 1
+            stale = [path for path, (_, written_at) in self._index.items() if written_at <= cutoff]
+            for path in stale:
+                self._total_bytes -= self._index.pop(path)[0]
+
+        for path in stale:
+            self._remove_file(path)
+        return len(stale) + cancelled
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas del almacén
+
+        Returns:
+            dict: Imágenes guardadas, pendientes, bytes usados, descartes y evicciones
+        """
+        with self._condition:
+            files = len(self._index)
+            pending = len(self._pending)
+            total_bytes = self._total_bytes
+        return {
+            "directory": self.directory,
+            "files": files,
+            "pending": pending,
+            "bytes": total_bytes,
+            "written": self.written,
+            "dropped": self.dropped,
+            "evicted": self.evicted
+        }
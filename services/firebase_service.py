@@ -8,10 +8,64 @@ búsqueda de usuarios y gestión de puntos.
 """
 
 import time
+import random
 import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import firebase_admin
 from firebase_admin import credentials, db
-from config.config import FIREBASE_DB_URL, FIREBASE_CRED_PATH, POINTS_PLASTIC, POINTS_ALUMINUM
+from config.config import (
+    FIREBASE_DB_URL, FIREBASE_CRED_PATH, POINTS_PLASTIC, POINTS_ALUMINUM,
+    FIREBASE_FLUSH_INTERVAL, FIREBASE_WRITE_QUEUE_MAX_PATHS,
+    USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL, USER_CACHE_NEGATIVE_TTL,
+    OUTBOX_DB_PATH, OUTBOX_RETRY_MAX_SECONDS
+)
+from services.firebase_writer import FirebaseWriteBehind
+from services.outbox import DurableOutbox
+from services.user_cache import UserLookupCache
+
+# Alfabeto de las claves push() de Firebase (ordenadas cronológicamente)
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_push_random = []
+
+
+def generate_push_id():
+    """
+    Genera localmente una clave equivalente a push() sin ir al servidor
+
+    Returns:
+        str: Clave de 20 caracteres ordenable por tiempo
+    """
+    global _last_push_time, _last_push_random
+
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time:
+            # Mismo milisegundo: incrementar la parte aleatoria para mantener el orden
+            for i in range(11, -1, -1):
+                if _last_push_random[i] != 63:
+                    _last_push_random[i] += 1
+                    break
+                _last_push_random[i] = 0
+        else:
+            _last_push_random = [random.randrange(64) for _ in range(12)]
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        return "".join(reversed(time_chars)) + "".join(PUSH_CHARS[i] for i in _last_push_random)
+
+
+# Campos de usuario que se leen por separado (nombre corto -> clave en RTDB, valor por defecto)
+USER_FIELDS = {
+    "email": ("usuario_email", "Correo no disponible"),
+    "name": ("usuario_nombre", "Usuario"),
+    "points": ("usuario_puntos", 0),
+}
 
 
 class FirebaseService:
@@ -28,6 +82,37 @@ class FirebaseService:
         self.initialized = False
         self.init_firebase()
 
+        # Bandeja de salida persistente: puntos y telemetría sobreviven a cortes de red
+        self.outbox = DurableOutbox(
+            OUTBOX_DB_PATH,
+            retry_max_seconds=OUTBOX_RETRY_MAX_SECONDS,
+            status_callback=status_callback
+        )
+        self.outbox.register_handler("points_award", self._deliver_points_award)
+        self.outbox.register_handler("rtdb_update", self._deliver_rtdb_update)
+        self.outbox.start()
+
+        # Escritura diferida para la telemetría de contenedores
+        self.writer = FirebaseWriteBehind(
+            flush_interval=FIREBASE_FLUSH_INTERVAL,
+            max_pending_paths=FIREBASE_WRITE_QUEUE_MAX_PATHS,
+            status_callback=status_callback,
+            outbox=self.outbox
+        )
+        self.writer.start()
+
+        # Caché tarjeta NFC -> usuario, invalidada por un listener de nfc_index
+        self.user_cache = UserLookupCache(
+            max_entries=USER_CACHE_MAX_ENTRIES,
+            ttl=USER_CACHE_TTL,
+            negative_ttl=USER_CACHE_NEGATIVE_TTL
+        )
+        self.nfc_index_listener = None
+        self._start_nfc_index_listener()
+
+        # Lecturas de campos de usuario en paralelo (una petición pequeña por campo)
+        self._read_pool = ThreadPoolExecutor(max_workers=len(USER_FIELDS), thread_name_prefix="firebase-read")
+
     def init_firebase(self):
         """Inicializa la conexión con Firebase"""
         try:
@@ -79,16 +164,82 @@ class FirebaseService:
                 self.status_callback(f"❌ Error actualizando contenedor: {e}", "error")
             return False
 
+    def queue_container_status(self, target, percent, state, distance_cm, device_id, timestamp):
+        """
+        Encola el estado de un contenedor para escribirlo en segundo plano
+
+        No bloquea: las actualizaciones se coalescen por contenedor (solo se
+        envía el último estado) y se escriben en lote con una llamada multi-ruta.
+
+        Args:
+            target: Tipo de contenedor (contePlastico | conteAluminio)
+            percent: Porcentaje de llenado (0-100)
+            state: Estado del contenedor (Vacio | Medio | Lleno)
+            distance_cm: Distancia del sensor en cm
+            device_id: ID del dispositivo
+            timestamp: Timestamp del mensaje
+
+        Returns:
+            bool: True si la actualización quedó encolada
+        """
+        if not self.initialized:
+            return False
+
+        self.writer.enqueue(f"contenedor/{target}", {
+            "estado": state,
+            "porcentaje": percent,
+            "distance_cm": distance_cm,
+            "deviceId": device_id,
+            "timestamp": timestamp,
+            "updatedAt": int(time.time() * 1000)
+        })
+        return True
+
+    def _start_nfc_index_listener(self):
+        """Escucha cambios en nfc_index para invalidar la caché de usuarios"""
+        try:
+            self.nfc_index_listener = db.reference("nfc_index").listen(self._on_nfc_index_event)
+        except Exception as e:
+            # Sin listener la caché sigue siendo válida gracias al TTL
+            self.nfc_index_listener = None
+            print(f"⚠️ No se pudo escuchar nfc_index, la caché usará solo TTL: {e}")
+
+    def _on_nfc_index_event(self, event):
+        """
+        Invalida las tarjetas afectadas por un cambio en nfc_index
+
+        Args:
+            event: Evento de RTDB (event_type, path, data)
+        """
+        path = event.path.strip("/")
+        if path:
+            self.user_cache.invalidate(path.split("/")[0])
+        elif event.event_type == "patch" and isinstance(event.data, dict):
+            for nfc_id in event.data:
+                self.user_cache.invalidate(nfc_id)
+        else:
+            # Snapshot completo del índice
+            self.user_cache.invalidate()
+
     def buscar_usuario_por_nfc(self, nfc_id):
         """
         Busca un usuario por su ID de tarjeta NFC
 
+        Consulta primero la caché en memoria (incluidas las tarjetas que se
+        saben no registradas); solo ante un fallo de caché lee Firebase.
+
         Args:
             nfc_id: ID de la tarjeta NFC
 
         Returns:
             tuple: (uid, email) o (None, None) si no se encuentra
         """
+        found, user = self.user_cache.get(nfc_id)
+        if found:
+            if user is None:
+                return None, None
+            return user["uid"], user["email"]
+
         try:
             if not self.initialized:
                 raise Exception("Firebase no inicializado")
@@ -96,9 +247,13 @@ class FirebaseService:
             ref_index = db.reference("nfc_index").child(nfc_id).get()
             if ref_index:
                 uid = ref_index
-                user_ref = db.reference("usuarios").child(uid).get()
-                if user_ref:
-                    return uid, user_ref.get("usuario_email", "Correo no disponible")
+                user = self._read_user_summary(uid)
+                if user:
+                    self.user_cache.put(nfc_id, user)
+                    return uid, user["email"]
+
+            # Tarjeta no registrada: recordarla durante un tiempo corto
+            self.user_cache.put(nfc_id, None)
 
         except Exception as e:
             if self.status_callback:
@@ -106,67 +261,204 @@ class FirebaseService:
 
         return None, None
 
-    def actualizar_puntos(self, uid, material):
+    def get_user_summary(self, uid):
         """
-        Actualiza los puntos de un usuario por reciclar material
+        Obtiene nombre, correo y puntos de un usuario, usando la caché si es posible
 
         Args:
             uid: ID del usuario
-            material: Tipo de material ("plastico" | "aluminio")
+
+        Returns:
+            dict: {"uid", "name", "email", "points"} o None si no se encuentra
         """
+        user = self.user_cache.get_user(uid)
+        if user is not None:
+            return user
+
         try:
             if not self.initialized:
                 raise Exception("Firebase no inicializado")
+            return self._read_user_summary(uid)
+
+        except Exception as e:
+            if self.status_callback:
+                self.status_callback(f"❌ Error obteniendo datos del usuario: {e}", "error")
+            return None
 
-            user_ref = db.reference("usuarios").child(uid)
-            user_data = user_ref.get()
+    def _read_user_summary(self, uid):
+        """
+        Lee nombre, correo y puntos de un usuario sin descargar su historial
 
-            if user_data:
-                puntos_actuales = user_data.get("usuario_puntos", 0)
-                puntos_a_sumar = POINTS_PLASTIC if material == "plastico" else POINTS_ALUMINUM
-                puntos_nuevos = puntos_actuales + puntos_a_sumar
+        Args:
+            uid: ID del usuario
 
-                if self.status_callback:
-                    self.status_callback(f"💾 Actualizando puntos en Firebase...", "info")
+        Returns:
+            dict: {"uid", "name", "email", "points"} o None si el usuario no existe
+        """
+        values = self._read_user_fields(uid, list(USER_FIELDS))
+        if all(value is None for value in values.values()):
+            return None
+
+        # Claves de RTDB -> nombres cortos del resumen
+        user = {"uid": uid}
+        for field, (key, default) in USER_FIELDS.items():
+            user[field] = values[key] if values[key] is not None else default
+        return user
+
+    def _read_user_fields(self, uid, fields):
+        """
+        Lee campos concretos de un usuario en paralelo, una ruta hija por campo
+
+        Args:
+            uid: ID del usuario
+            fields: Nombres cortos (ver USER_FIELDS) o claves de RTDB
+
+        Returns:
+            dict: Clave de RTDB -> valor (None si no existe)
+        """
+        user_ref = db.reference("usuarios").child(uid)
+        keys = {self._user_key(field) for field in fields}
+        futures = {key: self._read_pool.submit(user_ref.child(key).get) for key in keys}
+        return {key: future.result() for key, future in futures.items()}
+
+    @staticmethod
+    def _user_key(field):
+        """Traduce un nombre corto de USER_FIELDS a su clave de RTDB"""
+        return USER_FIELDS[field][0] if field in USER_FIELDS else field
+
+    def actualizar_puntos(self, uid, material):
+        """
+        Actualiza los puntos de un usuario por reciclar material
+
+        Args:
+            uid: ID del usuario
+            material: Tipo de material ("plastico" | "aluminio")
 
-                # Actualizar puntos totales
-                user_ref.update({"usuario_puntos": puntos_nuevos})
+        Returns:
+            int: Puntos otorgados (0 si hubo error)
+        """
+        return self.actualizar_puntos_lote(uid, [material])
+
+    def actualizar_puntos_lote(self, uid, materials):
+        """
+        Otorga en una sola escritura los puntos de varios materiales reciclados
+
+        El otorgamiento se guarda primero en la bandeja de salida local (en
+        milisegundos, con o sin conexión) y se envía en segundo plano como una
+        única actualización multi-ruta: incremento del lado del servidor de
+        usuario_puntos por el total más un registro en el historial por cada
+        material, atómica y segura ante kioscos concurrentes. El nuevo total se
+        calcula a partir de la caché.
+
+        Args:
+            uid: ID del usuario
+            materials: Lista de materiales ("plastico" | "aluminio")
 
-                # Agregar registro de puntos ganados
-                pts_ref = user_ref.child("puntos").push()
-                pts_ref.set({
-                    "punto_cantidad": puntos_a_sumar,
+        Returns:
+            int: Puntos otorgados (0 si hubo error)
+        """
+        try:
+            if not self.initialized:
+                raise Exception("Firebase no inicializado")
+            if not materials:
+                return 0
+
+            fecha = int(datetime.datetime.now().timestamp() * 1000)
+            updates = {}
+            ledger_keys = []
+            puntos_a_sumar = 0
+            for material in materials:
+                puntos = POINTS_PLASTIC if material == "plastico" else POINTS_ALUMINUM
+                ledger_key = generate_push_id()
+                ledger_keys.append(ledger_key)
+                puntos_a_sumar += puntos
+                updates[f"usuarios/{uid}/puntos/{ledger_key}"] = {
+                    "punto_cantidad": puntos,
                     "punto_descripcion": f"Reciclaje completado ({material})",
-                    "punto_fecha": int(datetime.datetime.now().timestamp() * 1000),
+                    "punto_fecha": fecha,
                     "punto_tipo": "ganado",
                     "punto_userId": uid
-                })
-
+                }
+            updates[f"usuarios/{uid}/usuario_puntos"] = {".sv": {"increment": puntos_a_sumar}}
+
+            # La clave del primer registro sirve también como clave de idempotencia
+            award = {"uid": uid, "ledger_key": ledger_keys[0], "updates": updates}
+            if not self.outbox.put("points_award", f"points:{ledger_keys[0]}", award):
+                raise Exception("no se pudo guardar el otorgamiento")
+
+            cached = self.user_cache.get_user(uid)
+            if cached is not None and cached.get("points") is not None:
+                puntos_nuevos = cached["points"] + puntos_a_sumar
+                self.user_cache.update_points(uid, puntos_nuevos)
                 if self.status_callback:
-                    self.status_callback(f"✅ Puntos: {puntos_actuales} ➝ {puntos_nuevos}", "success")
+                    self.status_callback(f"✅ Puntos: {cached['points']} ➝ {puntos_nuevos}", "success")
+            elif self.status_callback:
+                self.status_callback(f"✅ +{puntos_a_sumar} puntos registrados", "success")
 
-                return puntos_a_sumar
+            return puntos_a_sumar
 
         except Exception as e:
             if self.status_callback:
                 self.status_callback(f"❌ Error actualizando puntos: {e}", "error")
             return 0
 
-    def get_user_data(self, uid):
+    def _deliver_points_award(self, award, attempts):
+        """
+        Envía a RTDB un otorgamiento guardado en la bandeja de salida
+
+        Comprueba siempre primero si el registro ya llegó: la respuesta pudo
+        perderse, o el proceso pudo terminar entre el envío y el borrado de la
+        bandeja (sin que conste ningún intento fallido). Así el incremento de
+        puntos nunca se aplica dos veces.
+
+        Args:
+            award: Datos del otorgamiento guardados por actualizar_puntos
+            attempts: Intentos fallidos previos
+        """
+        ledger_ref = db.reference("usuarios").child(award["uid"]).child("puntos").child(award["ledger_key"])
+        if ledger_ref.get(shallow=True) is not None:
+            return
+
+        db.reference().update(award["updates"])
+        print(f"🔥 Puntos registrados en RTDB: {award['uid']} ({award['ledger_key']})")
+
+    def _deliver_rtdb_update(self, update, attempts):
+        """
+        Envía a RTDB una actualización de telemetría guardada sin conexión
+
+        Args:
+            update: {"path": ruta, "fields": campos}
+            attempts: Intentos fallidos previos (las escrituras son idempotentes)
+        """
+        db.reference(update["path"]).update(update["fields"])
+
+    def get_user_data(self, uid, fields=None, shallow=False):
         """
         Obtiene los datos de un usuario
 
+        Sin argumentos descarga el nodo completo, incluido el historial de
+        puntos que crece con cada reciclaje; para la operación normal conviene
+        pedir solo los campos necesarios o una lectura superficial.
+
         Args:
             uid: ID del usuario
+            fields: Campos a leer (p. ej. ["name", "points"] o claves de RTDB)
+            shallow: Si True, solo devuelve las claves de primer nivel
 
         Returns:
-            dict: Datos del usuario o None si no se encuentra
+            dict: Datos del usuario con claves de RTDB (p. ej. "usuario_nombre"),
+            o None si no se encuentra
         """
         try:
             if not self.initialized:
                 raise Exception("Firebase no inicializado")
 
-            user_ref = db.reference("usuarios").child(uid).get()
+            if fields:
+                values = self._read_user_fields(uid, fields)
+                user_data = {field: value for field, value in values.items() if value is not None}
+                return user_data or None
+
+            user_ref = db.reference("usuarios").child(uid).get(shallow=shallow)
             return user_ref
 
         except Exception as e:
@@ -174,27 +466,30 @@ class FirebaseService:
                 self.status_callback(f"❌ Error obteniendo datos del usuario: {e}", "error")
             return None
 
-    def get_user_data(self, uid):
+    def get_user_field(self, uid, field):
         """
-        Obtiene los datos de un usuario
+        Lee un único campo de un usuario
 
         Args:
             uid: ID del usuario
+            field: Nombre corto ("email" | "name" | "points") o clave de RTDB
 
         Returns:
-            dict: Datos del usuario o None si no se encuentra
+            Valor del campo (o su valor por defecto si no existe)
         """
-        try:
-            if not self.initialized:
-                raise Exception("Firebase no inicializado")
+        default = USER_FIELDS[field][1] if field in USER_FIELDS else None
+        user_data = self.get_user_data(uid, fields=[field])
+        if not user_data:
+            return default
+        return user_data.get(self._user_key(field), default)
 
-            user_ref = db.reference("usuarios").child(uid).get()
-            return user_ref
+    def get_user_email(self, uid):
+        """Obtiene el correo de un usuario"""
+        return self.get_user_field(uid, "email")
 
-        except Exception as e:
-            if self.status_callback:
-                self.status_callback(f"❌ Error obteniendo datos del usuario: {e}", "error")
-            return None
+    def get_user_name(self, uid):
+        """Obtiene el nombre de un usuario"""
+        return self.get_user_field(uid, "name")
 
     def get_user_points(self, uid):
         """
@@ -206,15 +501,26 @@ class FirebaseService:
         Returns:
             int: Puntos totales del usuario
         """
+        return self.get_user_field(uid, "points")
+
+    def list_user_ids(self):
+        """
+        Lista los IDs de usuario con una lectura superficial (sin datos anidados)
+
+        Returns:
+            list: IDs de usuario (vacía si hay error)
+        """
         try:
-            user_data = self.get_user_data(uid)
-            if user_data:
-                return user_data.get("usuario_puntos", 0)
-            return 0
+            if not self.initialized:
+                raise Exception("Firebase no inicializado")
+
+            users = db.reference("usuarios").get(shallow=True)
+            return list(users) if users else []
+
         except Exception as e:
             if self.status_callback:
-                self.status_callback(f"❌ Error obteniendo puntos del usuario: {e}", "error")
-            return 0
+                self.status_callback(f"❌ Error listando usuarios: {e}", "error")
+            return []
 
     def get_user_achievements(self, uid):
         """
@@ -310,3 +616,15 @@ class FirebaseService:
     def is_initialized(self):
         """Verifica si Firebase está inicializado"""
         return self.initialized
+
+    def shutdown(self):
+        """Envía las escrituras pendientes y detiene los hilos de fondo"""
+        if self.nfc_index_listener is not None:
+            try:
+                self.nfc_index_listener.close()
+            except Exception as e:
+                print(f"⚠️ Error cerrando listener de nfc_index: {e}")
+            self.nfc_index_listener = None
+        self.writer.stop(flush=True)
+        self.outbox.stop()
+        self._read_pool.shutdown(wait=False)
@@ -0,0 +1,220 @@
+"""
+Escritura Diferida a Firebase para el Sistema de Reciclaje Inteligente
+=====================================================================
+
+Este módulo implementa una cola de escritura diferida (write-behind) hacia
+Firebase RTDB. Las actualizaciones se encolan sin bloquear al llamador (por
+ejemplo, el hilo de red de paho), se coalescen por ruta conservando solo el
+último estado y un hilo dedicado las envía agrupadas en una única llamada
+update() multi-ruta. Si hay una bandeja de salida persistente, los lotes que
+fallan se guardan en ella para reenviarse cuando vuelva la conexión.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from firebase_admin import db
+
+
+class FirebaseWriteBehind:
+    """Cola acotada de escrituras a RTDB coalescidas por ruta"""
+
+    def __init__(self, flush_interval=1.0, max_pending_paths=32, status_callback=None, outbox=None):
+        """
+        Inicializa la cola de escritura diferida
+
+        Args:
+            flush_interval: Segundos que se acumulan cambios antes de enviarlos
+            max_pending_paths: Máximo de rutas distintas pendientes (se descarta la más antigua)
+            status_callback: Función callback para actualizar el estado en la UI
+            outbox: DurableOutbox donde guardar los lotes fallidos (opcional)
+        """
+        self.flush_interval = flush_interval
+        self.max_pending_paths = max(1, int(max_pending_paths))
+        self.status_callback = status_callback
+        self.outbox = outbox
+        self.is_running = False
+        self.thread = None
+
+        self._pending = OrderedDict()  # ruta -> {campo: valor}
+        self._condition = threading.Condition()
+        self._retry_delay = flush_interval
+        self._flush_on_stop = True
+
+        # Estadísticas
+        self.enqueued = 0
+        self.requests = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def start(self):
+        """Inicia el hilo de envío"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, flush=True, timeout=2.0):
+        """
+        Detiene el hilo de envío
+
+        Args:
+            flush: Si se intenta enviar lo pendiente antes de salir
+            timeout: Tiempo máximo de espera en segundos
+        """
+        with self._condition:
+            self.is_running = False
+            self._flush_on_stop = flush
+            self._condition.notify_all()
+        if self.thread:
+            # El propio hilo envía lo pendiente al salir; si sigue ocupado tras
+            # el timeout, se deja terminar solo (dos envíos en paralelo podrían
+            # duplicar o desordenar el lote)
+            self.thread.join(timeout=timeout)
+            if not self.thread.is_alive():
+                self.thread = None
+        elif flush:
+            self._flush_once()
+
+    def enqueue(self, path, fields):
+        """
+        Encola una actualización sin bloquear
+
+        Args:
+            path: Ruta en RTDB (p. ej. "contenedor/contePlastico")
+            fields: Diccionario de campos a actualizar bajo la ruta
+        """
+        with self._condition:
+            if path in self._pending:
+                self._pending[path].update(fields)
+                self._pending.move_to_end(path)
+            else:
+                if len(self._pending) >= self.max_pending_paths:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                self._pending[path] = dict(fields)
+            self.enqueued += 1
+            self._condition.notify()
+
+    def _writer_loop(self):
+        """Espera cambios, deja acumular durante flush_interval y los envía en lote"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or not self.is_running)
+                stopping = not self.is_running
+
+            if stopping:
+                if self._flush_on_stop:
+                    self._flush_once()
+                return
+
+            # Ventana de acumulación para coalescer ráfagas de mensajes
+            time.sleep(self.flush_interval)
+
+            if self._flush_once():
+                self._retry_delay = self.flush_interval
+            else:
+                # Reintento con espera exponencial acotada
+                time.sleep(self._retry_delay)
+                self._retry_delay = min(self._retry_delay * 2, 30)
+
+    def _flush_once(self):
+        """
+        Envía todas las rutas pendientes en una sola llamada multi-ruta
+
+        Returns:
+            bool: True si no había nada pendiente o el envío fue exitoso
+        """
+        with self._condition:
+            if not self._pending:
+                return True
+            batch, self._pending = self._pending, OrderedDict()
+
+        if self.outbox is not None:
+            # Una ruta con telemetría aún en la bandeja no se escribe directamente:
+            # su reenvío tardío pisaría el estado nuevo. Se fusiona con lo guardado
+            # y se deja que la bandeja la envíe en orden.
+            batch = self._supersede_queued(batch)
+            if not batch:
+                return True
+
+        updates = {}
+        for path, fields in batch.items():
+            for field, value in fields.items():
+                updates[f"{path}/{field}"] = value
+
+        try:
+            db.reference().update(updates)
+            self.requests += 1
+            print(f"🔥 RTDB actualizado en lote: {', '.join(batch.keys())}")
+            return True
+
+        except Exception as e:
+            self.failures += 1
+            if self.outbox is not None:
+                # Persistir el último estado de cada ruta y dejar que la bandeja lo reenvíe
+                for path, fields in batch.items():
+                    self.outbox.put("rtdb_update", self._outbox_key(path),
+                                    {"path": path, "fields": fields}, replace=True)
+                print(f"📥 Lote guardado en la bandeja de salida: {e}")
+                return True
+
+            # Reencolar sin pisar valores más nuevos llegados mientras tanto
+            with self._condition:
+                for path, fields in batch.items():
+                    newer = self._pending.get(path, {})
+                    merged = dict(fields)
+                    merged.update(newer)
+                    self._pending[path] = merged
+                while len(self._pending) > self.max_pending_paths:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+            print(f"❌ Error enviando lote a Firebase: {e}")
+            if self.status_callback:
+                self.status_callback(f"❌ Error actualizando contenedor: {e}", "error")
+            return False
+
+    def _supersede_queued(self, batch):
+        """
+        Pasa a la bandeja las rutas que ya tienen telemetría pendiente en ella
+
+        Args:
+            batch: Rutas y campos a enviar
+
+        Returns:
+            OrderedDict: Rutas sin entrada en la bandeja, que pueden escribirse directamente
+        """
+        direct = OrderedDict()
+        for path, fields in batch.items():
+            key = self._outbox_key(path)
+            queued = self.outbox.get_payload(key)
+            if queued is None:
+                direct[path] = fields
+                continue
+            merged = dict(queued.get("fields", {}))
+            merged.update(fields)
+            self.outbox.put("rtdb_update", key, {"path": path, "fields": merged}, replace=True)
+        return direct
+
+    @staticmethod
+    def _outbox_key(path):
+        """Clave de idempotencia de la telemetría de una ruta (solo cuenta el último estado)"""
+        return f"rtdb:{path}"
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas de la cola
+
+        Returns:
+            dict: Actualizaciones encoladas, peticiones, descartes y fallos
+        """
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "pending_paths": pending,
+            "enqueued": self.enqueued,
+            "requests": self.requests,
+            "dropped": self.dropped,
+            "failures": self.failures
+        }
@@ -0,0 +1,240 @@
+"""
+Captura de Frames en Segundo Plano para el Sistema de Reciclaje Inteligente
+==========================================================================
+
+Este módulo mantiene un hilo dedicado que vacía continuamente la cola interna
+de OpenCV (V4L2) hacia un pequeño buffer circular de frames preasignados, de
+modo que los consumidores (detección, capturas de evidencia) siempre obtienen
+el frame más reciente sin copias ni esperas de captura.
+"""
+
+import time
+import threading
+import numpy as np
+
+
+class FrameSnapshot:
+    """Referencia a un frame del buffer circular (sin copia)"""
+
+    __slots__ = ("frame", "seq", "timestamp", "_grabber", "_slot")
+
+    def __init__(self, grabber, slot, frame, seq, timestamp):
+        self._grabber = grabber
+        self._slot = slot
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def release(self):
+        """Libera el slot para que el hilo de captura pueda reutilizarlo"""
+        if self._grabber is not None:
+            self._grabber._release_slot(self._slot)
+            self._grabber = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class FrameGrabber:
+    """Hilo de captura continua con buffer circular de frames preasignados"""
+
+    def __init__(self, capture, buffer_size=4):
+        """
+        Inicializa el capturador de frames
+
+        Args:
+            capture: Objeto cv2.VideoCapture ya abierto
+            buffer_size: Número de frames preasignados en el buffer circular
+        """
+        self.capture = capture
+        self.buffer_size = max(2, int(buffer_size))
+        self.is_running = False
+        self.thread = None
+        self._loop_active = False  # El hilo de captura sigue dentro de su bucle
+        self._release_on_exit = False  # El hilo libera la cámara al salir (close() con read() en curso)
+
+        self._buffers = [None] * self.buffer_size
+        self._leases = [0] * self.buffer_size
+        self._latest_slot = None
+        self._latest_seq = 0
+        self._latest_timestamp = 0.0
+        self._dropped_frames = 0
+        self._condition = threading.Condition()
+
+    def start(self, initial_frame=None):
+        """
+        Inicia el hilo de captura
+
+        Args:
+            initial_frame: Frame ya leído para conocer el tamaño y publicar de inmediato (opcional)
+        """
+        if self.is_running:
+            return
+
+        if initial_frame is not None:
+            # Preasignar todos los slots con la forma del frame inicial
+            self._buffers[0] = initial_frame.copy()
+            for i in range(1, self.buffer_size):
+                self._buffers[i] = np.empty_like(initial_frame)
+            self._publish(0, time.time())
+
+        with self._condition:
+            self.is_running = True
+            if self._loop_active:
+                # El hilo anterior sigue bloqueado en read(): continuará él mismo
+                return
+            self._loop_active = True
+            self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=1):
+        """
+        Detiene el hilo de captura
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+
+        Returns:
+            bool: True si el hilo terminó; False si sigue bloqueado leyendo la cámara
+        """
+        with self._condition:
+            self.is_running = False
+            self._condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            if self.thread.is_alive():
+                return False
+            self.thread = None
+        return True
+
+    def close(self, timeout=1):
+        """
+        Detiene el hilo de captura y libera la cámara
+
+        Si el hilo sigue dentro de read(), liberar la cámara desde aquí sería
+        un uso tras liberar en el backend V4L2: la libera el propio hilo al salir.
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+
+        Returns:
+            bool: True si la cámara se liberó ya; False si la liberará el hilo
+        """
+        self.stop(timeout)
+        with self._condition:
+            if self._loop_active:
+                self._release_on_exit = True
+                return False
+        self.capture.release()
+        return True
+
+    def _next_free_slot(self):
+        """Devuelve un slot libre (sin consumidores y distinto del último publicado)"""
+        with self._condition:
+            start = 0 if self._latest_slot is None else self._latest_slot + 1
+            for offset in range(self.buffer_size):
+                slot = (start + offset) % self.buffer_size
+                if slot != self._latest_slot and self._leases[slot] == 0:
+                    return slot
+        return None
+
+    def _capture_loop(self):
+        """Vacía continuamente la cámara hacia el buffer circular"""
+        while True:
+            with self._condition:
+                if not self.is_running:
+                    self._loop_active = False
+                    release = self._release_on_exit
+                    break
+
+            try:
+                slot = self._next_free_slot()
+                if slot is None:
+                    # Todos los slots ocupados: descartar frame para no acumular latencia
+                    self.capture.grab()
+                    self._dropped_frames += 1
+                    continue
+
+                buffer = self._buffers[slot]
+                if buffer is not None:
+                    ret, frame = self.capture.read(buffer)
+                else:
+                    ret, frame = self.capture.read()
+
+                if not ret or frame is None:
+                    time.sleep(0.01)
+                    continue
+
+                # OpenCV reasigna si la forma cambió (p. ej. cambio de resolución)
+                if frame is not buffer:
+                    self._buffers[slot] = frame
+
+                self._publish(slot, time.time())
+
+            except Exception as e:
+                print(f"❌ Error en hilo de captura: {e}")
+                time.sleep(0.1)
+
+        if release:
+            self.capture.release()
+
+    def _publish(self, slot, timestamp):
+        """Publica un slot como el frame más reciente"""
+        with self._condition:
+            self._latest_slot = slot
+            self._latest_seq += 1
+            self._latest_timestamp = timestamp
+            self._condition.notify_all()
+
+    def _release_slot(self, slot):
+        """Decrementa el contador de uso de un slot"""
+        with self._condition:
+            if self._leases[slot] > 0:
+                self._leases[slot] -= 1
+
+    def get_latest(self, after_seq=None, timeout=None):
+        """
+        Obtiene el frame más reciente sin copiarlo
+
+        El slot queda reservado hasta llamar a release() (o salir del bloque
+        with), por lo que el hilo de captura no lo sobrescribe mientras se usa.
+
+        Args:
+            after_seq: Si se indica, espera un frame con secuencia mayor
+            timeout: Tiempo máximo de espera en segundos (None = sin límite)
+
+        Returns:
+            FrameSnapshot: Frame con su número de secuencia y timestamp, o None
+        """
+        with self._condition:
+            if after_seq is not None:
+                self._condition.wait_for(
+                    lambda: self._latest_seq > after_seq or not self.is_running,
+                    timeout=timeout
+                )
+
+            slot = self._latest_slot
+            if slot is None or (after_seq is not None and self._latest_seq <= after_seq):
+                return None
+
+            self._leases[slot] += 1
+            return FrameSnapshot(self, slot, self._buffers[slot], self._latest_seq, self._latest_timestamp)
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas de captura
+
+        Returns:
+            dict: Estadísticas del capturador
+        """
+        return {
+            "running": self.is_running,
+            "buffer_size": self.buffer_size,
+            "last_seq": self._latest_seq,
+            "last_timestamp": self._latest_timestamp,
+            "dropped_frames": self._dropped_frames
+        }
@@ -0,0 +1,267 @@
+"""
+Motor de Inferencia para el Sistema de Reciclaje Inteligente
+===========================================================
+
+Este módulo encapsula la ejecución del modelo de IA. Los detalles de los
+tensores se consultan una sola vez al cargar el modelo y el preprocesado
+escribe directamente sobre los buffers del intérprete, de modo que la ruta
+caliente de clasificación no reserva memoria por frame. Los modelos
+cuantizados (entrada/salida uint8 o int8) se manejan de forma transparente
+usando la escala y el punto cero de cada tensor.
+"""
+
+import time
+import cv2
+import numpy as np
+
+# Normalización del modelo entrenado: [0, 255] -> [-1, 1]
+NORMALIZATION_SCALE = np.float32(1.0 / 127.5)
+NORMALIZATION_OFFSET = np.float32(1.0)
+
+
+class ClassificationResult:
+    """Resultado ligero de clasificar un frame (sin decidir umbrales)"""
+
+    __slots__ = ("index", "label", "material", "confidence", "probabilities", "inference_ms", "timestamp")
+
+    def __init__(self, index, label, material, confidence, probabilities, inference_ms, timestamp):
+        self.index = index
+        self.label = label
+        self.material = material
+        self.confidence = confidence
+        self.probabilities = probabilities
+        self.inference_ms = inference_ms
+        self.timestamp = timestamp
+
+    def is_confident(self, threshold=0.95):
+        """Indica si la confianza alcanza el umbral indicado (0-1)"""
+        return self.confidence >= threshold
+
+    def __repr__(self):
+        return (f"ClassificationResult({self.label} -> {self.material}, "
+                f"{self.confidence * 100:.0f}%, {self.inference_ms:.1f} ms)")
+
+
+def import_tflite():
+    """
+    Importa TensorFlow Lite bajo demanda (para Raspberry Pi)
+
+    Returns:
+        module: tflite_runtime.interpreter o None si no está disponible
+    """
+    try:
+        import tflite_runtime.interpreter as tflite
+        print("✅ TensorFlow Lite disponible")
+        return tflite
+    except ImportError:
+        print("⚠️ TensorFlow Lite no disponible")
+        return None
+
+
+def create_tflite_interpreter(tflite, model_path, num_threads=1, use_xnnpack=True, delegate_path=""):
+    """
+    Crea un intérprete de TensorFlow Lite con hilos y delegado configurados
+
+    Args:
+        tflite: Módulo del intérprete (tflite_runtime.interpreter o tf.lite)
+        model_path: Ruta del modelo .tflite
+        num_threads: Número de hilos para la inferencia
+        use_xnnpack: Si se usa el delegado XNNPACK
+        delegate_path: Librería del delegado XNNPACK a cargar explícitamente (opcional)
+
+    Returns:
+        tuple: (intérprete, descripción del delegado usado)
+    """
+    kwargs = {"model_path": model_path, "num_threads": num_threads}
+    delegate_name = "ninguno"
+
+    if use_xnnpack and delegate_path:
+        try:
+            delegate = tflite.load_delegate(delegate_path, {"num_threads": num_threads})
+            kwargs["experimental_delegates"] = [delegate]
+            delegate_name = f"XNNPACK ({delegate_path})"
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar el delegado XNNPACK {delegate_path}: {e}")
+
+    if "experimental_delegates" not in kwargs:
+        op_resolver = getattr(tflite, "OpResolverType", None)
+        if op_resolver is None:
+            # Runtime sin control de delegados por defecto
+            delegate_name = "por defecto del runtime"
+        elif use_xnnpack:
+            # XNNPACK viene aplicado por defecto en los runtimes que lo incluyen
+            kwargs["experimental_op_resolver_type"] = op_resolver.AUTO
+            delegate_name = "XNNPACK (por defecto del runtime)"
+        else:
+            kwargs["experimental_op_resolver_type"] = op_resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+
+    try:
+        interpreter = tflite.Interpreter(**kwargs)
+    except TypeError:
+        try:
+            # Runtime sin soporte de delegados: conservar al menos los hilos
+            interpreter = tflite.Interpreter(model_path=model_path, num_threads=num_threads)
+            delegate_name = "ninguno (runtime sin delegados)"
+        except TypeError:
+            # Versiones antiguas sin soporte de num_threads/delegados
+            interpreter = tflite.Interpreter(model_path=model_path)
+            delegate_name = "ninguno (runtime antiguo)"
+
+    interpreter.allocate_tensors()
+    return interpreter, delegate_name
+
+
+class TFLiteInferenceEngine:
+    """Motor de inferencia sobre un intérprete de TensorFlow Lite"""
+
+    def __init__(self, interpreter):
+        """
+        Inicializa el motor y cachea los detalles de entrada/salida
+
+        Args:
+            interpreter: Intérprete de TensorFlow Lite con tensores ya asignados
+        """
+        self.interpreter = interpreter
+
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+
+        self.input_index = input_details['index']
+        self.output_index = output_details['index']
+        self.input_shape = tuple(input_details['shape'])
+        self.input_height = int(self.input_shape[1])
+        self.input_width = int(self.input_shape[2])
+        self.input_dtype = input_details['dtype']
+        self.output_dtype = output_details['dtype']
+        self.input_scale, self.input_zero_point = input_details['quantization']
+        self.output_scale, self.output_zero_point = output_details['quantization']
+        self.input_quantized = self.input_dtype in (np.uint8, np.int8) and self.input_scale > 0
+        self.output_quantized = self.output_dtype in (np.uint8, np.int8) and self.output_scale > 0
+
+        # Accesores a los buffers internos del intérprete (sin copia)
+        self._input_tensor = interpreter.tensor(self.input_index)
+        self._output_tensor = interpreter.tensor(self.output_index)
+
+        # Buffers preasignados para el redimensionado y la salida
+        self._resize_buffer = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self._output_buffer = np.empty(tuple(output_details['shape'])[1:], dtype=np.float32)
+
+        if self.input_quantized:
+            # q = pixel * a + b, combinando la normalización [-1, 1] con la cuantización
+            self._quant_a = np.float32(1.0 / (127.5 * self.input_scale))
+            self._quant_b = np.float32(self.input_zero_point - 1.0 / self.input_scale)
+            limits = np.iinfo(self.input_dtype)
+            self._quant_min = np.float32(limits.min)
+            self._quant_max = np.float32(limits.max)
+            # Caso habitual (escala 1/127.5, punto cero 128): el píxel ya es el valor cuantizado
+            self._quant_identity = (self.input_dtype == np.uint8
+                                    and abs(self._quant_a - 1.0) < 1e-3 and abs(self._quant_b) < 1.0)
+            self._quant_buffer = np.empty_like(self._resize_buffer, dtype=np.float32)
+
+    def preprocess(self, frame):
+        """
+        Redimensiona y normaliza un frame directamente en el tensor de entrada
+
+        Args:
+            frame: Frame BGR (numpy.ndarray) de cualquier tamaño
+        """
+        cv2.resize(frame, (self.input_width, self.input_height),
+                   dst=self._resize_buffer, interpolation=cv2.INTER_AREA)
+
+        # La vista no debe sobrevivir a invoke(), por eso es local
+        input_view = self._input_tensor()[0]
+
+        if not self.input_quantized:
+            np.multiply(self._resize_buffer, NORMALIZATION_SCALE, out=input_view, dtype=np.float32)
+            np.subtract(input_view, NORMALIZATION_OFFSET, out=input_view)
+        elif self._quant_identity:
+            np.copyto(input_view, self._resize_buffer)
+        else:
+            buffer = self._quant_buffer
+            np.multiply(self._resize_buffer, self._quant_a, out=buffer, dtype=np.float32)
+            np.add(buffer, self._quant_b, out=buffer)
+            np.rint(buffer, out=buffer)
+            np.clip(buffer, self._quant_min, self._quant_max, out=buffer)
+            np.copyto(input_view, buffer, casting='unsafe')
+
+    def predict(self, frame):
+        """
+        Ejecuta la inferencia sobre un frame
+
+        Args:
+            frame: Frame BGR (numpy.ndarray)
+
+        Returns:
+            numpy.ndarray: Vector de probabilidades (se sobrescribe en la siguiente llamada)
+        """
+        self.preprocess(frame)
+        self.interpreter.invoke()
+
+        if self.output_quantized:
+            # Descuantizar: (q - punto_cero) * escala
+            np.subtract(self._output_tensor()[0], self.output_zero_point,
+                        out=self._output_buffer, dtype=np.float32)
+            np.multiply(self._output_buffer, np.float32(self.output_scale), out=self._output_buffer)
+        else:
+            np.copyto(self._output_buffer, self._output_tensor()[0])
+        return self._output_buffer
+
+    def benchmark(self, runs=10):
+        """
+        Mide la latencia media por inferencia (incluye preprocesado)
+
+        Args:
+            runs: Número de inferencias medidas (tras una de calentamiento)
+
+        Returns:
+            float: Latencia media en milisegundos
+        """
+        frame = np.zeros((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self.predict(frame)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.predict(frame)
+        return (time.perf_counter() - start) * 1000 / max(runs, 1)
+
+
+class KerasInferenceEngine:
+    """Motor de inferencia sobre un modelo Keras (fallback sin TensorFlow Lite)"""
+
+    def __init__(self, model, input_size=(224, 224)):
+        """
+        Inicializa el motor con un buffer de entrada preasignado
+
+        Args:
+            model: Modelo Keras cargado
+            input_size: Tamaño de entrada (ancho, alto) del modelo
+        """
+        self.model = model
+        self.input_width, self.input_height = input_size
+        self._resize_buffer = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self._input_buffer = np.empty((1, self.input_height, self.input_width, 3), dtype=np.float32)
+
+    def preprocess(self, frame):
+        """
+        Redimensiona y normaliza un frame en el buffer de entrada
+
+        Args:
+            frame: Frame BGR (numpy.ndarray) de cualquier tamaño
+        """
+        cv2.resize(frame, (self.input_width, self.input_height),
+                   dst=self._resize_buffer, interpolation=cv2.INTER_AREA)
+        np.multiply(self._resize_buffer, NORMALIZATION_SCALE, out=self._input_buffer[0], dtype=np.float32)
+        np.subtract(self._input_buffer, NORMALIZATION_OFFSET, out=self._input_buffer)
+
+    def predict(self, frame):
+        """
+        Ejecuta la inferencia sobre un frame
+
+        Args:
+            frame: Frame BGR (numpy.ndarray)
+
+        Returns:
+            numpy.ndarray: Vector de probabilidades
+        """
+        self.preprocess(frame)
+        return self.model.predict(self._input_buffer, verbose=0)[0]
@@ -0,0 +1,477 @@
+"""
+Proceso de Inferencia para el Sistema de Reciclaje Inteligente
+=============================================================
+
+Este módulo ejecuta el modelo TensorFlow Lite en un proceso aparte, para que
+el preprocesado con NumPy e interpreter.invoke() no compitan por el GIL con
+Tk, el bucle de red de paho y el lector NFC. Los frames viajan por un bloque
+de memoria compartida (multiprocessing.shared_memory) que el proceso hijo lee
+sin copiarlo ni serializarlo; por la conexión solo pasan mensajes de control y
+el vector de probabilidades resultante.
+
+El hijo se lanza con "python -m services.inference_worker", un módulo de
+entrada ligero: con multiprocessing (spawn) volvería a importar app.py como
+__mp_main__, y con él Tk, paho, pyscard y Firebase. Si el proceso se cuelga o
+termina, se relanza en segundo plano con espera creciente y, mientras tanto,
+predict() no da resultado en lugar de bloquear al llamador.
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import secrets
+import tempfile
+import threading
+import subprocess
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+import cv2
+import numpy as np
+
+# Raíz del proyecto: directorio de trabajo del proceso hijo para "-m services..."
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Espera antes de relanzar un proceso caído; se duplica mientras siga fallando
+RESTART_BACKOFF_INITIAL = 1.0
+RESTART_BACKOFF_MAX = 30.0
+
+
+class InferenceWorkerUnavailable(Exception):
+    """El proceso de inferencia se está relanzando: no hay resultado para este frame"""
+
+
+def _attach_shared_memory(name):
+    """
+    Abre el bloque compartido creado por el proceso principal
+
+    Al abrirlo, SharedMemory lo registra en el resource_tracker de este proceso,
+    que lo borraría al salir; el dueño es el proceso principal, así que se
+    quita ese registro.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _worker_main(conn, shm_name, capacity, model_path, num_threads, use_xnnpack, delegate_path,
+                 self_check_runs):
+    """
+    Bucle del proceso hijo: carga el modelo y atiende peticiones de inferencia
+
+    Protocolo (tuplas por la conexión):
+        padre -> hijo: ("predict", seq, alto, ancho) | ("stop",)
+        hijo -> padre: ("ready", info) | ("ok", seq, probabilidades, ms) | ("error", seq, mensaje)
+    """
+    # Ctrl+C lo gestiona el proceso principal, que detiene al hijo ordenadamente
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    shm = None
+    try:
+        # Mismo import que el proceso principal, para que ambos usen el mismo runtime
+        from services.inference_engine import TFLiteInferenceEngine, create_tflite_interpreter, import_tflite
+
+        tflite = import_tflite()
+        if tflite is None:
+            raise ImportError("TensorFlow Lite no disponible en el proceso de inferencia")
+
+        interpreter, delegate_name = create_tflite_interpreter(
+            tflite, model_path,
+            num_threads=num_threads,
+            use_xnnpack=use_xnnpack,
+            delegate_path=delegate_path
+        )
+        engine = TFLiteInferenceEngine(interpreter)
+        latency_ms = engine.benchmark(self_check_runs)
+        shm = _attach_shared_memory(shm_name)
+        frame_buffer = np.ndarray((capacity,), dtype=np.uint8, buffer=shm.buf)
+
+        conn.send(("ready", {
+            "delegate": delegate_name,
+            "latency_ms": latency_ms,
+            "input_size": (engine.input_width, engine.input_height)
+        }))
+    except Exception as e:
+        conn.send(("error", None, f"{type(e).__name__}: {e}"))
+        conn.close()
+        if shm is not None:
+            shm.close()
+        return
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                # El proceso principal terminó sin avisar
+                return
+            if message[0] == "stop":
+                return
+
+            _, seq, height, width = message
+            try:
+                frame = frame_buffer[:height * width * 3].reshape(height, width, 3)
+                start = time.perf_counter()
+                probabilities = engine.predict(frame)
+                inference_ms = (time.perf_counter() - start) * 1000
+                conn.send(("ok", seq, probabilities, inference_ms))
+            except Exception as e:
+                conn.send(("error", seq, f"{type(e).__name__}: {e}"))
+    finally:
+        # Soltar la vista antes de cerrar el bloque compartido
+        frame = frame_buffer = None
+        shm.close()
+        conn.close()
+
+
+def _new_address():
+    """
+    Genera una dirección privada para la conexión con el proceso hijo
+
+    Returns:
+        tuple: (dirección, carpeta temporal a borrar o None)
+    """
+    if sys.platform == "win32":
+        return rf"\\.\pipe\reciclaje-inferencia-{os.getpid()}-{secrets.token_hex(8)}", None
+    directory = tempfile.mkdtemp(prefix="reciclaje-inferencia-")
+    return os.path.join(directory, "worker.sock"), directory
+
+
+def _stop_process(process, conn, shm, timeout=2.0):
+    """
+    Detiene un proceso hijo y libera su conexión y su bloque compartido
+
+    Args:
+        process: subprocess.Popen del hijo (o None)
+        conn: Conexión con el hijo (o None)
+        shm: Bloque de memoria compartida (o None)
+        timeout: Espera de un cierre ordenado; 0 lo termina directamente (p. ej. colgado)
+    """
+    if process is not None:
+        if timeout > 0 and conn is not None:
+            try:
+                conn.send(("stop",))
+                process.wait(timeout)
+            except (OSError, ValueError, subprocess.TimeoutExpired):
+                pass
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    if conn is not None:
+        conn.close()
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+
+
+class InferenceWorker:
+    """Motor de inferencia en un proceso aparte, con la misma interfaz predict()"""
+
+    def __init__(self, model_path, max_frame_size=(640, 480), num_threads=1, use_xnnpack=True,
+                 delegate_path="", timeout=2.0, start_timeout=30.0):
+        """
+        Inicializa el cliente del proceso (sin lanzarlo)
+
+        Args:
+            model_path: Ruta del modelo .tflite
+            max_frame_size: Tamaño (ancho, alto) máximo de frame sin reducir en este proceso
+            num_threads: Número de hilos para la inferencia
+            use_xnnpack: Si se usa el delegado XNNPACK
+            delegate_path: Librería del delegado XNNPACK a cargar explícitamente (opcional)
+            timeout: Espera máxima de una inferencia en segundos
+            start_timeout: Espera máxima para cargar el modelo en el proceso hijo
+        """
+        self.model_path = os.path.abspath(model_path)
+        self.max_width, self.max_height = max_frame_size
+        self.capacity = self.max_width * self.max_height * 3
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        self.delegate_path = delegate_path
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.self_check_runs = 10
+
+        self.process = None
+        self.delegate = None
+        self.latency_ms = None
+        self.input_width = self.input_height = None
+        self._conn = None
+        self._shm = None
+        self._frame_buffer = None
+        self._output_buffer = None
+        self._seq = 0
+        self._lock = threading.Lock()  # Una petición en vuelo a la vez
+
+        # Relanzamiento en segundo plano
+        self._restart_thread = None
+        self._restart_delay = RESTART_BACKOFF_INITIAL
+        self._stop_event = threading.Event()
+
+        # Estadísticas
+        self.requests = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.downscaled = 0
+
+    def start(self, self_check_runs=10):
+        """
+        Lanza el proceso hijo y espera a que cargue el modelo
+
+        Args:
+            self_check_runs: Inferencias del autochequeo de latencia
+
+        Returns:
+            dict: Delegado usado y latencia medida en el proceso hijo
+        """
+        self.self_check_runs = self_check_runs
+        self._stop_event.clear()
+        launched = self._launch()
+        with self._lock:
+            self._shutdown()
+            self._install(launched)
+        return launched["info"]
+
+    def _launch(self):
+        """
+        Lanza un proceso hijo y espera a que cargue el modelo (sin tomar el lock)
+
+        Returns:
+            dict: Proceso, conexión, bloque compartido e información del modelo
+        """
+        shm = shared_memory.SharedMemory(create=True, size=self.capacity)
+        authkey = secrets.token_bytes(32)
+        address, socket_dir = _new_address()
+        process = conn = None
+        try:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "services.inference_worker", address],
+                cwd=PROJECT_ROOT,
+                stdin=subprocess.PIPE
+            )
+            # La clave va por stdin para que no aparezca en la lista de procesos
+            process.stdin.write(authkey.hex().encode("ascii") + b"\n")
+            process.stdin.close()
+
+            conn = self._connect(process, address, authkey)
+            conn.send({
+                "shm_name": shm.name,
+                "capacity": self.capacity,
+                "model_path": self.model_path,
+                "num_threads": self.num_threads,
+                "use_xnnpack": self.use_xnnpack,
+                "delegate_path": self.delegate_path,
+                "self_check_runs": self.self_check_runs
+            })
+
+            if not conn.poll(self.start_timeout):
+                raise Exception("el proceso de inferencia no respondió al cargar el modelo")
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = ("error", None, "el proceso de inferencia terminó al arrancar")
+            if message[0] != "ready":
+                raise Exception(message[2])
+        except BaseException:
+            _stop_process(process, conn, shm, timeout=0)
+            raise
+        finally:
+            if socket_dir is not None:
+                shutil.rmtree(socket_dir, ignore_errors=True)
+
+        return {"process": process, "conn": conn, "shm": shm, "info": message[1]}
+
+    def _connect(self, process, address, authkey):
+        """Se conecta al proceso hijo en cuanto este empieza a escuchar"""
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            if process.poll() is not None:
+                raise Exception("el proceso de inferencia terminó al arrancar")
+            try:
+                return Client(address, authkey=authkey)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise Exception("el proceso de inferencia no aceptó la conexión")
+                time.sleep(0.05)
+
+    def _install(self, launched):
+        """Adopta un proceso recién lanzado (llamar con el lock tomado)"""
+        self.process = launched["process"]
+        self._conn = launched["conn"]
+        self._shm = launched["shm"]
+        self._frame_buffer = np.ndarray((self.capacity,), dtype=np.uint8, buffer=self._shm.buf)
+
+        info = launched["info"]
+        self.delegate = info["delegate"]
+        self.latency_ms = info["latency_ms"]
+        self.input_width, self.input_height = info["input_size"]
+        print(f"🧠 Proceso de inferencia activo (pid {self.process.pid})")
+
+    def stop(self, timeout=2.0):
+        """
+        Detiene el proceso hijo (y un relanzamiento en curso) y libera la memoria compartida
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+        """
+        self._stop_event.set()
+        with self._lock:
+            self._shutdown(timeout)
+        thread = self._restart_thread
+        if thread is not None:
+            # Si sigue cargando el modelo, detendrá él mismo el proceso al terminar
+            thread.join(timeout)
+
+    def _shutdown(self, timeout=2.0):
+        """Detiene el proceso actual y libera recursos (llamar con el lock tomado)"""
+        process, conn, shm = self.process, self._conn, self._shm
+        self.process = self._conn = self._shm = None
+        self._frame_buffer = None
+        _stop_process(process, conn, shm, timeout)
+
+    def _schedule_restart(self):
+        """Relanza el proceso en segundo plano si no se está haciendo ya (llamar con el lock tomado)"""
+        if self._stop_event.is_set():
+            return
+        if self._restart_thread is not None and self._restart_thread.is_alive():
+            return
+        self._restart_thread = threading.Thread(target=self._restart_loop, name="inference-restart", daemon=True)
+        self._restart_thread.start()
+
+    def _restart_loop(self):
+        """Relanza el proceso con espera exponencial acotada hasta que cargue el modelo"""
+        while True:
+            with self._lock:
+                delay = self._restart_delay
+                self._restart_delay = min(delay * 2, RESTART_BACKOFF_MAX)
+            if self._stop_event.wait(delay):
+                return
+
+            print("🔄 Relanzando el proceso de inferencia...")
+            try:
+                launched = self._launch()
+            except Exception as e:
+                print(f"⚠️ No se pudo relanzar el proceso de inferencia: {e}")
+                continue
+
+            with self._lock:
+                if not self._stop_event.is_set():
+                    self._install(launched)
+                    self.restarts += 1
+                    return
+            # stop() llegó mientras se cargaba el modelo
+            _stop_process(launched["process"], launched["conn"], launched["shm"])
+            return
+
+    def is_alive(self):
+        """Verifica si el proceso hijo está en marcha"""
+        process = self.process
+        return process is not None and process.poll() is None
+
+    def _write_frame(self, frame):
+        """
+        Copia el frame al bloque compartido
+
+        Returns:
+            tuple: (alto, ancho) del frame escrito
+        """
+        height, width = frame.shape[:2]
+        if height * width * 3 > self.capacity:
+            # Frame mayor que el bloque: reducirlo ya al tamaño de entrada del modelo
+            height, width = self.input_height, self.input_width
+            view = self._frame_buffer[:height * width * 3].reshape(height, width, 3)
+            cv2.resize(frame, (width, height), dst=view, interpolation=cv2.INTER_AREA)
+            self.downscaled += 1
+        else:
+            view = self._frame_buffer[:height * width * 3].reshape(height, width, 3)
+            np.copyto(view, frame)
+        return height, width
+
+    def predict(self, frame):
+        """
+        Ejecuta la inferencia sobre un frame en el proceso hijo
+
+        Si el proceso murió o una inferencia vence (posiblemente colgado en
+        invoke()), se detiene y se relanza en segundo plano; hasta que vuelva a
+        estar listo, predict() lanza InferenceWorkerUnavailable sin esperar.
+
+        Args:
+            frame: Frame BGR (numpy.ndarray); puede ser una vista no contigua
+
+        Returns:
+            numpy.ndarray: Vector de probabilidades (se sobrescribe en la siguiente llamada)
+        """
+        with self._lock:
+            if not self.is_alive():
+                if self.process is not None:
+                    print("⚠️ El proceso de inferencia terminó, se relanzará en segundo plano")
+                    self._shutdown(timeout=0)
+                self._schedule_restart()
+                raise InferenceWorkerUnavailable("el proceso de inferencia se está relanzando")
+
+            height, width = self._write_frame(frame)
+            self._seq += 1
+            seq = self._seq
+            self.requests += 1
+            self._conn.send(("predict", seq, height, width))
+
+            deadline = time.monotonic() + self.timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._conn.poll(remaining):
+                    self.timeouts += 1
+                    print("⚠️ Proceso de inferencia sin respuesta, se detiene y se relanzará")
+                    self._shutdown(timeout=0)
+                    self._schedule_restart()
+                    raise Exception(f"la inferencia superó {self.timeout:.1f}s")
+
+                status, reply_seq, *result = self._conn.recv()
+                if reply_seq != seq:
+                    # Respuesta tardía de una petición que ya venció
+                    continue
+                if status != "ok":
+                    raise Exception(result[0])
+
+                # El proceso responde: el próximo fallo vuelve a la espera mínima
+                self._restart_delay = RESTART_BACKOFF_INITIAL
+                probabilities, _ = result
+                if self._output_buffer is None or self._output_buffer.shape != probabilities.shape:
+                    self._output_buffer = np.empty_like(probabilities)
+                np.copyto(self._output_buffer, probabilities)
+                return self._output_buffer
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas del proceso de inferencia
+
+        Returns:
+            dict: Estado del proceso, peticiones, vencimientos y reinicios
+        """
+        process = self.process
+        restart_thread = self._restart_thread
+        return {
+            "alive": self.is_alive(),
+            "pid": process.pid if process is not None else None,
+            "restarting": restart_thread is not None and restart_thread.is_alive(),
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "downscaled": self.downscaled
+        }
+
+
+def main():
+    """Punto de entrada del proceso hijo: python -m services.inference_worker <dirección>"""
+    address = sys.argv[1]
+    authkey = bytes.fromhex(sys.stdin.readline().strip())
+    with Listener(address, authkey=authkey) as listener:
+        conn = listener.accept()
+    params = conn.recv()
+    _worker_main(conn, **params)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Filtro de Movimiento para el Sistema de Reciclaje Inteligente
+============================================================
+
+Este módulo implementa una etapa previa muy barata a la clasificación con IA:
+compara una versión reducida en escala de grises de cada frame con el frame
+anterior y con una referencia aprendida de la tolva vacía. El modelo solo se
+ejecuta cuando la escena cambia, mientras hay un objeto presente o cuando toca
+una inferencia periódica de control (heartbeat).
+"""
+
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Decide si un frame merece ejecutar el clasificador de IA"""
+
+    def __init__(self, size=(64, 48), pixel_threshold=25, changed_fraction=0.02,
+                 hold_seconds=1.0, heartbeat_seconds=2.0, learning_rate=0.1):
+        """
+        Inicializa el filtro de movimiento
+
+        Args:
+            size: Tamaño (ancho, alto) del frame reducido usado para comparar
+            pixel_threshold: Diferencia mínima de gris para considerar un píxel cambiado
+            changed_fraction: Fracción de píxeles cambiados que se considera cambio de escena
+            hold_seconds: Tiempo que se sigue clasificando tras el último cambio
+            heartbeat_seconds: Intervalo máximo sin ejecutar el clasificador
+            learning_rate: Peso de cada frame vacío al actualizar la referencia
+        """
+        self.width, self.height = size
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_pixels = max(1, int(changed_fraction * self.width * self.height))
+        self.hold_seconds = hold_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.learning_rate = learning_rate
+
+        # Buffers preasignados
+        self._small = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._gray = np.empty((self.height, self.width), dtype=np.uint8)
+        self._previous = np.empty_like(self._gray)
+        self._diff = np.empty_like(self._gray)
+        self._mask = np.empty_like(self._gray)
+        self._reference = np.empty((self.height, self.width), dtype=np.float32)
+        self._reference_u8 = np.empty_like(self._gray)
+
+        self.has_previous = False
+        self.has_reference = False
+        self.last_change_time = 0.0
+        self.last_classify_time = 0.0
+
+        # Estadísticas
+        self.frames_seen = 0
+        self.frames_classified = 0
+
+    def _changed_pixels(self, other):
+        """Cuenta los píxeles del frame actual que difieren de otro frame reducido"""
+        cv2.absdiff(self._gray, other, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._mask)
+        return cv2.countNonZero(self._mask)
+
+    def should_classify(self, frame, now=None):
+        """
+        Evalúa un frame y decide si debe ejecutarse el clasificador
+
+        Args:
+            frame: Frame BGR (ya recortado a la ROI)
+            now: Timestamp actual (opcional, para pruebas)
+
+        Returns:
+            bool: True si se debe clasificar el frame
+        """
+        now = time.time() if now is None else now
+        self.frames_seen += 1
+
+        cv2.resize(frame, (self.width, self.height), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        # Cambio respecto al frame anterior (movimiento)
+        moved = not self.has_previous or self._changed_pixels(self._previous) >= self.min_changed_pixels
+        # Diferencia respecto a la tolva vacía aprendida (objeto presente)
+        occupied = self.has_reference and self._changed_pixels(self._reference_u8) >= self.min_changed_pixels
+
+        self._previous, self._gray = self._gray, self._previous
+        self.has_previous = True
+
+        if moved:
+            self.last_change_time = now
+
+        should = (
+            moved
+            or occupied
+            or (now - self.last_change_time) < self.hold_seconds
+            or (now - self.last_classify_time) >= self.heartbeat_seconds
+        )
+
+        if should:
+            self.last_classify_time = now
+            self.frames_classified += 1
+        return should
+
+    def learn_empty(self):
+        """Actualiza la referencia de tolva vacía con el último frame evaluado"""
+        if not self.has_previous:
+            return
+
+        if not self.has_reference:
+            self._reference[:] = self._previous
+            self.has_reference = True
+        else:
+            cv2.accumulateWeighted(self._previous, self._reference, self.learning_rate)
+        cv2.convertScaleAbs(self._reference, dst=self._reference_u8)
+
+    def reset(self):
+        """Olvida el frame anterior y la referencia aprendida"""
+        self.has_previous = False
+        self.has_reference = False
+        self.last_change_time = 0.0
+        self.last_classify_time = 0.0
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas del filtro
+
+        Returns:
+            dict: Frames vistos, clasificados y proporción omitida
+        """
+        skipped = self.frames_seen - self.frames_classified
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_classified": self.frames_classified,
+            "skip_ratio": skipped / self.frames_seen if self.frames_seen else 0.0,
+            "reference_learned": self.has_reference
+        }
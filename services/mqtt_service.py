@@ -4,19 +4,92 @@ Servicio MQTT para el Sistema de Reciclaje Inteligente
 
 Este módulo maneja toda la comunicación MQTT, incluyendo la conexión,
 suscripción a topics y procesamiento de mensajes de los contenedores.
+Las publicaciones son asíncronas: se encolan, se envían desde un hilo propio
+cuando hay conexión y su confirmación (PUBACK) se notifica por callback.
 """
 
 import json
 import ssl
 import time
 import threading
+from collections import deque, OrderedDict
 import paho.mqtt.client as mqtt
 from config.config import (
     MQTT_BROKER, MQTT_PORT, MQTT_USER, MQTT_PASSWORD, MQTT_TOPIC,
     MQTT_MATERIAL_TOPIC, MQTT_ESP32_TOPIC,
+    MQTT_MAX_INFLIGHT, MQTT_PUBLISH_QUEUE_MAX, MQTT_PUBLISH_TIMEOUT,
     ALLOWED_TARGETS, ALLOWED_STATES
 )
 
+# Un PUBACK anticipado se empareja en milisegundos; pasado este plazo se descarta
+EARLY_ACK_TTL = 5.0
+# mids vencidos recordados para ignorar su PUBACK tardío
+EXPIRED_MIDS_MAX = 256
+
+
+class PublishHandle:
+    """Seguimiento de una publicación asíncrona hasta su confirmación"""
+
+    __slots__ = ("topic", "payload", "qos", "deadline", "callback", "mid",
+                 "state", "error", "created", "completed", "_event")
+
+    def __init__(self, topic, payload, qos=1, timeout=None, callback=None):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.created = time.monotonic()
+        self.deadline = self.created + timeout if timeout else None
+        self.callback = callback
+        self.mid = None
+        self.state = "queued"  # queued | inflight | acked | failed
+        self.error = None
+        self.completed = None
+        self._event = threading.Event()
+
+    @property
+    def done(self):
+        """True si la publicación ya terminó (confirmada o fallida)"""
+        return self._event.is_set()
+
+    @property
+    def succeeded(self):
+        """True si el broker confirmó la publicación"""
+        return self.state == "acked"
+
+    @property
+    def latency_ms(self):
+        """Tiempo desde que se encoló hasta que terminó, en milisegundos"""
+        if self.completed is None:
+            return None
+        return (self.completed - self.created) * 1000
+
+    def wait(self, timeout=None):
+        """
+        Espera a que la publicación termine
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+
+        Returns:
+            bool: True si fue confirmada por el broker
+        """
+        self._event.wait(timeout)
+        return self.succeeded
+
+    def _finish(self, state, error=None):
+        """Marca la publicación como terminada y ejecuta el callback"""
+        if self._event.is_set():
+            return
+        self.state = state
+        self.error = error
+        self.completed = time.monotonic()
+        self._event.set()
+        if self.callback:
+            try:
+                self.callback(self)
+            except Exception as e:
+                print(f"❌ Error en callback de publicación: {e}")
+
 
 class MQTTService:
     """Servicio para manejar la comunicación MQTT"""
@@ -34,10 +107,25 @@ class MQTTService:
         self.client = None
         self.connected = False
         self.thread = None
-        self.connection_lock = threading.Lock()
+        self.is_running = False
+
+        # Publicaciones asíncronas
+        self._outgoing = deque()  # Handles en espera de conexión o de hueco en vuelo
+        self._inflight = {}  # mid -> handle enviado sin PUBACK
+        self._early_acks = OrderedDict()  # mid -> instante de un PUBACK llegado antes de registrar el mid
+        self._expired_mids = OrderedDict()  # mids vencidos en vuelo, cuyo PUBACK tardío se ignora
+        self._publish_condition = threading.Condition()
+        self.sender_thread = None
+
+        # Estadísticas
+        self.published = 0
+        self.publish_failures = 0
 
     def start(self):
-        """Inicia la conexión MQTT en un hilo separado"""
+        """Inicia la conexión MQTT y el hilo de publicación"""
+        self.is_running = True
+        self.sender_thread = threading.Thread(target=self._sender_loop, daemon=True)
+        self.sender_thread.start()
         self.thread = threading.Thread(target=self._connect_and_listen, daemon=True)
         self.thread.start()
 
@@ -66,6 +154,8 @@ class MQTTService:
             self.client.on_connect = self._on_connect
             self.client.on_message = self._on_message
             self.client.on_disconnect = self._on_disconnect
+            self.client.on_publish = self._on_publish
+            self.client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
 
             # Configuraciones específicas para HiveMQ Cloud
             self.client.keepalive = 60
@@ -87,7 +177,9 @@ class MQTTService:
             if rc == 0:
                 # Suscribirse a tópicos
                 client.subscribe(MQTT_TOPIC, qos=1)
-                self.connected = True
+                with self._publish_condition:
+                    self.connected = True
+                    self._publish_condition.notify_all()
                 if self.status_callback:
                     self.status_callback(f"✅ HiveMQ Cloud conectado - Suscrito a: {MQTT_TOPIC}", "success")
                 print(f"✅ Conectado a HiveMQ Cloud - Client ID: {client._client_id}")
@@ -119,6 +211,24 @@ class MQTTService:
         else:
             print("ℹ️ Desconectado de HiveMQ Cloud")
 
+    def _on_publish(self, client, userdata, mid, *args):
+        """Callback cuando el broker confirma una publicación (PUBACK)"""
+        with self._publish_condition:
+            handle = self._inflight.pop(mid, None)
+            if handle is None:
+                if self._expired_mids.pop(mid, None) is not None:
+                    # PUBACK tardío de una publicación ya dada por vencida
+                    return
+                # Confirmación llegada antes de que publish() devolviera el mid
+                now = time.monotonic()
+                self._early_acks[mid] = now
+                while self._early_acks and now - next(iter(self._early_acks.values())) > EARLY_ACK_TTL:
+                    self._early_acks.popitem(last=False)
+                return
+            self._publish_condition.notify_all()
+        self.published += 1
+        handle._finish("acked")
+
     def _on_message(self, client, userdata, msg):
         """Callback cuando se recibe un mensaje MQTT"""
         try:
@@ -219,107 +329,236 @@ class MQTTService:
         """Verifica si está conectado al broker MQTT"""
         return self.connected
 
-    def send_material_detected(self, material, points, image_path=None):
+    def publish_async(self, topic, payload, qos=1, timeout=None, callback=None):
+        """
+        Encola una publicación y retorna inmediatamente
+
+        Args:
+            topic: Tópico de destino
+            payload: Contenido (str o bytes)
+            qos: Calidad de servicio
+            timeout: Segundos tras los que se descarta si no fue confirmada (opcional)
+            callback: Función(handle) llamada al confirmarse o fallar
+
+        Returns:
+            PublishHandle: Seguimiento de la publicación
+        """
+        handle = PublishHandle(topic, payload, qos=qos, timeout=timeout, callback=callback)
+        dropped = None
+        with self._publish_condition:
+            if len(self._outgoing) >= MQTT_PUBLISH_QUEUE_MAX:
+                dropped = self._outgoing.popleft()
+            self._outgoing.append(handle)
+            self._publish_condition.notify_all()
+
+        if dropped is not None:
+            self.publish_failures += 1
+            dropped._finish("failed", "cola de publicación llena")
+        return handle
+
+    def _sender_loop(self):
+        """Envía las publicaciones encoladas respetando el límite en vuelo y los plazos"""
+        while True:
+            expired = []
+            to_send = None
+            with self._publish_condition:
+                while self.is_running:
+                    expired = self._collect_expired()
+                    if expired:
+                        break
+                    if self._outgoing and self.connected and self.client and len(self._inflight) < MQTT_MAX_INFLIGHT:
+                        to_send = self._outgoing.popleft()
+                        break
+                    # Despertar periódicamente para revisar plazos vencidos
+                    self._publish_condition.wait(timeout=0.2 if (self._outgoing or self._inflight) else None)
+                if not self.is_running:
+                    return
+
+            if expired:
+                # Que paho no reenvíe al reconectar un comando ya dado por vencido
+                self._forget_in_paho([h.mid for h in expired if h.mid is not None])
+            for handle in expired:
+                self.publish_failures += 1
+                handle._finish("failed", "tiempo de espera agotado")
+
+            if to_send is not None:
+                self._send(to_send)
+
+    def _collect_expired(self):
+        """Retira las publicaciones con plazo vencido (llamar con el lock tomado)"""
+        now = time.monotonic()
+        expired = [h for h in self._outgoing if h.deadline is not None and h.deadline <= now]
+        for handle in expired:
+            self._outgoing.remove(handle)
+        for mid, handle in list(self._inflight.items()):
+            if handle.deadline is not None and handle.deadline <= now:
+                del self._inflight[mid]
+                expired.append(handle)
+                # paho puede seguir reenviándolo: ignorar su PUBACK si llega
+                self._expired_mids[mid] = now
+                if len(self._expired_mids) > EXPIRED_MIDS_MAX:
+                    self._expired_mids.popitem(last=False)
+        return expired
+
+    def _forget_in_paho(self, mids):
+        """
+        Quita mensajes de la cola interna de paho para que no los reenvíe al reconectar
+
+        No llamar con el lock propio tomado: paho ejecuta on_publish con su
+        mutex tomado y on_publish toma el lock propio.
+
+        Args:
+            mids: Identificadores de los mensajes a olvidar
+        """
+        client = self.client
+        if client is None or not mids:
+            return
+        with client._out_message_mutex:
+            for mid in mids:
+                message = client._out_messages.pop(mid, None)
+                awaiting_ack = (mqtt.mqtt_ms_wait_for_puback, mqtt.mqtt_ms_wait_for_pubrec)
+                if message is not None and message.state in awaiting_ack:
+                    # Ocupaba un hueco en vuelo de paho que ya no liberará un PUBACK
+                    client._inflight_messages -= 1
+
+    def _send(self, handle):
+        """Publica un handle en el broker sin tomar el lock propio durante la llamada a paho"""
+        try:
+            info = self.client.publish(handle.topic, handle.payload, qos=handle.qos)
+        except Exception as e:
+            self.publish_failures += 1
+            handle._finish("failed", str(e))
+            return
+
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            if info.rc in (mqtt.MQTT_ERR_NO_CONN, mqtt.MQTT_ERR_QUEUE_SIZE):
+                if info.rc == mqtt.MQTT_ERR_NO_CONN and handle.qos > 0:
+                    # Con QoS >= 1 paho guarda el mensaje para enviarlo al reconectar,
+                    # sin plazo: quitárselo para que solo se envíe desde la cola propia
+                    self._forget_in_paho([info.mid])
+                # Volver a la cabeza de la cola hasta que haya conexión o venza
+                with self._publish_condition:
+                    self._outgoing.appendleft(handle)
+                    self._publish_condition.wait(timeout=0.2)
+            else:
+                self.publish_failures += 1
+                handle._finish("failed", mqtt.error_string(info.rc))
+            return
+
+        handle.mid = info.mid
+        if handle.qos == 0:
+            self.published += 1
+            handle._finish("acked")
+            return
+
+        with self._publish_condition:
+            self._expired_mids.pop(info.mid, None)  # El mid se reutilizó tras dar la vuelta
+            acked = self._early_acks.pop(info.mid, None) is not None
+            if not acked:
+                handle.state = "inflight"
+                self._inflight[info.mid] = handle
+        if acked:
+            self.published += 1
+            handle._finish("acked")
+
+    def send_material_detected(self, material, points, image_path=None, callback=None):
         """
         Envía un material detectado a la ESP32 para mover compartimientos
-        
+
+        No bloquea: si el broker está reconectando, el mensaje espera en la
+        cola propia (no se entrega a paho sin conexión) hasta
+        MQTT_PUBLISH_TIMEOUT segundos y después se descarta por obsoleto. Si
+        vence ya enviado, se retira también de la cola de reenvío de paho; como
+        el broker pudo recibirlo igualmente, el mensaje lleva "expires_at" para
+        que la ESP32 ignore un comando que le llegue tarde.
+
         Args:
             material: Tipo de material detectado (plastico, aluminio)
             points: Puntos otorgados por el material
             image_path: Ruta de la imagen capturada (opcional)
+            callback: Función(handle) llamada al confirmarse o fallar el envío
+
+        Returns:
+            PublishHandle: Seguimiento de la publicación
         """
-        # Esperar hasta 5 segundos a que la conexión esté lista
-        max_wait = 50  # 5 segundos con checks cada 100ms
-        wait_count = 0
-        
-        while not self.connected and wait_count < max_wait:
-            time.sleep(0.1)
-            wait_count += 1
-        
-        if not self.connected or not self.client:
-            print("❌ MQTT no conectado después de esperar - No se puede enviar material")
-            print(f"🔍 Estado: connected={self.connected}, client={self.client is not None}")
-            return False
-        
-        try:
-            with self.connection_lock:
-                # Crear mensaje para ESP32
-                message = {
-                    "action": "move_compartment",
-                    "material": material.lower(),
-                    "points": points,
-                    "timestamp": int(time.time()),
-                    "source": "raspberry_pi"
-                }
-                
-                # Agregar ruta de imagen si existe
-                if image_path:
-                    message["image_path"] = image_path
-                
-                # Convertir a JSON
-                payload = json.dumps(message)
-                
-                # Publicar en tópico de materiales detectados
-                result = self.client.publish(MQTT_MATERIAL_TOPIC, payload, qos=1)
-                
-                if result.rc == 0:
-                    print(f"✅ Material enviado a ESP32: {material} ({points} pts)")
-                    print(f"📡 Tópico: {MQTT_MATERIAL_TOPIC}")
-                    print(f"📦 Payload: {payload}")
-                    return True
-                else:
-                    print(f"❌ Error enviando material: {result.rc}")
-                    return False
-                    
-        except Exception as e:
-            print(f"❌ Error enviando material a ESP32: {e}")
-            return False
+        # Crear mensaje para ESP32
+        message = {
+            "action": "move_compartment",
+            "material": material.lower(),
+            "points": points,
+            "timestamp": int(time.time()),
+            "expires_at": int(time.time() + MQTT_PUBLISH_TIMEOUT),
+            "source": "raspberry_pi"
+        }
+
+        # Agregar ruta de imagen si existe
+        if image_path:
+            message["image_path"] = image_path
+
+        payload = json.dumps(message)
+
+        def on_done(handle):
+            if handle.succeeded:
+                print(f"✅ Material confirmado por el broker: {material} ({points} pts) en {handle.latency_ms:.0f} ms")
+            else:
+                print(f"❌ Error enviando material a ESP32: {handle.error}")
+            if callback:
+                callback(handle)
 
-    def send_esp32_command(self, command, data=None):
+        return self.publish_async(MQTT_MATERIAL_TOPIC, payload, qos=1,
+                                  timeout=MQTT_PUBLISH_TIMEOUT, callback=on_done)
+
+    def send_esp32_command(self, command, data=None, callback=None):
         """
         Envía un comando específico a la ESP32
-        
+
         Args:
             command: Comando a enviar (move_plastico, move_aluminio, reset, status)
             data: Datos adicionales del comando (opcional)
+            callback: Función(handle) llamada al confirmarse o fallar el envío
+
+        Returns:
+            PublishHandle: Seguimiento de la publicación
         """
-        if not self.connected or not self.client:
-            print("❌ MQTT no conectado - No se puede enviar comando")
-            return False
-        
-        try:
-            # Crear mensaje de comando
-            message = {
-                "command": command,
-                "timestamp": int(time.time()),
-                "source": "raspberry_pi"
-            }
-            
-            # Agregar datos adicionales si existen
-            if data:
-                message.update(data)
-            
-            # Convertir a JSON
-            payload = json.dumps(message)
-            
-            # Publicar en tópico de comandos ESP32
-            result = self.client.publish(MQTT_ESP32_TOPIC, payload, qos=1)
-            
-            if result.rc == 0:
-                print(f"✅ Comando enviado a ESP32: {command}")
-                print(f"📡 Tópico: {MQTT_ESP32_TOPIC}")
-                print(f"📦 Payload: {payload}")
-                return True
-            else:
-                print(f"❌ Error enviando comando: {result.rc}")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error enviando comando a ESP32: {e}")
-            return False
+        # Crear mensaje de comando
+        message = {
+            "command": command,
+            "timestamp": int(time.time()),
+            "expires_at": int(time.time() + MQTT_PUBLISH_TIMEOUT),
+            "source": "raspberry_pi"
+        }
+
+        # Agregar datos adicionales si existen
+        if data:
+            message.update(data)
+
+        payload = json.dumps(message)
+        print(f"📡 Comando encolado para ESP32: {command}")
+        return self.publish_async(MQTT_ESP32_TOPIC, payload, qos=1,
+                                  timeout=MQTT_PUBLISH_TIMEOUT, callback=callback)
+
+    def get_publish_stats(self):
+        """
+        Obtiene estadísticas de publicación
+
+        Returns:
+            dict: Publicaciones en cola, en vuelo, confirmadas y fallidas
+        """
+        with self._publish_condition:
+            queued = len(self._outgoing)
+            inflight = len(self._inflight)
+        return {
+            "queued": queued,
+            "inflight": inflight,
+            "published": self.published,
+            "failures": self.publish_failures
+        }
 
     def disconnect(self):
         """Desconecta del broker MQTT"""
+        with self._publish_condition:
+            self.is_running = False
+            self._publish_condition.notify_all()
         if self.client:
             self.client.disconnect()
             self.connected = False
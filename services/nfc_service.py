@@ -3,19 +3,55 @@ Servicio NFC para el Sistema de Reciclaje Inteligente
 ===================================================
 
 Este módulo maneja la lectura de tarjetas NFC, incluyendo la detección
-de tarjetas, extracción del UID y monitoreo continuo.
+de tarjetas, extracción del UID y monitoreo continuo. La llegada de
+tarjetas la notifica CardMonitor de pyscard, que espera en
+SCardGetStatusChange en lugar de enviar un comando al lector en cada
+iteración. La conexión/desconexión de lectores no es por eventos:
+ReaderMonitor sondea readers() cada segundo y avisa solo cuando la lista
+cambia. Los pases se encolan y un hilo propio ejecuta el callback, de modo
+que el lector nunca queda sordo mientras la aplicación consulta Firebase.
 """
 
 import time
 import threading
+from collections import deque
+from config.config import NFC_DEBOUNCE_SECONDS, NFC_EVENT_QUEUE_MAX
 try:
     from smartcard.System import readers
     from smartcard.util import toHexString
+    from smartcard.CardMonitoring import CardMonitor, CardObserver
+    from smartcard.ReaderMonitoring import ReaderMonitor, ReaderObserver
     SMARTCARD_AVAILABLE = True
 except ImportError:
     SMARTCARD_AVAILABLE = False
+    CardObserver = ReaderObserver = object
     print("⚠️ smartcard no disponible - NFC deshabilitado")
 
+# Comando APDU para obtener el UID de la tarjeta
+GET_UID = [0xFF, 0xCA, 0x00, 0x00, 0x00]
+
+
+class _CardArrivalObserver(CardObserver):
+    """Reenvía al servicio las tarjetas insertadas en cualquier lector"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def update(self, observable, actions):
+        added_cards, _ = actions
+        for card in added_cards:
+            self.service._on_card_inserted(card)
+
+
+class _ReaderHotplugObserver(ReaderObserver):
+    """Mantiene la lista de lectores al conectarse o desconectarse"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def update(self, observable, actions):
+        self.service._on_readers_changed()
+
 
 class NFCService:
     """Servicio para manejar la lectura de tarjetas NFC"""
@@ -25,14 +61,27 @@ class NFCService:
         Inicializa el servicio NFC
 
         Args:
-            card_callback: Función callback cuando se detecta una tarjeta
+            card_callback: Función(uid, tapped_at) llamada por cada pase de tarjeta;
+                tapped_at es el instante del pase (time.monotonic)
             status_callback: Función callback para actualizar el estado en la UI
         """
         self.card_callback = card_callback
         self.status_callback = status_callback
         self.is_running = False
-        self.monitor_thread = None
         self.reader_available = False
+        self.reader_list = []  # Lectores cacheados, se refrescan solo por hotplug
+        self.card_monitor = None
+        self.reader_monitor = None
+        self._card_observer = None
+        self._reader_observer = None
+
+        # Cola de pases procesada por un hilo propio
+        self._events = deque(maxlen=NFC_EVENT_QUEUE_MAX)
+        self._events_condition = threading.Condition()
+        self._last_tap = {}  # uid -> instante del último pase aceptado
+        self.worker_thread = None
+        self.debounced = 0
+
         self._check_reader_availability()
 
     def _check_reader_availability(self):
@@ -43,99 +92,142 @@ class NFCService:
                 print("⚠️ smartcard no disponible - NFC deshabilitado")
                 return
                 
-            available_readers = readers()
-            self.reader_available = len(available_readers) > 0
+            self.reader_list = readers()
+            self.reader_available = len(self.reader_list) > 0
             if self.reader_available:
-                print(f"✅ Lector NFC encontrado: {available_readers[0]}")
+                print(f"✅ Lector NFC encontrado: {self.reader_list[0]}")
             else:
                 print("⚠️ No se encontraron lectores NFC")
         except Exception as e:
+            self.reader_list = []
             self.reader_available = False
             print(f"❌ Error verificando lectores NFC: {e}")
 
+    def _on_readers_changed(self):
+        """Refresca la lista cacheada de lectores cuando ReaderMonitor detecta un cambio"""
+        was_available = self.reader_available
+        self._check_reader_availability()
+        if self.status_callback and was_available != self.reader_available:
+            if self.reader_available:
+                self.status_callback("🎫 NFC: ✅ Lector conectado", "success")
+            else:
+                self.status_callback("❌ Lector NFC desconectado", "error")
+
     def start_monitoring(self):
-        """Inicia el monitoreo de tarjetas NFC en un hilo separado"""
-        if not self.reader_available:
+        """Registra los observadores de tarjetas y lectores (hilos propios de pyscard)"""
+        if not SMARTCARD_AVAILABLE:
             if self.status_callback:
                 self.status_callback("❌ No hay lectores NFC disponibles", "error")
             return
 
         self.is_running = True
-        self.monitor_thread = threading.Thread(target=self._monitor_cards, daemon=True)
-        self.monitor_thread.start()
+        self.worker_thread = threading.Thread(target=self._event_worker, daemon=True)
+        self.worker_thread.start()
+
+        # Hotplug: un lector conectado después del arranque también se usa
+        # (ReaderMonitor compara readers() cada segundo)
+        self.reader_monitor = ReaderMonitor()
+        self._reader_observer = _ReaderHotplugObserver(self)
+        self.reader_monitor.addObserver(self._reader_observer)
+
+        # Llegada de tarjetas: notificada en cuanto el lector la detecta
+        self.card_monitor = CardMonitor()
+        self._card_observer = _CardArrivalObserver(self)
+        self.card_monitor.addObserver(self._card_observer)
 
         if self.status_callback:
-            self.status_callback("🎫 NFC: ✅ Activo", "success")
+            if self.reader_available:
+                self.status_callback("🎫 NFC: ✅ Activo", "success")
+            else:
+                self.status_callback("❌ No hay lectores NFC disponibles - esperando conexión", "error")
 
     def stop_monitoring(self):
         """Detiene el monitoreo de tarjetas NFC"""
-        self.is_running = False
-        if self.monitor_thread:
-            self.monitor_thread.join(timeout=1)
-
-    def _monitor_cards(self):
-        """Monitorea continuamente la presencia de tarjetas NFC"""
-        while self.is_running:
-            try:
-                if not self.reader_available or not SMARTCARD_AVAILABLE:
-                    time.sleep(1)
-                    continue
-
-                # Obtener lectores disponibles
-                available_readers = readers()
-                if not available_readers:
-                    time.sleep(1)
-                    continue
-
-                reader = available_readers[0]
-                connection = reader.createConnection()
-
-                # Comando para obtener UID
-                GET_UID = [0xFF, 0xCA, 0x00, 0x00, 0x00]
-
-                # Intentar conectar y leer UID
-                connection.connect()
-                data, sw1, sw2 = connection.transmit(GET_UID)
-                connection.disconnect()
-
-                # Verificar si la operación fue exitosa
-                if sw1 == 0x90:
-                    uid = ''.join(toHexString(data).split()).upper()
-
-                    if self.status_callback:
-                        self.status_callback(f"🎫 Tarjeta NFC detectada: {uid[:8]}...", "info")
+        with self._events_condition:
+            self.is_running = False
+            self._events_condition.notify_all()
+        if self.card_monitor and self._card_observer:
+            self.card_monitor.deleteObserver(self._card_observer)
+        if self.reader_monitor and self._reader_observer:
+            self.reader_monitor.deleteObserver(self._reader_observer)
+        self.card_monitor = None
+        self.reader_monitor = None
+        if self.worker_thread:
+            self.worker_thread.join(timeout=1)
+            self.worker_thread = None
+
+    def _on_card_inserted(self, card):
+        """
+        Lee el UID de una tarjeta recién insertada y encola el pase
 
-                    # Llamar callback con el UID de la tarjeta
-                    if self.card_callback:
-                        self.card_callback(uid)
+        Una tarjeta que permanece en el lector no genera nuevos eventos, por lo
+        que no hace falta esperar a que se retire.
 
-                    # Esperar a que se retire la tarjeta
-                    self._wait_for_card_removal(reader)
+        Args:
+            card: Tarjeta reportada por CardMonitor
+        """
+        if not self.is_running:
+            return
 
-            except Exception as e:
-                # Error silencioso para evitar spam en consola
-                # Los errores son normales cuando no hay tarjeta presente
-                pass
+        tapped_at = time.monotonic()
+        uid = self._read_uid(card.createConnection())
+        if uid is None:
+            return
 
-            time.sleep(0.2)  # Pequeña pausa para no sobrecargar el CPU
+        with self._events_condition:
+            # Ignorar pases repetidos de la misma tarjeta dentro de la ventana
+            last = self._last_tap.get(uid)
+            if last is not None and tapped_at - last < NFC_DEBOUNCE_SECONDS:
+                self.debounced += 1
+                return
+            self._last_tap[uid] = tapped_at
+            if len(self._last_tap) > 256:
+                self._last_tap = {k: t for k, t in self._last_tap.items() if tapped_at - t < NFC_DEBOUNCE_SECONDS}
+            self._events.append((uid, tapped_at))
+            self._events_condition.notify()
 
-    def _wait_for_card_removal(self, reader):
+        if self.status_callback:
+            self.status_callback(f"🎫 Tarjeta NFC detectada: {uid[:8]}...", "info")
+
+    def _event_worker(self):
+        """Entrega los pases encolados al callback, fuera del hilo del monitor"""
+        while True:
+            with self._events_condition:
+                self._events_condition.wait_for(lambda: self._events or not self.is_running)
+                if not self.is_running:
+                    return
+                uid, tapped_at = self._events.popleft()
+
+            if self.card_callback:
+                try:
+                    self.card_callback(uid, tapped_at)
+                except Exception as e:
+                    print(f"❌ Error procesando tarjeta NFC: {e}")
+
+    def _read_uid(self, connection):
         """
-        Espera a que se retire la tarjeta del lector
+        Obtiene el UID de la tarjeta de una conexión
 
         Args:
-            reader: Instancia del lector NFC
+            connection: Conexión PC/SC sin abrir
+
+        Returns:
+            str: UID de la tarjeta o None si no se puede leer
         """
-        while self.is_running:
+        try:
+            connection.connect()
             try:
-                # Intentar conectar - si falla, la tarjeta fue retirada
-                connection = reader.createConnection()
-                connection.connect()
+                data, sw1, sw2 = connection.transmit(GET_UID)
+            finally:
                 connection.disconnect()
-            except Exception:
-                # La tarjeta fue retirada
-                break
-            time.sleep(0.2)
+
+            if sw1 == 0x90:
+                return ''.join(toHexString(data).split()).upper()
+
+        except Exception as e:
+            print(f"❌ Error leyendo tarjeta NFC: {e}")
+
+        return None
 
     def read_card_uid(self):
         """
@@ -145,24 +237,10 @@ class NFCService:
             str: UID de la tarjeta o None si no se puede leer
         """
         try:
-            if not self.reader_available or not SMARTCARD_AVAILABLE:
+            if not self.reader_available or not SMARTCARD_AVAILABLE or not self.reader_list:
                 return None
 
-            available_readers = readers()
-            if not available_readers:
-                return None
-
-            reader = available_readers[0]
-            connection = reader.createConnection()
-            GET_UID = [0xFF, 0xCA, 0x00, 0x00, 0x00]
-
-            connection.connect()
-            data, sw1, sw2 = connection.transmit(GET_UID)
-            connection.disconnect()
-
-            if sw1 == 0x90:
-                uid = ''.join(toHexString(data).split()).upper()
-                return uid
+            return self._read_uid(self.reader_list[0].createConnection())
 
         except Exception as e:
             print(f"❌ Error leyendo tarjeta NFC: {e}")
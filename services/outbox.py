@@ -0,0 +1,280 @@
+"""
+Bandeja de Salida Persistente para el Sistema de Reciclaje Inteligente
+=====================================================================
+
+Este módulo implementa una bandeja de salida (outbox) en SQLite para las
+operaciones que no deben perderse si el kiosco se queda sin conexión:
+otorgamientos de puntos y telemetría de contenedores. Cada operación se
+guarda en disco al instante con una clave de idempotencia y un hilo dedicado
+la reenvía en orden cuando vuelve la conectividad. Los fallos transitorios se
+reintentan sin límite; solo las operaciones que no pueden enviarse nunca (tipo
+desconocido o datos corruptos) se apartan a una tabla de fallidas para no
+bloquear a las siguientes.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class PermanentDeliveryError(Exception):
+    """Error de envío que no se resolverá reintentando"""
+
+
+# Errores de un manejador que indican datos inválidos, no falta de conexión.
+# ValueError queda fuera a propósito: también lo lanzan una respuesta JSON
+# ilegible (p. ej. la página HTML de un portal cautivo) o Firebase sin
+# inicializar, y esos casos se resuelven reintentando.
+PERMANENT_ERRORS = (PermanentDeliveryError, KeyError, TypeError)
+
+
+class DurableOutbox:
+    """Cola persistente y ordenada de operaciones pendientes de enviar"""
+
+    def __init__(self, db_path, retry_max_seconds=30, status_callback=None):
+        """
+        Inicializa la bandeja de salida
+
+        Args:
+            db_path: Ruta del archivo SQLite
+            retry_max_seconds: Espera máxima entre reintentos
+            status_callback: Función callback para actualizar el estado en la UI
+        """
+        self.db_path = db_path
+        self.retry_max_seconds = retry_max_seconds
+        self.status_callback = status_callback
+        self.is_running = False
+        self.thread = None
+
+        self._handlers = {}  # tipo -> función(payload, intentos)
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()  # Serializa el acceso a la conexión
+        self._loop_done = True
+        self._close_on_exit = False
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " key TEXT NOT NULL UNIQUE,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox_dead ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " attempts INTEGER NOT NULL,"
+            " error TEXT NOT NULL,"
+            " failed_at REAL NOT NULL)"
+        )
+
+        # Estadísticas
+        self.delivered = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+    def register_handler(self, kind, handler):
+        """
+        Registra la función que envía las operaciones de un tipo
+
+        Args:
+            kind: Tipo de operación (p. ej. "points_award")
+            handler: Función(payload, intentos) que lanza excepción si falla
+        """
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Inicia el hilo de reenvío"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._loop_done = False
+        self.thread = threading.Thread(target=self._replay_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        """
+        Detiene el hilo de reenvío (lo pendiente queda en disco)
+
+        Args:
+            timeout: Tiempo máximo de espera en segundos
+        """
+        with self._condition:
+            self.is_running = False
+            self._condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+        with self._condition:
+            if not self._loop_done:
+                # El hilo sigue dentro de un envío: cerrará la conexión al salir
+                self._close_on_exit = True
+                return
+        self.thread = None
+        with self._lock:
+            self._conn.close()
+
+    def put(self, kind, key, payload, replace=False):
+        """
+        Guarda una operación en disco y despierta al hilo de reenvío
+
+        Args:
+            kind: Tipo de operación
+            key: Clave de idempotencia (única)
+            payload: Datos serializables a JSON
+            replace: Si True, sustituye una operación pendiente con la misma clave
+
+        Returns:
+            bool: True si la operación quedó guardada
+        """
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"{verb} INTO outbox (key, kind, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (key, kind, json.dumps(payload), time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"❌ Error guardando en la bandeja de salida: {e}")
+            return False
+
+        with self._condition:
+            self._condition.notify()
+        return True
+
+    def get_payload(self, key):
+        """
+        Obtiene los datos de una operación pendiente
+
+        Args:
+            key: Clave de idempotencia
+
+        Returns:
+            Datos de la operación, o None si no hay ninguna pendiente con esa clave
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM outbox WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def pending_count(self):
+        """Número de operaciones pendientes de enviar"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def dead_count(self):
+        """Número de operaciones apartadas como fallidas"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox_dead").fetchone()[0]
+
+    def _dead_letter(self, entry_id, key, kind, attempts, error):
+        """Mueve una operación a la tabla de fallidas para que no bloquee la cola"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO outbox_dead (id, key, kind, payload, created_at, attempts, error, failed_at)"
+                    " SELECT id, key, kind, payload, created_at, ?, ?, ? FROM outbox WHERE id = ?",
+                    (attempts, str(error), time.time(), entry_id)
+                )
+                self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        self.dead_lettered += 1
+        print(f"🪦 Operación {key} ({kind}) apartada tras {attempts} intentos: {error}")
+        if self.status_callback:
+            self.status_callback(f"⚠️ Operación pendiente descartada ({kind}): {error}", "warning")
+
+    def _next_entry(self):
+        """Obtiene la operación pendiente más antigua"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, key, kind, payload, attempts FROM outbox ORDER BY id LIMIT 1"
+            ).fetchone()
+
+    def _replay_loop(self):
+        """Ejecuta el bucle de reenvío y, si stop() ya no pudo esperarlo, cierra la conexión"""
+        try:
+            self._replay_pending()
+        finally:
+            with self._condition:
+                self._loop_done = True
+                close = self._close_on_exit
+            if close:
+                with self._lock:
+                    self._conn.close()
+
+    def _replay_pending(self):
+        """Envía las operaciones en orden; ante un fallo espera y reintenta la misma"""
+        initial_delay = min(1.0, self.retry_max_seconds)
+        retry_delay = initial_delay
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: not self.is_running or self._next_entry() is not None)
+                if not self.is_running:
+                    return
+
+            entry_id, key, kind, payload, attempts = self._next_entry()
+            handler = self._handlers.get(kind)
+
+            try:
+                if handler is None:
+                    raise PermanentDeliveryError(f"sin manejador para '{kind}'")
+                try:
+                    data = json.loads(payload)
+                except ValueError as e:
+                    raise PermanentDeliveryError(f"datos guardados ilegibles: {e}")
+                handler(data, attempts)
+
+                with self._lock:
+                    self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+                self.delivered += 1
+                retry_delay = initial_delay
+
+            except Exception as e:
+                self.failures += 1
+                if isinstance(e, PERMANENT_ERRORS):
+                    # Reintentar no servirá: apartarla y seguir con la siguiente,
+                    # que no tiene por qué heredar la espera acumulada
+                    self._dead_letter(entry_id, key, kind, attempts + 1, e)
+                    retry_delay = initial_delay
+                    continue
+
+                with self._lock:
+                    self._conn.execute("UPDATE outbox SET attempts = attempts + 1 WHERE id = ?", (entry_id,))
+                print(f"⚠️ Reenvío pendiente de {key} ({kind}), reintento en {retry_delay:.0f}s: {e}")
+
+                # Espera exponencial acotada, interrumpible al detener
+                with self._condition:
+                    self._condition.wait_for(lambda: not self.is_running, timeout=retry_delay)
+                retry_delay = min(retry_delay * 2, self.retry_max_seconds)
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas de la bandeja de salida
+
+        Returns:
+            dict: Operaciones pendientes, entregadas, fallos y apartadas
+        """
+        return {
+            "pending": self.pending_count(),
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "dead": self.dead_count()
+        }
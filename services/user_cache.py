@@ -0,0 +1,149 @@
+"""
+Caché de Usuarios por Tarjeta NFC para el Sistema de Reciclaje Inteligente
+=========================================================================
+
+Este módulo mantiene en memoria la relación tarjeta NFC -> usuario (uid,
+nombre, correo y puntos) con política LRU, caducidad por tiempo y caché
+negativa para tarjetas desconocidas. Así un pase de tarjeta habitual no
+necesita ninguna lectura a Firebase; los listeners de RTDB invalidan las
+entradas cuando cambia el índice de tarjetas.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class UserLookupCache:
+    """Caché LRU con TTL de usuarios indexados por UID de tarjeta"""
+
+    def __init__(self, max_entries=256, ttl=600, negative_ttl=30):
+        """
+        Inicializa la caché
+
+        Args:
+            max_entries: Número máximo de tarjetas recordadas
+            ttl: Segundos de validez de un usuario encontrado
+            negative_ttl: Segundos de validez de una tarjeta no registrada
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # nfc_id -> (expira, usuario o None)
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, nfc_id, now=None):
+        """
+        Busca una tarjeta en la caché
+
+        Args:
+            nfc_id: UID de la tarjeta
+            now: Timestamp actual (opcional, para pruebas)
+
+        Returns:
+            tuple: (encontrada, usuario). usuario es None si la tarjeta se
+            sabe desconocida; encontrada es False si hay que consultar Firebase
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(nfc_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[nfc_id]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(nfc_id)
+            self.hits += 1
+            return True, dict(entry[1]) if entry[1] is not None else None
+
+    def put(self, nfc_id, user, now=None):
+        """
+        Guarda el resultado de una búsqueda
+
+        Args:
+            nfc_id: UID de la tarjeta
+            user: Diccionario con uid, nombre, email y puntos, o None si no existe
+            now: Timestamp actual (opcional, para pruebas)
+        """
+        now = time.monotonic() if now is None else now
+        ttl = self.ttl if user is not None else self.negative_ttl
+        with self._lock:
+            self._entries[nfc_id] = (now + ttl, dict(user) if user is not None else None)
+            self._entries.move_to_end(nfc_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_user(self, uid):
+        """
+        Busca un usuario cacheado por su uid (sin tener en cuenta la tarjeta)
+
+        Args:
+            uid: ID del usuario
+
+        Returns:
+            dict: Copia de los datos del usuario o None si no está en caché
+        """
+        now = time.monotonic()
+        with self._lock:
+            for expires, user in self._entries.values():
+                if user is not None and user["uid"] == uid and expires > now:
+                    return dict(user)
+        return None
+
+    def update_points(self, uid, points):
+        """
+        Actualiza los puntos cacheados de un usuario
+
+        Args:
+            uid: ID del usuario
+            points: Nuevo total de puntos
+        """
+        with self._lock:
+            for _, user in self._entries.values():
+                if user is not None and user["uid"] == uid:
+                    user["points"] = points
+
+    def invalidate(self, nfc_id=None):
+        """
+        Descarta una tarjeta o toda la caché
+
+        Args:
+            nfc_id: UID de la tarjeta (None para vaciar la caché)
+        """
+        with self._lock:
+            if nfc_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(nfc_id, None)
+
+    def invalidate_user(self, uid):
+        """
+        Descarta todas las tarjetas asociadas a un usuario
+
+        Args:
+            uid: ID del usuario
+        """
+        with self._lock:
+            stale = [nfc_id for nfc_id, (_, user) in self._entries.items()
+                     if user is not None and user["uid"] == uid]
+            for nfc_id in stale:
+                del self._entries[nfc_id]
+
+    def get_stats(self):
+        """
+        Obtiene estadísticas de la caché
+
+        Returns:
+            dict: Entradas, aciertos y fallos
+        """
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,198 @@
+"""
+Pruebas de la máquina de estados del reclamo de puntos (reloj y temporizadores falsos)
+"""
+
+from services.claim_session import (
+    ClaimSession, IDLE, AWAITING_NFC, AWARDING, AWARDED
+)
+
+
+class FakeClock:
+    """Reloj manual: el tiempo solo avanza con advance()"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeTimer:
+    """Temporizador que solo dispara cuando la prueba lo pide"""
+
+    def __init__(self, interval, function, args=()):
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.daemon = False
+        self.started = False
+        self.cancelled = False
+
+    def start(self):
+        self.started = True
+
+    def cancel(self):
+        self.cancelled = True
+
+    def fire(self):
+        if not self.cancelled:
+            self.function(*self.args)
+
+
+class TimerFactory:
+    """Registra los temporizadores creados por la sesión"""
+
+    def __init__(self):
+        self.timers = []
+
+    def __call__(self, interval, function, args=()):
+        timer = FakeTimer(interval, function, args)
+        self.timers.append(timer)
+        return timer
+
+    @property
+    def last(self):
+        return self.timers[-1]
+
+
+def make_session(timeout=30):
+    clock = FakeClock()
+    timers = TimerFactory()
+    expired = []
+    session = ClaimSession(timeout, on_expired=expired.append, clock=clock, timer_factory=timers)
+    return session, clock, timers, expired
+
+
+def test_detect_then_expire():
+    session, clock, timers, expired = make_session()
+
+    claim = session.detect("plastico", 20)
+    assert session.state == AWAITING_NFC
+    assert claim.points == 20
+    assert timers.last.interval == 30
+
+    clock.advance(30)
+    timers.last.fire()
+
+    assert expired == [claim]
+    assert session.state == IDLE
+    assert session.get_pending() is None
+    assert not session.is_active()
+
+
+def test_detect_extends_basket_and_restarts_timer():
+    session, clock, timers, expired = make_session()
+
+    session.detect("plastico", 20)
+    first_timer = timers.last
+    clock.advance(10)
+    claim = session.detect("aluminio", 30)
+
+    assert first_timer.cancelled
+    assert timers.last is not first_timer
+    assert claim.materials == ["plastico", "aluminio"]
+    assert claim.points == 50
+    assert session.remaining() == 30
+
+    # El temporizador anterior ya no vence el reclamo
+    first_timer.function(*first_timer.args)
+    assert expired == []
+    assert session.state == AWAITING_NFC
+
+
+def test_begin_award_stops_timer():
+    session, clock, timers, expired = make_session()
+
+    session.detect("plastico", 20)
+    timer = timers.last
+    claim = session.begin_award()
+
+    assert claim is not None
+    assert session.state == AWARDING
+    assert timer.cancelled
+    assert session.remaining() is None
+
+    # Aunque el hilo del temporizador llegue a ejecutarse, no vence un otorgamiento
+    timer.function(*timer.args)
+    assert expired == []
+    assert session.state == AWARDING
+
+    assert session.finish_award(True) is claim
+    assert session.state == AWARDED
+    assert not session.is_active()
+
+
+def test_begin_award_without_claim():
+    session, _, _, _ = make_session()
+    assert session.begin_award() is None
+    assert session.finish_award(True) is None
+
+
+def test_failed_award_resumes_with_remaining_time():
+    session, clock, timers, expired = make_session(timeout=30)
+
+    session.detect("plastico", 20)
+    clock.advance(12)
+    session.begin_award()
+    clock.advance(3)  # Durante la consulta no vence, pero el plazo original sigue corriendo
+
+    assert session.finish_award(False) is None
+    assert session.state == AWAITING_NFC
+    assert timers.last.interval == 15
+    assert session.remaining() == 15
+
+    clock.advance(15)
+    timers.last.fire()
+    assert len(expired) == 1
+    assert session.state == IDLE
+
+
+def test_detect_during_award_opens_next_basket():
+    session, clock, timers, expired = make_session()
+
+    session.detect("plastico", 20)
+    awarding = session.begin_award()
+    carry = session.detect("aluminio", 30)
+
+    # El material nuevo no entra en la canasta que se está otorgando
+    assert carry.materials == ["aluminio"]
+    assert awarding.materials == ["plastico"]
+
+    awarded = session.finish_award(True)
+    assert awarded.materials == ["plastico"]
+    assert session.state == AWAITING_NFC
+    assert session.get_pending().materials == ["aluminio"]
+    assert timers.last.interval == 30
+
+
+def test_failed_award_merges_carry_and_restarts_timeout():
+    session, clock, timers, expired = make_session(timeout=30)
+
+    session.detect("plastico", 20)
+    clock.advance(20)
+    session.begin_award()
+    session.detect("aluminio", 30)
+
+    session.finish_award(False)
+    claim = session.get_pending()
+    assert claim.materials == ["plastico", "aluminio"]
+    assert claim.points == 50
+    # Un material recién llegado da el plazo completo
+    assert timers.last.interval == 30
+
+
+def test_reset_returns_basket_including_carry():
+    session, _, timers, _ = make_session()
+
+    session.detect("plastico", 20)
+    session.begin_award()
+    session.detect("aluminio", 30)
+
+    discarded = session.reset()
+    assert discarded.materials == ["plastico", "aluminio"]
+    assert session.state == IDLE
+    assert session.get_pending() is None
+    assert session.finish_award(True) is None
@@ -0,0 +1,64 @@
+"""
+Pruebas del agregador temporal de detecciones (EMA y votación k-de-n)
+"""
+
+import pytest
+
+from services.detection_aggregator import DetectionAggregator
+
+PLASTIC = [0.95, 0.05]
+ALUMINUM = [0.05, 0.95]
+
+
+def test_needs_k_votes_before_deciding():
+    aggregator = DetectionAggregator(window=5, min_votes=3, ema_alpha=0.6, threshold=0.85)
+
+    assert aggregator.update(PLASTIC, now=0.0) is None
+    assert aggregator.update(PLASTIC, now=0.1) is None
+    index, confidence = aggregator.update(PLASTIC, now=0.2)
+
+    assert index == 0
+    assert confidence == pytest.approx(0.95, abs=1e-5)
+
+
+def test_single_outlier_frame_does_not_flip_decision():
+    aggregator = DetectionAggregator(window=5, min_votes=3, ema_alpha=0.6, threshold=0.85)
+
+    for i in range(3):
+        aggregator.update(PLASTIC, now=i * 0.1)
+    # Un frame erróneo aislado: ni gana la votación ni la media cruza el umbral
+    assert aggregator.update(ALUMINUM, now=0.3) is None
+    assert aggregator.update(ALUMINUM, now=0.4) is None
+    assert aggregator.get_state()["votes"] == [0, 0, 0, 1, 1]
+
+
+def test_low_confidence_never_decides():
+    aggregator = DetectionAggregator(window=3, min_votes=2, threshold=0.85)
+    for i in range(10):
+        assert aggregator.update([0.6, 0.4], now=i * 0.1) is None
+
+
+def test_gap_discards_old_evidence():
+    aggregator = DetectionAggregator(window=5, min_votes=3, max_gap_seconds=2.5)
+
+    aggregator.update(PLASTIC, now=0.0)
+    aggregator.update(PLASTIC, now=0.1)
+    # Tras una pausa larga los votos anteriores ya no cuentan
+    assert aggregator.update(PLASTIC, now=5.0) is None
+    assert aggregator.get_state()["frames"] == 1
+
+
+def test_reset_clears_state():
+    aggregator = DetectionAggregator(window=3, min_votes=2)
+    aggregator.update(PLASTIC, now=0.0)
+    aggregator.reset()
+
+    state = aggregator.get_state()
+    assert state == {"ema": None, "votes": [], "frames": 0}
+
+
+def test_min_votes_is_clamped_to_window():
+    aggregator = DetectionAggregator(window=2, min_votes=5, threshold=0.5)
+    assert aggregator.min_votes == 2
+    aggregator.update(PLASTIC, now=0.0)
+    assert aggregator.update(PLASTIC, now=0.1) == (0, pytest.approx(0.95, abs=1e-5))
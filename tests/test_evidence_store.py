@@ -0,0 +1,126 @@
+"""
+Pruebas del almacén de evidencias (cuotas, cola llena y borrado durante la escritura)
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+import pytest
+
+from services import evidence_store
+from services.evidence_store import EvidenceStore
+
+
+def make_frame(value=128):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def blocked_encoder(monkeypatch):
+    """Detiene al hilo de escritura dentro de _write() hasta que la prueba lo libere"""
+    entered = threading.Event()
+    release = threading.Event()
+    real_imencode = evidence_store.cv2.imencode
+
+    def imencode(*args, **kwargs):
+        entered.set()
+        release.wait(2)
+        return real_imencode(*args, **kwargs)
+
+    monkeypatch.setattr(evidence_store.cv2, "imencode", imencode)
+    yield entered, release
+    release.set()
+
+
+def jpg_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".jpg"))
+
+
+def test_max_files_evicts_oldest(tmp_path):
+    store = EvidenceStore(str(tmp_path), max_files=2)
+    store.start()
+    paths = [store.save(make_frame(i * 50)) for i in range(3)]
+    store.stop(flush=True)
+
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1]) and os.path.exists(paths[2])
+    stats = store.get_stats()
+    assert stats["files"] == 2
+    assert stats["evicted"] == 1
+
+
+def test_start_removes_expired_and_interrupted_files(tmp_path):
+    old = tmp_path / "captura_old.jpg"
+    old.write_bytes(b"x" * 10)
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    (tmp_path / "captura_tmp.jpg.tmp").write_bytes(b"x")
+    fresh = tmp_path / "captura_new.jpg"
+    fresh.write_bytes(b"x" * 10)
+
+    store = EvidenceStore(str(tmp_path), max_age_seconds=3600)
+    store.start()
+    store.stop()
+
+    assert sorted(os.listdir(tmp_path)) == ["captura_new.jpg"]
+
+
+def test_full_queue_drops_new_frame_not_queued_one(tmp_path, blocked_encoder):
+    entered, release = blocked_encoder
+    store = EvidenceStore(str(tmp_path), queue_size=2)
+    store.start()
+
+    writing = store.save(make_frame())
+    assert entered.wait(2)
+    queued = [store.save(make_frame()), store.save(make_frame())]
+
+    # La cola está llena: la imagen nueva se descarta y las rutas ya entregadas siguen válidas
+    assert store.save(make_frame()) is None
+    assert store.get_stats()["dropped"] == 1
+    assert all(store.contains(path) for path in [writing] + queued)
+
+    release.set()
+    store.stop(flush=True)
+    assert all(os.path.exists(path) for path in [writing] + queued)
+
+
+def test_delete_while_writing_removes_file(tmp_path, blocked_encoder):
+    entered, release = blocked_encoder
+    store = EvidenceStore(str(tmp_path))
+    store.start()
+
+    path = store.save(make_frame())
+    assert entered.wait(2)
+    assert store.delete(path)
+
+    release.set()
+    store.stop(flush=True)
+    assert not os.path.exists(path)
+    assert not store.contains(path)
+    assert jpg_files(tmp_path) == []
+
+
+def test_purge_all_cancels_write_in_progress(tmp_path, blocked_encoder):
+    entered, release = blocked_encoder
+    store = EvidenceStore(str(tmp_path))
+    store.start()
+
+    store.save(make_frame())
+    assert entered.wait(2)
+    store.save(make_frame())
+
+    assert store.purge(0) == 2
+    release.set()
+    store.stop(flush=True)
+    assert wait_until(lambda: jpg_files(tmp_path) == [])
+    assert store.get_stats()["files"] == 0
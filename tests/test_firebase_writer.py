@@ -0,0 +1,101 @@
+"""
+Pruebas de la escritura diferida a RTDB (coalescencia y orden con la bandeja de salida)
+"""
+
+import pytest
+
+pytest.importorskip("firebase_admin")
+
+from services import firebase_writer  # noqa: E402
+from services.firebase_writer import FirebaseWriteBehind  # noqa: E402
+from services.outbox import DurableOutbox  # noqa: E402
+
+
+class FakeReference:
+    """Registra las llamadas update() en lugar de enviarlas"""
+
+    def __init__(self):
+        self.updates = []
+        self.fail = False
+
+    def update(self, values):
+        if self.fail:
+            raise ConnectionError("sin conexión")
+        self.updates.append(dict(values))
+
+
+class FakeDb:
+    def __init__(self):
+        self.ref = FakeReference()
+
+    def reference(self, path=None):
+        return self.ref
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    fake = FakeDb()
+    monkeypatch.setattr(firebase_writer, "db", fake)
+    return fake
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = DurableOutbox(str(tmp_path / "outbox.db"))
+    yield box
+    box.stop()
+
+
+def test_coalesces_updates_per_path(fake_db):
+    writer = FirebaseWriteBehind()
+    writer.enqueue("contenedor/contePlastico", {"estado": "lleno", "distancia": 5})
+    writer.enqueue("contenedor/contePlastico", {"distancia": 3})
+    writer.enqueue("contenedor/conteAluminio", {"estado": "vacio"})
+
+    assert writer._flush_once()
+    assert fake_db.ref.updates == [{
+        "contenedor/contePlastico/estado": "lleno",
+        "contenedor/contePlastico/distancia": 3,
+        "contenedor/conteAluminio/estado": "vacio"
+    }]
+    assert writer.get_stats()["pending_paths"] == 0
+
+
+def test_drops_oldest_path_when_full(fake_db):
+    writer = FirebaseWriteBehind(max_pending_paths=2)
+    writer.enqueue("a", {"x": 1})
+    writer.enqueue("b", {"x": 2})
+    writer.enqueue("c", {"x": 3})
+
+    writer._flush_once()
+    assert fake_db.ref.updates == [{"b/x": 2, "c/x": 3}]
+    assert writer.dropped == 1
+
+
+def test_failed_batch_goes_to_outbox(fake_db, outbox):
+    writer = FirebaseWriteBehind(outbox=outbox)
+    fake_db.ref.fail = True
+    writer.enqueue("contenedor/contePlastico", {"estado": "lleno"})
+
+    assert writer._flush_once()
+    assert outbox.get_payload("rtdb:contenedor/contePlastico") == {
+        "path": "contenedor/contePlastico", "fields": {"estado": "lleno"}
+    }
+
+
+def test_queued_path_is_superseded_not_written_directly(fake_db, outbox):
+    writer = FirebaseWriteBehind(outbox=outbox)
+    outbox.put("rtdb_update", "rtdb:contenedor/contePlastico",
+               {"path": "contenedor/contePlastico", "fields": {"estado": "lleno", "distancia": 5}})
+
+    writer.enqueue("contenedor/contePlastico", {"distancia": 40})
+    writer.enqueue("contenedor/conteAluminio", {"estado": "vacio"})
+    assert writer._flush_once()
+
+    # Solo la ruta sin entrada en la bandeja se escribe directamente
+    assert fake_db.ref.updates == [{"contenedor/conteAluminio/estado": "vacio"}]
+    # La entrada pendiente queda sustituida por el estado fusionado más nuevo
+    assert outbox.pending_count() == 1
+    assert outbox.get_payload("rtdb:contenedor/contePlastico") == {
+        "path": "contenedor/contePlastico", "fields": {"estado": "lleno", "distancia": 40}
+    }
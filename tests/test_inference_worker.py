@@ -0,0 +1,38 @@
+"""
+Pruebas del proceso de inferencia aparte (arranque desde el módulo de entrada ligero)
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from services.inference_worker import InferenceWorker, InferenceWorkerUnavailable
+
+
+def test_failed_start_reports_child_error_and_cleans_up(tmp_path):
+    worker = InferenceWorker(str(tmp_path / "missing.tflite"), max_frame_size=(64, 48), start_timeout=20)
+
+    # Sin TFLite o sin modelo, el hijo informa del error en lugar de quedarse colgado
+    with pytest.raises(Exception):
+        worker.start(self_check_runs=1)
+
+    assert not worker.is_alive()
+    assert worker.get_stats()["pid"] is None
+    worker.stop()
+
+
+def test_predict_without_process_does_not_block(tmp_path):
+    worker = InferenceWorker(str(tmp_path / "missing.tflite"), max_frame_size=(64, 48))
+    worker.stop()  # Un relanzamiento no debe empezar tras stop()
+
+    with pytest.raises(InferenceWorkerUnavailable):
+        worker.predict(np.zeros((48, 64, 3), dtype=np.uint8))
+    assert not worker.get_stats()["restarting"]
+
+
+def test_worker_runs_as_lightweight_module():
+    import services.inference_worker as module
+
+    # El hijo se lanza con "-m services.inference_worker" desde la raíz del proyecto
+    assert os.path.isfile(os.path.join(module.PROJECT_ROOT, "services", "inference_worker.py"))
@@ -0,0 +1,73 @@
+"""
+Pruebas del filtro de movimiento previo al clasificador
+"""
+
+import numpy as np
+
+from services.motion_gate import MotionGate
+
+
+def make_gate(**kwargs):
+    options = dict(size=(32, 24), hold_seconds=1.0, heartbeat_seconds=2.0)
+    options.update(kwargs)
+    return MotionGate(**options)
+
+
+def empty_frame():
+    return np.full((120, 160, 3), 40, dtype=np.uint8)
+
+
+def frame_with_object():
+    frame = empty_frame()
+    frame[30:90, 40:120] = 220
+    return frame
+
+
+def test_first_frame_is_classified():
+    gate = make_gate()
+    assert gate.should_classify(empty_frame(), now=0.0)
+
+
+def test_static_scene_skipped_until_heartbeat():
+    gate = make_gate()
+    gate.should_classify(empty_frame(), now=0.0)
+
+    # Sin cambios: se clasifica durante la ventana de espera y después se omite
+    assert gate.should_classify(empty_frame(), now=0.5)
+    assert not gate.should_classify(empty_frame(), now=1.5)
+    assert not gate.should_classify(empty_frame(), now=2.4)
+    # Inferencia periódica de control
+    assert gate.should_classify(empty_frame(), now=2.6)
+
+    stats = gate.get_stats()
+    assert stats["frames_seen"] == 5
+    assert stats["frames_classified"] == 3
+
+
+def test_motion_triggers_classification():
+    gate = make_gate()
+    gate.should_classify(empty_frame(), now=0.0)
+    assert not gate.should_classify(empty_frame(), now=1.5)
+    assert gate.should_classify(frame_with_object(), now=1.6)
+
+
+def test_object_left_in_hopper_keeps_classifying():
+    gate = make_gate(heartbeat_seconds=100.0)
+    gate.should_classify(empty_frame(), now=0.0)
+    gate.learn_empty()
+
+    gate.should_classify(frame_with_object(), now=1.0)
+    # Quieto pero distinto de la tolva vacía aprendida
+    assert gate.should_classify(frame_with_object(), now=5.0)
+    assert gate.should_classify(frame_with_object(), now=9.0)
+
+
+def test_reset_forgets_reference():
+    gate = make_gate()
+    gate.should_classify(empty_frame(), now=0.0)
+    gate.learn_empty()
+    assert gate.get_stats()["reference_learned"]
+
+    gate.reset()
+    assert not gate.get_stats()["reference_learned"]
+    assert gate.should_classify(empty_frame(), now=10.0)
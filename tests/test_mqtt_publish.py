@@ -0,0 +1,156 @@
+"""
+Pruebas de las publicaciones asíncronas MQTT (handles, plazos y cola interna de paho)
+"""
+
+import json
+import time
+import threading
+
+import pytest
+
+mqtt = pytest.importorskip("paho.mqtt.client")
+
+from config.config import MQTT_PUBLISH_QUEUE_MAX  # noqa: E402
+from services.mqtt_service import MQTTService  # noqa: E402
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class FakeInfo:
+    def __init__(self, rc, mid):
+        self.rc = rc
+        self.mid = mid
+
+
+class FakeMessage:
+    def __init__(self, state):
+        self.state = state
+
+
+class FakeClient:
+    """Imita lo que hace paho con QoS 1: guarda el mensaje aunque no haya conexión"""
+
+    def __init__(self):
+        self.rc = mqtt.MQTT_ERR_SUCCESS
+        self.sent = []
+        self._mid = 0
+        self._out_message_mutex = threading.RLock()
+        self._out_messages = {}
+        self._inflight_messages = 0
+
+    def publish(self, topic, payload, qos=0):
+        self._mid += 1
+        self.sent.append((self._mid, topic, payload))
+        if qos > 0:
+            with self._out_message_mutex:
+                if self.rc == mqtt.MQTT_ERR_SUCCESS:
+                    self._inflight_messages += 1
+                    self._out_messages[self._mid] = FakeMessage(mqtt.mqtt_ms_wait_for_puback)
+                elif self.rc == mqtt.MQTT_ERR_NO_CONN:
+                    self._out_messages[self._mid] = FakeMessage(mqtt.mqtt_ms_publish)
+        return FakeInfo(self.rc, self._mid)
+
+    def disconnect(self):
+        pass
+
+
+@pytest.fixture
+def service():
+    svc = MQTTService()
+    svc.client = FakeClient()
+    svc.connected = True
+    svc.is_running = True
+    svc.sender_thread = threading.Thread(target=svc._sender_loop, daemon=True)
+    svc.sender_thread.start()
+    yield svc
+    svc.disconnect()
+    svc.sender_thread.join(1)
+
+
+def test_puback_completes_handle(service):
+    done = []
+    handle = service.publish_async("t", "x", qos=1, timeout=2, callback=done.append)
+
+    assert wait_until(lambda: handle.state == "inflight")
+    service._on_publish(service.client, None, handle.mid)
+
+    assert handle.wait(1)
+    assert done == [handle]
+    assert handle.latency_ms is not None
+    assert service.get_publish_stats()["published"] == 1
+
+
+def test_early_puback_before_mid_is_registered(service):
+    # El PUBACK del mid 1 llega antes de que publish() devuelva
+    service._on_publish(service.client, None, 1)
+    handle = service.publish_async("t", "x", qos=1, timeout=2)
+    assert handle.wait(1)
+
+
+def test_not_handed_to_paho_while_disconnected(service):
+    service.connected = False
+    handle = service.publish_async("t", "x", qos=1, timeout=0.2)
+
+    assert not handle.wait(1)
+    assert handle.error == "tiempo de espera agotado"
+    assert service.client.sent == []
+
+
+def test_no_conn_race_keeps_message_out_of_paho(service):
+    service.client.rc = mqtt.MQTT_ERR_NO_CONN
+    handle = service.publish_async("t", "x", qos=1, timeout=2)
+
+    # paho lo rechazó: vuelve a la cola propia y no queda guardado en paho
+    assert wait_until(lambda: len(service.client.sent) >= 1)
+    with service._publish_condition:
+        service.connected = False
+    assert wait_until(lambda: service.get_publish_stats()["queued"] == 1)
+    assert service.client._out_messages == {}
+    assert not handle.done
+
+    # Al reconectar se envía desde la cola propia
+    service.client.rc = mqtt.MQTT_ERR_SUCCESS
+    with service._publish_condition:
+        service.connected = True
+        service._publish_condition.notify_all()
+    assert wait_until(lambda: handle.state == "inflight")
+
+
+def test_expired_inflight_is_dropped_from_paho(service):
+    handle = service.publish_async("t", "x", qos=1, timeout=0.2)
+    assert wait_until(lambda: handle.state == "inflight")
+    mid = handle.mid
+
+    assert not handle.wait(1)
+    assert handle.error == "tiempo de espera agotado"
+    assert wait_until(lambda: mid not in service.client._out_messages)
+    assert service.client._inflight_messages == 0
+
+    # Un PUBACK tardío no cuenta como publicada
+    service._on_publish(service.client, None, mid)
+    assert service.published == 0
+
+
+def test_queue_full_drops_oldest():
+    svc = MQTTService()  # Sin hilo de envío: todo queda en cola
+    handles = [svc.publish_async("t", str(i), qos=1) for i in range(MQTT_PUBLISH_QUEUE_MAX + 5)]
+
+    stats = svc.get_publish_stats()
+    assert stats["queued"] == MQTT_PUBLISH_QUEUE_MAX
+    assert handles[0].done and not handles[0].succeeded
+    assert not handles[-1].done
+
+
+def test_material_message_carries_expiry(service):
+    handle = service.send_material_detected("Plastico", 20)
+    message = json.loads(handle.payload)
+
+    assert message["material"] == "plastico"
+    assert message["expires_at"] >= message["timestamp"]
@@ -0,0 +1,117 @@
+"""
+Pruebas de la bandeja de salida persistente (reenvío, reintentos y operaciones fallidas)
+"""
+
+import json
+import time
+import threading
+
+import pytest
+
+from services.outbox import DurableOutbox, PermanentDeliveryError
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = DurableOutbox(str(tmp_path / "outbox.db"), retry_max_seconds=0.05)
+    yield box
+    box.stop()
+
+
+def test_replays_in_order_and_persists(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    box = DurableOutbox(path)
+    box.put("award", "a", {"n": 1})
+    box.put("award", "b", {"n": 2})
+    box.put("award", "a", {"n": 99})  # Misma clave sin replace: se ignora
+    box.stop()
+
+    # Lo guardado sobrevive a un reinicio y se envía en orden de llegada
+    delivered = []
+    box = DurableOutbox(path)
+    box.register_handler("award", lambda payload, attempts: delivered.append(payload["n"]))
+    box.start()
+    assert wait_until(lambda: box.pending_count() == 0)
+    box.stop()
+    assert delivered == [1, 2]
+
+
+def test_transient_errors_retry_without_dead_letter(outbox):
+    calls = []
+
+    def handler(payload, attempts):
+        calls.append(attempts)
+        if len(calls) < 4:
+            # Respuesta JSON ilegible (portal cautivo): transitoria
+            raise json.JSONDecodeError("Expecting value", "<html>", 0)
+
+    outbox.register_handler("award", handler)
+    outbox.put("award", "a", {"n": 1})
+    outbox.start()
+
+    assert wait_until(lambda: outbox.delivered == 1)
+    assert calls == [0, 1, 2, 3]
+    assert outbox.dead_count() == 0
+
+
+def test_permanent_error_is_dead_lettered_and_queue_continues(outbox):
+    delivered = []
+
+    def handler(payload, attempts):
+        if payload.get("bad"):
+            raise PermanentDeliveryError("datos inválidos")
+        delivered.append(payload["n"])
+
+    outbox.register_handler("award", handler)
+    outbox.put("award", "bad", {"bad": True})
+    outbox.put("unknown", "orphan", {})
+    outbox.put("award", "good", {"n": 2})
+    outbox.start()
+
+    assert wait_until(lambda: outbox.pending_count() == 0)
+    assert delivered == [2]
+    assert outbox.dead_count() == 2
+    assert outbox.get_stats()["dead"] == 2
+
+
+def test_replace_supersedes_pending_payload(outbox):
+    outbox.put("rtdb_update", "rtdb:x", {"v": 1})
+    outbox.put("rtdb_update", "rtdb:x", {"v": 2}, replace=True)
+
+    assert outbox.pending_count() == 1
+    assert outbox.get_payload("rtdb:x") == {"v": 2}
+    assert outbox.get_payload("rtdb:missing") is None
+
+
+def test_stop_during_delivery_keeps_connection_until_thread_exits(tmp_path):
+    box = DurableOutbox(str(tmp_path / "outbox.db"))
+    entered = threading.Event()
+    release = threading.Event()
+
+    def handler(payload, attempts):
+        entered.set()
+        release.wait(2)
+
+    box.register_handler("award", handler)
+    box.put("award", "a", {})
+    box.start()
+    assert entered.wait(2)
+
+    box.stop(timeout=0.05)
+    thread = box.thread
+    assert thread is not None and thread.is_alive()
+
+    # El hilo termina el envío, borra la operación con la conexión aún abierta y la cierra
+    release.set()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert box.delivered == 1
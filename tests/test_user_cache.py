@@ -0,0 +1,68 @@
+"""
+Pruebas de la caché de usuarios por tarjeta NFC (LRU, TTL y caché negativa)
+"""
+
+from services.user_cache import UserLookupCache
+
+
+def make_user(uid, points=0):
+    return {"uid": uid, "name": f"Usuario {uid}", "email": f"{uid}@example.com", "points": points}
+
+
+def test_hit_returns_copy():
+    cache = UserLookupCache(ttl=60)
+    cache.put("card-1", make_user("u1"), now=0)
+
+    found, user = cache.get("card-1", now=10)
+    assert found and user["uid"] == "u1"
+
+    user["points"] = 999
+    assert cache.get("card-1", now=11)[1]["points"] == 0
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = UserLookupCache(ttl=60)
+    cache.put("card-1", make_user("u1"), now=0)
+
+    assert cache.get("card-1", now=60) == (False, None)
+    assert cache.get_stats() == {"entries": 0, "hits": 0, "misses": 1}
+
+
+def test_unknown_card_uses_negative_ttl():
+    cache = UserLookupCache(ttl=600, negative_ttl=30)
+    cache.put("ghost", None, now=0)
+
+    # Se sabe desconocida: no hace falta consultar Firebase
+    assert cache.get("ghost", now=29) == (True, None)
+    assert cache.get("ghost", now=31) == (False, None)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = UserLookupCache(max_entries=2, ttl=600)
+    cache.put("a", make_user("ua"), now=0)
+    cache.put("b", make_user("ub"), now=0)
+    cache.get("a", now=1)  # "a" pasa a ser la más reciente
+    cache.put("c", make_user("uc"), now=2)
+
+    assert cache.get("b", now=3) == (False, None)
+    assert cache.get("a", now=3)[0]
+    assert cache.get("c", now=3)[0]
+
+
+def test_update_points_and_invalidate_user():
+    cache = UserLookupCache(ttl=600)
+    cache.put("card-1", make_user("u1", points=10), now=0)
+    cache.put("card-2", make_user("u1", points=10), now=0)
+    cache.put("card-3", make_user("u2"), now=0)
+
+    cache.update_points("u1", 40)
+    assert cache.get("card-2", now=1)[1]["points"] == 40
+
+    cache.invalidate_user("u1")
+    assert cache.get("card-1", now=1) == (False, None)
+    assert cache.get("card-2", now=1) == (False, None)
+    assert cache.get("card-3", now=1)[0]
+
+    cache.invalidate()
+    assert cache.get_stats()["entries"] == 0
@@ -0,0 +1,68 @@
+"""
+Registro de Actividad Acotado para el Sistema de Reciclaje Inteligente
+=====================================================================
+
+Este módulo contiene el modelo del log de actividad que se muestra en la
+pantalla LCD: un buffer circular de N líneas que puede alimentarse desde
+cualquier hilo. El widget de Tk lo vuelca por lotes en un temporizador, de
+modo que la memoria y el coste de redibujado se mantienen constantes aunque
+el kiosco funcione durante semanas.
+"""
+
+import threading
+from collections import deque
+
+
+class ActivityLog:
+    """Buffer circular de líneas de actividad con entrega por lotes"""
+
+    def __init__(self, max_lines=200):
+        """
+        Inicializa el log de actividad
+
+        Args:
+            max_lines: Número máximo de líneas conservadas
+        """
+        self.max_lines = max(1, int(max_lines))
+        self._lines = deque(maxlen=self.max_lines)  # Últimas N líneas
+        self._pending = deque(maxlen=self.max_lines)  # Líneas aún no volcadas al widget
+        self._lock = threading.Lock()
+        self.total_lines = 0
+
+    def append(self, text):
+        """
+        Agrega una línea al log (seguro desde cualquier hilo)
+
+        Args:
+            text: Texto de la línea (se añade salto de línea si falta)
+        """
+        line = text if text.endswith("\n") else text + "\n"
+        with self._lock:
+            self._lines.append(line)
+            self._pending.append(line)
+            self.total_lines += 1
+
+    def take_pending(self):
+        """
+        Extrae las líneas nuevas desde el último volcado
+
+        Returns:
+            list: Líneas pendientes (como máximo max_lines)
+        """
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+        return lines
+
+    def get_lines(self):
+        """
+        Obtiene una copia de las líneas conservadas
+
+        Returns:
+            list: Últimas líneas del log, de la más antigua a la más reciente
+        """
+        with self._lock:
+            return list(self._lines)
+
+    def __len__(self):
+        return len(self._lines)
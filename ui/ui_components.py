@@ -9,11 +9,15 @@ para pantalla LCD TFT de 320x480 píxeles, mostrando solo información esencial.
 import tkinter as tk
 from tkinter import ttk
 import datetime
+import threading
+from collections import deque
 from config.config import (
     WINDOW_TITLE, WINDOW_SIZE, WINDOW_BG_COLOR, FRAME_BG_COLOR, TEXT_COLOR,
     STATUS_COLORS, CONTAINER_COLORS, CONTAINER_EMOJIS, COMPACT_MODE,
-    FONT_SIZE_SMALL, FONT_SIZE_MEDIUM, FONT_SIZE_LARGE
+    FONT_SIZE_SMALL, FONT_SIZE_MEDIUM, FONT_SIZE_LARGE, UI_REFRESH_MS,
+    ACTIVITY_LOG_MAX_LINES, ACTIVITY_LOG_REFRESH_MS
 )
+from ui.activity_log import ActivityLog
 
 
 class UIComponents:
@@ -48,9 +52,103 @@ class UIComponents:
         self.last_percent_plastico = None
         self.last_percent_aluminio = None
 
+        # Cola de actualizaciones de UI: los hilos de trabajo encolan y el
+        # loop de Tk aplica los cambios con root.after a frecuencia acotada
+        self._ui_queue = deque()  # Operaciones en orden (logs)
+        self._ui_latest = {}  # Operaciones coalescidas por clave (solo cuenta la última)
+        self._ui_lock = threading.Lock()
+
+        # Log de actividad acotado (se vuelca al widget por lotes)
+        self.activity_log = ActivityLog(ACTIVITY_LOG_MAX_LINES)
+
         # Crear todos los widgets optimizados para LCD
         self._create_compact_widgets()
 
+        # Iniciar el drenado periódico de la cola y del log
+        self.root.after(UI_REFRESH_MS, self._drain_ui_queue)
+        self.root.after(ACTIVITY_LOG_REFRESH_MS, self._flush_activity_log)
+
+    def _post(self, func, *args, key=None):
+        """
+        Encola una mutación de UI (seguro desde cualquier hilo, no bloquea)
+
+        Args:
+            func: Función que modifica los widgets (se ejecuta en el hilo de Tk)
+            args: Argumentos de la función
+            key: Si se indica, reemplaza cualquier actualización pendiente con la misma clave
+                (y la mueve al final, para respetar el orden respecto a otras claves)
+        """
+        if key is None:
+            self._ui_queue.append((func, args))
+        else:
+            with self._ui_lock:
+                self._ui_latest.pop(key, None)
+                self._ui_latest[key] = (func, args)
+
+    def call_soon(self, func, *args):
+        """
+        Ejecuta una función en el hilo de Tk en el próximo tick (seguro desde cualquier hilo)
+
+        Args:
+            func: Función a ejecutar
+            args: Argumentos de la función
+        """
+        self._post(func, *args)
+
+    def call_later(self, delay_ms, func, *args):
+        """
+        Ejecuta una función en el hilo de Tk tras un retardo (seguro desde cualquier hilo)
+
+        Args:
+            delay_ms: Retardo en milisegundos
+            func: Función a ejecutar
+            args: Argumentos de la función
+        """
+        self._post(self.root.after, delay_ms, func, *args)
+
+    def _drain_ui_queue(self):
+        """Aplica todas las actualizaciones pendientes en un único tick de Tk"""
+        try:
+            while self._ui_queue:
+                func, args = self._ui_queue.popleft()
+                self._apply_safely(func, args)
+
+            with self._ui_lock:
+                latest, self._ui_latest = self._ui_latest, {}
+            for func, args in latest.values():
+                self._apply_safely(func, args)
+        finally:
+            self.root.after(UI_REFRESH_MS, self._drain_ui_queue)
+
+    def _flush_activity_log(self):
+        """Vuelca por lotes las líneas nuevas del log y recorta las más antiguas"""
+        try:
+            lines = self.activity_log.take_pending()
+            if lines:
+                self.materials_text.config(state='normal')
+                self.materials_text.insert('end', "".join(lines))
+
+                # Mantener como máximo ACTIVITY_LOG_MAX_LINES líneas en el widget
+                # (el texto termina en salto de línea, la última línea está vacía)
+                line_count = int(self.materials_text.index('end-1c').split('.')[0]) - 1
+                excess = line_count - self.activity_log.max_lines
+                if excess > 0:
+                    self.materials_text.delete('1.0', f'{excess + 1}.0')
+
+                self.materials_text.see('end')
+                self.materials_text.config(state='disabled')
+        except Exception as e:
+            print(f"❌ Error actualizando log de actividad: {e}")
+        finally:
+            self.root.after(ACTIVITY_LOG_REFRESH_MS, self._flush_activity_log)
+
+    def _apply_safely(self, func, args):
+        """Ejecuta una actualización de UI sin interrumpir el drenado si falla"""
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"❌ Error actualizando UI: {e}")
+
     def _create_compact_widgets(self):
         """Crea widgets optimizados para pantalla LCD de 320x480"""
         # Frame principal con padding mínimo
@@ -226,9 +324,12 @@ class UIComponents:
             message: Mensaje a mostrar
             status_type: Tipo de estado (success, error, warning, info)
         """
+        self._post(self._apply_update_status, message, status_type, key="status")
+
+    def _apply_update_status(self, message, status_type="info"):
+        """Aplica update_status en el hilo de Tk"""
         color = STATUS_COLORS.get(status_type, "#3498db")
         self.status_label.config(text=message, fg=color)
-        self.root.update()
 
     def update_user_info(self, email):
         """
@@ -237,12 +338,16 @@ class UIComponents:
         Args:
             email: Email del usuario autenticado
         """
+        self._post(self._apply_update_user_info, email, key="user")
+
+    def _apply_update_user_info(self, email):
+        """Aplica update_user_info en el hilo de Tk"""
         self.current_user = email
         # No mostramos email en modo compacto para ahorrar espacio
 
     def clear_user_info(self):
         """Limpia la información del usuario"""
-        self.current_user = None
+        self._post(self._apply_update_user_info, None, key="user")
 
     def update_session_status(self, active=True):
         """
@@ -251,10 +356,11 @@ class UIComponents:
         Args:
             active: Si la sesión está activa
         """
-        if active:
-            self.session_active = True
-        else:
-            self.session_active = False
+        self._post(self._apply_update_session_status, active, key="session")
+
+    def _apply_update_session_status(self, active):
+        """Aplica update_session_status en el hilo de Tk"""
+        self.session_active = bool(active)
 
     def update_progress(self, progress):
         """
@@ -263,6 +369,10 @@ class UIComponents:
         Args:
             progress: Valor de progreso (0-100)
         """
+        self._post(self._apply_update_progress, progress, key="progress")
+
+    def _apply_update_progress(self, progress):
+        """Aplica update_progress en el hilo de Tk (sin barra en modo compacto)"""
         pass
 
     def update_container_status(self, target, percent, state, distance_cm):
@@ -275,19 +385,19 @@ class UIComponents:
             state: Estado del contenedor
             distance_cm: Distancia del sensor
         """
-        try:
-            # Determinar color y emoji basado en el estado
-            color = CONTAINER_COLORS.get(state, "#27ae60")
-            emoji = CONTAINER_EMOJIS.get(state, "🟢")
+        # Determinar emoji basado en el estado
+        emoji = CONTAINER_EMOJIS.get(state, "🟢")
+
+        # Actualizar el log con información visual
+        container_name = "🥤" if target == "contePlastico" else "🥫"
+        self.activity_log.append(f"{emoji} {container_name}: {percent}% ({state})")
 
-            # Actualizar el log con información visual
-            container_name = "🥤" if target == "contePlastico" else "🥫"
-            log_entry = f"{emoji} {container_name}: {percent}% ({state})\n"
+        self._post(self._apply_update_container_status, target, state, key=("container", target))
 
-            self.materials_text.config(state='normal')
-            self.materials_text.insert('end', log_entry)
-            self.materials_text.see('end')
-            self.materials_text.config(state='disabled')
+    def _apply_update_container_status(self, target, state):
+        """Aplica el color del estado del contenedor a su contador"""
+        try:
+            color = CONTAINER_COLORS.get(state, "#27ae60")
 
             # Actualizar contadores en estadísticas
             if target == "contePlastico":
@@ -307,14 +417,11 @@ class UIComponents:
             points: Puntos otorgados
         """
         ts = datetime.datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{ts}] ♻️ {material.upper()} (+{points})\n"
-
-        self.materials_text.config(state='normal')
-        self.materials_text.insert('end', log_entry)
-        self.materials_text.see('end')
-        self.materials_text.config(state='disabled')
+        self.activity_log.append(f"[{ts}] ♻️ {material.upper()} (+{points})")
+        self._post(self._apply_log_material, material, points)
 
-        # Actualizar contadores
+    def _apply_log_material(self, material, points):
+        """Actualiza los contadores de materiales y puntos"""
         if material == "plastico":
             self.plastic_count += 1
             self.plastic_count_label.config(text=f"🥤 {self.plastic_count}")
@@ -334,6 +441,10 @@ class UIComponents:
             status: Estado del componente
             color: Color del estado
         """
+        self._post(self._apply_update_component_status, component, status, color, key=("component", component))
+
+    def _apply_update_component_status(self, component, status, color):
+        """Aplica update_component_status en el hilo de Tk"""
         # Simplificar estados para pantalla pequeña
         if "✅" in status or "Conectado" in status or "Disponible" in status:
             status_icon = "✅"
@@ -364,12 +475,7 @@ class UIComponents:
         line = f"[{ts}] {label}: {value}"
         if extra is not None:
             line += f" ({extra})"
-        line += "\n"
-
-        self.materials_text.config(state='normal')
-        self.materials_text.insert('end', line)
-        self.materials_text.see('end')
-        self.materials_text.config(state='disabled')
+        self.activity_log.append(line)
 
     def has_significant_change(self, target, percent, state):
         """
@@ -425,6 +531,10 @@ class UIComponents:
             status: Estado de la detección
             color: Color del estado
         """
+        self._post(self._apply_update_detection_status, status, color, key="detection_status")
+
+    def _apply_update_detection_status(self, status, color="#3498db"):
+        """Aplica update_detection_status en el hilo de Tk"""
         # Simplificar mensaje para pantalla pequeña
         if "Cámara activa" in status:
             short_status = "🔄 Detectando..."
@@ -443,6 +553,10 @@ class UIComponents:
             material: Material detectado
             points: Puntos a otorgar
         """
+        self._post(self._apply_update_pending_material, material, points, key="pending_material")
+
+    def _apply_update_pending_material(self, material, points):
+        """Aplica update_pending_material en el hilo de Tk"""
         if material:
             self.pending_material_label.config(
                 text=f"♻️ {material.upper()}!", 
@@ -461,6 +575,10 @@ class UIComponents:
 
     def clear_pending_material(self):
         """Limpia el material pendiente"""
+        self._post(self._apply_clear_pending_material, key="pending_material")
+
+    def _apply_clear_pending_material(self):
+        """Aplica clear_pending_material en el hilo de Tk"""
         self.pending_material_label.config(text="🔄 Esperando...", fg='#bdc3c7')
         self.pending_points_label.config(text="", fg='#f39c12')
 
@@ -474,9 +592,4 @@ class UIComponents:
         """
         ts = datetime.datetime.now().strftime("%H:%M:%S")
         status_icon = "✅" if success else "❌"
-        log_entry = f"[{ts}] {status_icon} ESP32: {material.upper()}\n"
-
-        self.materials_text.config(state='normal')
-        self.materials_text.insert('end', log_entry)
-        self.materials_text.see('end')
-        self.materials_text.config(state='disabled')
\ No newline at end of file
+        self.activity_log.append(f"[{ts}] {status_icon} ESP32: {material.upper()}")